@@ -0,0 +1,174 @@
+"""
+Records API under many concurrent clients: sync sessions in the threadpool
+(DB_ASYNC=false) versus the async engine (DB_ASYNC=true).
+
+Each mode runs in its own process, since the engine is chosen at import
+time, against the same pre-populated SQLite file. Clients are served
+in-process over ASGI and loop over a read-heavy mix (list, prefix search,
+get by id, one save in ten). Event-loop lag is sampled alongside to show
+whether other requests would have been held up.
+
+    cd backend && python -m benchmarks.async_records --clients 50,200,500 --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.response_serialization import call
+
+SAVE_BODY = json.dumps(
+    {
+        "location": "Kumasi", "country": "GH", "main": "Clouds",
+        "description": "overcast clouds", "temp": 25.6, "humidity": 81,
+        "pressure": 1014, "wind": 6.4,
+    }
+).encode()
+
+
+async def post(app, path: str, body: bytes) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def percentile(values: list[float], q: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * q))] * 1000 if values else 0.0
+
+
+async def load(app, clients: int, seconds: float, cities: list[str], max_id: int) -> dict:
+    deadline = time.monotonic() + seconds
+    latencies, errors, lag = [], 0, []
+
+    async def client(seed: int):
+        nonlocal errors
+        rng = random.Random(seed)
+        while time.monotonic() < deadline:
+            roll = rng.random()
+            start = time.perf_counter()
+            if roll < 0.1:
+                status = await post(app, "/records/save", SAVE_BODY)
+            elif roll < 0.4:
+                status = await call(app, "/records?limit=20", [])
+            elif roll < 0.7:
+                prefix = rng.choice(cities)[:4]
+                status = await call(app, f"/records/filter?location={prefix}&match=prefix&limit=20", [])
+            else:
+                status = await call(app, f"/records/{rng.randint(1, max_id)}", [])
+            latencies.append(time.perf_counter() - start)
+            if status >= 500:
+                errors += 1
+
+    async def monitor():
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag.append(time.perf_counter() - start - 0.01)
+
+    await asyncio.gather(monitor(), *(client(i) for i in range(clients)))
+    return {
+        "clients": clients,
+        "rps": len(latencies) / seconds,
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99),
+        "errors": errors,
+        "loop_lag_p99_ms": percentile(lag, 0.99),
+    }
+
+
+async def child(args):
+    from benchmarks.location_search import city_names
+    import main
+
+    cities = city_names(5000, random.Random(5))
+    async with main.lifespan(main.app):
+        for clients in map(int, args.clients.split(",")):
+            print(json.dumps(await load(main.app, clients, args.seconds, cities, args.rows)), flush=True)
+
+
+def prepare(url: str, rows: int):
+    from config.database import Base, create_db_engine
+    from config.migrations import run_migrations
+    from benchmarks.location_search import populate
+    import models.weather_record  # noqa: F401
+
+    engine = create_db_engine(url)
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    populate(engine, rows, random.Random(5))
+    engine.dispose()
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        env = {
+            **os.environ,
+            "DATABASE_URL": url,
+            "PREWARM_ENABLED": "false",
+            "METRICS_ENABLED": "false",
+        }
+        os.environ.update(env)
+        prepare(url, args.rows)
+
+        for mode in ("false", "true"):
+            label = "async engine" if mode == "true" else "sync + threadpool"
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.async_records", "--child",
+                 "--clients", args.clients, "--seconds", str(args.seconds), "--rows", str(args.rows)],
+                env={**env, "DB_ASYNC": mode},
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            for line in output.splitlines():
+                if not line.startswith("{"):
+                    continue
+                r = json.loads(line)
+                print(
+                    f"{label:<18} {r['clients']:4d} clients  {r['rps']:7.0f} req/s  "
+                    f"p50 {r['p50_ms']:7.1f} ms  p99 {r['p99_ms']:7.1f} ms  "
+                    f"errors {r['errors']:4d}  loop lag p99 {r['loop_lag_p99_ms']:6.1f} ms"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", default="50,200,500", help="Comma-separated concurrency levels")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child(args))
+    else:
+        main(args)
@@ -0,0 +1,68 @@
+"""
+Rows/s for the /records/bulk ingest path (parse + validate + batched insert)
+against a fresh SQLite database in WAL mode.
+
+    cd backend && python -m benchmarks.bulk_ingest --rows 200000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def ndjson_body(rows: int) -> bytes:
+    lines = (
+        json.dumps(
+            {
+                "location": f"City {i % 5000}",
+                "country": "GH",
+                "main": "Clouds",
+                "description": "overcast clouds",
+                "temp": f"{20 + i % 15}.5 °C",
+                "humidity": "81",
+                "pressure": "1014",
+                "wind": "6.4",
+            }
+        )
+        for i in range(rows)
+    )
+    return "\n".join(lines).encode()
+
+
+def main(rows: int):
+    path = os.path.join(tempfile.mkdtemp(), "bulk_ingest.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from sqlalchemy import text
+    from config.database import Base, SessionLocal, engine
+    from config.migrations import run_migrations
+    from controllers.weather_record_controller import (
+        bulk_create_weather_records,
+        parse_bulk_rows,
+    )
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA journal_mode=WAL"))
+
+    body = ndjson_body(rows)
+    db = SessionLocal()
+    start = time.perf_counter()
+    result = bulk_create_weather_records(
+        db, parse_bulk_rows(body, "application/x-ndjson")
+    )
+    elapsed = time.perf_counter() - start
+    db.close()
+    print(
+        f"inserted {result['inserted']} rows ({result['rejected']} rejected) "
+        f"in {elapsed:.2f}s: {result['inserted'] / elapsed:.0f} rows/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+    main(args.rows)
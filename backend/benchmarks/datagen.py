@@ -0,0 +1,117 @@
+"""
+Deterministic synthetic weather_records: fill a database to a given size
+(10k, 1M, 10M rows...) with varied locations, conditions and measurements
+spread over a time window. The same `seed` always produces the same rows
+and the same city list, so runs on different commits see identical data.
+
+    cd backend && python -m benchmarks.datagen --rows 1M --url sqlite:///bench.db
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.location_search import city_names
+
+MAINS = [
+    ("Clouds", "overcast clouds", "04d"),
+    ("Rain", "light rain", "10d"),
+    ("Clear", "clear sky", "01d"),
+    ("Mist", "mist", "50d"),
+    ("Thunderstorm", "thunderstorm", "11d"),
+]
+COUNTRIES = ["GH", "NG", "CI", "TG", "BF", "GB", "US", "DE", "IN", "BR"]
+# Fixed so the data doesn't depend on when it was generated
+END = datetime(2025, 6, 1)
+BATCH_SIZE = 10000
+
+
+def parse_rows(value: str) -> int:
+    """
+    "10k", "1M", "10M" or a plain integer.
+    """
+    value = value.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * scale)
+
+
+def cities(count: int = 500, seed: int = 1) -> list[str]:
+    return city_names(count, random.Random(seed))
+
+
+def rows(count: int, seed: int = 1, city_count: int = 500, days: int = 365):
+    """
+    Yield `count` record dicts, oldest first.
+    """
+    from models.weather_record import normalize_location_name
+
+    rng = random.Random(seed)
+    places = [
+        (city, normalize_location_name(city), COUNTRIES[i % len(COUNTRIES)])
+        for i, city in enumerate(cities(city_count, seed))
+    ]
+    start = END - timedelta(days=days)
+    step = days * 86400 / max(count, 1)
+    for i in range(count):
+        city, normalized, country = rng.choice(places)
+        main, description, icon = rng.choice(MAINS)
+        yield {
+            "location": city,
+            "location_normalized": normalized,
+            "country": country,
+            "main": main,
+            "description": description,
+            "icon": icon,
+            "temp": round(rng.uniform(-5, 40), 1),
+            "humidity": float(rng.randint(20, 100)),
+            "pressure": None if rng.random() < 0.02 else float(rng.randint(980, 1040)),
+            "wind": round(rng.uniform(0, 30), 1),
+            "visibility": round(rng.uniform(1, 10), 1),
+            "saved_on": start + timedelta(seconds=i * step),
+        }
+
+
+def generate(engine, count: int, seed: int = 1, city_count: int = 500, days: int = 365) -> float:
+    """
+    Create the schema, insert `count` rows in batches, then run the
+    migrations (search indexes are built once, after the load). Returns
+    the elapsed seconds.
+    """
+    from sqlalchemy import insert
+    from config.database import Base
+    from config.migrations import migrate
+    from models.weather_record import WeatherRecord
+
+    started = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    table = WeatherRecord.__table__
+    batch = []
+    for row in rows(count, seed, city_count, days):
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            with engine.begin() as conn:
+                conn.execute(insert(table), batch)
+            batch.clear()
+    if batch:
+        with engine.begin() as conn:
+            conn.execute(insert(table), batch)
+    migrate(engine, force=True)
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default="10k", help="Row count, e.g. 10k, 1M, 10M")
+    parser.add_argument("--url", required=True, help="Database URL to fill")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cities", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    from config.database import create_db_engine
+
+    engine = create_db_engine(args.url)
+    count = parse_rows(args.rows)
+    elapsed = generate(engine, count, args.seed, args.cities, args.days)
+    print(f"inserted {count} rows in {elapsed:.1f}s ({count / elapsed:.0f} rows/s)")
@@ -0,0 +1,104 @@
+"""
+Throughput, size and load-time comparison of the /records/export formats,
+with a round-trip check of row counts and column types for each format.
+
+    cd backend && python -m benchmarks.export_formats --rows 200000
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+
+def load_csv(data: bytes) -> int:
+    from utils.formatters import parse_measurement
+
+    rows = 0
+    reader = csv.reader(io.StringIO(data.decode()))
+    next(reader)
+    for row in reader:
+        [parse_measurement(v) for v in row[5:9]]
+        rows += 1
+    return rows
+
+
+def load_ndjson(data: bytes) -> int:
+    rows = [json.loads(line) for line in data.splitlines()]
+    assert isinstance(rows[0]["temp"], float)
+    return len(rows)
+
+
+def load_arrow(data: bytes) -> int:
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(data).read_all()
+    assert pa.types.is_floating(table.schema.field("temp").type)
+    assert pa.types.is_timestamp(table.schema.field("saved_on").type)
+    return table.num_rows
+
+
+def load_parquet(data: bytes) -> int:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(io.BytesIO(data))
+    assert pa.types.is_floating(table.schema.field("temp").type)
+    return table.num_rows
+
+
+LOADERS = {"csv": load_csv, "ndjson": load_ndjson, "arrow": load_arrow, "parquet": load_parquet}
+
+
+def main(rows: int):
+    path = os.path.join(tempfile.mkdtemp(), "export_formats.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from benchmarks.location_search import populate
+    from config.database import Base, SessionLocal, engine
+    from controllers.weather_record_controller import export_weather_records_controller
+
+    Base.metadata.create_all(bind=engine)
+    populate(engine, rows, random.Random(7))
+    db = SessionLocal()
+
+    report = {}
+    for export_format, loader in LOADERS.items():
+        start = time.perf_counter()
+        response = export_weather_records_controller(db, export_format=export_format)
+        data = b"".join(_drain(response))
+        export_s = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = loader(data)
+        load_s = time.perf_counter() - start
+        assert loaded == rows, f"{export_format}: expected {rows} rows, got {loaded}"
+        report[export_format] = {
+            "bytes": len(data),
+            "export_rows_per_s": round(rows / export_s),
+            "load_s": round(load_s, 3),
+        }
+        print(
+            f"{export_format:<8} {len(data) / 1e6:8.2f} MB  "
+            f"{rows / export_s:10.0f} rows/s export  {load_s:7.3f}s load"
+        )
+    db.close()
+    return report
+
+
+def _drain(response) -> list[bytes]:
+    import asyncio
+
+    async def collect():
+        return [chunk async for chunk in response.body_iterator]
+
+    return asyncio.run(collect())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+    main(args.rows)
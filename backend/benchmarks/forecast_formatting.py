@@ -0,0 +1,125 @@
+"""
+Compare format_forecast_data with the previous dict-of-lists implementation
+on standard (40-slot) and large batched forecast payloads. Outputs for UTC cities are compared too;
+they can only differ where two conditions tie for the most common in a day
+(the old code broke ties in arbitrary set order, the new one keeps the
+first to reach the top count).
+
+    cd backend && python -m benchmarks.forecast_formatting
+"""
+
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from utils.formatters import format_forecast_data
+
+MAINS = [("Clouds", "overcast clouds", "04d"), ("Rain", "light rain", "10d"), ("Clear", "clear sky", "01d")]
+
+
+def legacy_format_forecast_data(data: dict) -> dict:
+    # The implementation format_forecast_data replaced, kept for comparison
+    grouped = defaultdict(
+        lambda: {"temps": [], "mains": [], "descriptions": [], "icons": []}
+    )
+
+    for entry in data["list"]:
+        date = datetime.utcfromtimestamp(entry["dt"]).strftime("%Y-%m-%d")
+        grouped[date]["temps"].append(entry["main"]["temp"])
+        grouped[date]["mains"].append(entry["weather"][0]["main"])
+        grouped[date]["descriptions"].append(entry["weather"][0]["description"])
+        grouped[date]["icons"].append(entry["weather"][0]["icon"])
+
+    forecast = []
+    for date in sorted(grouped.keys()):
+        dt_obj = datetime.strptime(date, "%Y-%m-%d")
+        values = grouped[date]
+        forecast.append(
+            {
+                "date": date,
+                "day": dt_obj.strftime("%a")[:3],
+                "main": max(set(values["mains"]), key=values["mains"].count),
+                "description": max(
+                    set(values["descriptions"]), key=values["descriptions"].count
+                ).title(),
+                "icon": max(set(values["icons"]), key=values["icons"].count),
+                "temp_min": round(min(values["temps"]), 1),
+                "temp_max": round(max(values["temps"]), 1),
+            }
+        )
+
+    if len(forecast) < 7:
+        last_date = datetime.strptime(forecast[-1]["date"], "%Y-%m-%d")
+        for i in range(7 - len(forecast)):
+            next_date = last_date + timedelta(days=i + 1)
+            forecast.append(
+                {
+                    "date": next_date.strftime("%Y-%m-%d"),
+                    "day": next_date.strftime("%a").upper()[:3],
+                    "main": forecast[-1]["main"],
+                    "description": forecast[-1]["description"],
+                    "icon": forecast[-1]["icon"],
+                    "temp_min": forecast[-1]["temp_min"],
+                    "temp_max": forecast[-1]["temp_max"],
+                }
+            )
+
+    return {
+        "location": data["city"]["name"],
+        "country": data["city"]["country"],
+        "forecast": forecast[:7],
+    }
+
+
+def payload(slots: int, rng: random.Random) -> dict:
+    start = 1760000000 - 1760000000 % 86400
+    entries = []
+    for i in range(slots):
+        # Skew towards one condition per day so the mode is unambiguous
+        main, description, icon = MAINS[(i // 8) % 3] if rng.random() < 0.7 else rng.choice(MAINS)
+        entries.append(
+            {
+                "dt": start + i * 3 * 3600,
+                "main": {"temp": round(rng.uniform(15, 35), 2)},
+                "weather": [{"main": main, "description": description, "icon": icon}],
+            }
+        )
+    return {"list": entries, "city": {"name": "Kumasi", "country": "GH", "timezone": 0}}
+
+
+def timed(fn, payloads) -> float:
+    start = time.perf_counter()
+    for data in payloads:
+        fn(data)
+    return time.perf_counter() - start
+
+
+def main(batch: int, large_slots: int):
+    rng = random.Random(1)
+    cases = {
+        f"{batch} x 40-slot payloads": [payload(40, rng) for _ in range(batch)],
+        f"{batch // 100} x {large_slots}-slot payloads": [
+            payload(large_slots, rng) for _ in range(max(1, batch // 100))
+        ],
+    }
+    for name, payloads in cases.items():
+        mismatches = sum(
+            legacy_format_forecast_data(p)["forecast"][:5] != format_forecast_data(p)["forecast"][:5]
+            for p in payloads[:50]
+        )
+        legacy = timed(legacy_format_forecast_data, payloads)
+        current = timed(format_forecast_data, payloads)
+        print(
+            f"{name:<28} legacy {legacy * 1000:8.1f} ms  current {current * 1000:8.1f} ms  "
+            f"({legacy / current:.1f}x, {mismatches} tie-break differences in sample)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--large-slots", type=int, default=4000)
+    args = parser.parse_args()
+    main(args.batch, args.large_slots)
@@ -0,0 +1,87 @@
+"""
+Local location index: load time, resolve and suggest latency at the size
+of the bundled seed and of a GeoNames cities15000-sized synthetic table,
+and how many distinct cache keys / upstream lookups common spelling
+variants produce before and after names resolve to coordinates.
+
+    cd backend && python -m benchmarks.gazetteer --places 30000
+"""
+
+import argparse
+import random
+import re
+import time
+
+from benchmarks.location_search import city_names
+
+VARIANTS = ("{}", "{} ", "{},GH", "{}, gh", " {} ,GH", "{}".upper())
+_WHITESPACE = re.compile(r"\s+")
+
+
+def legacy_key(location: str) -> str:
+    # location_query before the gazetteer: names went upstream as q=
+    name = ",".join(
+        _WHITESPACE.sub(" ", part).strip() for part in location.casefold().split(",")
+    )
+    return f"q:{name}"
+
+
+def per_call_us(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def synthetic_rows(count: int, rng: random.Random):
+    countries = ["GH", "NG", "US", "GB", "FR", "DE", "IN", "BR", "CN", "JP"]
+    for i, name in enumerate(city_names(count, rng)):
+        yield {
+            "id": i + 1, "name": name, "ascii_name": name, "alternate_names": "",
+            "country": rng.choice(countries), "admin1": "", "lat": rng.uniform(-60, 70),
+            "lon": rng.uniform(-180, 180), "population": int(rng.paretovariate(1.2) * 15000),
+        }
+
+
+def measure(label: str, gazetteer, names: list[str], rng: random.Random):
+    lookups = [rng.choice(names) for _ in range(20000)]
+    prefixes = [name[: rng.randint(1, 4)] for name in lookups]
+    print(
+        f"{label:<22} {len(gazetteer):6d} places  "
+        f"resolve {per_call_us(gazetteer.resolve, lookups):5.1f} us  "
+        f"resolve 'name,CC' {per_call_us(gazetteer.resolve, [n + ',GH' for n in lookups]):5.1f} us  "
+        f"suggest {per_call_us(gazetteer.suggest, prefixes):6.1f} us"
+    )
+
+
+def main(args):
+    from utils.cache import location_query
+    from utils.gazetteer import Gazetteer, gazetteer
+
+    rng = random.Random(7)
+    start = time.perf_counter()
+    gazetteer.load()
+    print(f"seed load: {(time.perf_counter() - start) * 1000:.1f} ms")
+    measure("bundled seed", gazetteer, gazetteer._names, rng)
+
+    synthetic = Gazetteer(path=None)
+    rows = list(synthetic_rows(args.places, rng))
+    start = time.perf_counter()
+    synthetic.load_rows(rows)
+    print(f"synthetic load: {(time.perf_counter() - start) * 1000:.1f} ms")
+    measure("synthetic", synthetic, synthetic._names, rng)
+
+    cities = ["Kumasi", "Accra", "Tamale", "Takoradi", "Cape Coast", "Sunyani", "Koforidua", "Ho"]
+    requests = [variant.format(city) for city in cities for variant in VARIANTS]
+    before = {legacy_key(location) for location in requests}
+    after = {location_query(location)[0] for location in requests}
+    print(
+        f"{len(requests)} requests for {len(cities)} places: "
+        f"{len(before)} cache keys / upstream lookups before, {len(after)} after"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--places", type=int, default=30000)
+    main(parser.parse_args())
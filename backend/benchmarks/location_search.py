@@ -0,0 +1,200 @@
+"""
+Compare the old leading-wildcard ILIKE location filter with the indexed
+search paths on a synthetic SQLite table, then show latency and peak
+memory of a contains page as the number of matching rows grows, with the
+FTS table always used (every match loaded and sorted) and with the plan
+chosen by match count (FTS_MAX_MATCHES).
+
+    cd backend && python -m benchmarks.location_search --rows 1000000
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SYLLABLES = ["ku", "ma", "si", "ac", "cra", "ta", "le", "lon", "don", "par", "is", "ber", "lin", "to", "kyo", "na", "iro", "bi", "os", "lo"]
+
+
+def city_names(count: int, rng: random.Random) -> list[str]:
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title())
+    return sorted(names)
+
+
+def populate(engine, rows: int, rng: random.Random) -> list[str]:
+    from models.weather_record import normalize_location_name
+
+    cities = city_names(5000, rng)
+    start = datetime(2024, 1, 1)
+    raw = engine.raw_connection()
+    cursor = raw.cursor()
+    batch = []
+    for i in range(rows):
+        city = rng.choice(cities)
+        batch.append(
+            (city, normalize_location_name(city), "GH", "Clouds", "x", "25.6", "81", "1014", "6.4",
+             start + timedelta(seconds=i * 30))
+        )
+        if len(batch) == 50000:
+            cursor.executemany(
+                "INSERT INTO weather_records (location, location_normalized, country, main, "
+                "description, temp, humidity, pressure, wind, saved_on) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            batch.clear()
+    if batch:
+        cursor.executemany(
+            "INSERT INTO weather_records (location, location_normalized, country, main, "
+            "description, temp, humidity, pressure, wind, saved_on) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+    raw.commit()
+    raw.close()
+    return cities
+
+
+def rss_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(rows: int, repeat: int):
+    path = os.path.join(tempfile.mkdtemp(), "location_search.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from sqlalchemy import select
+    from config.database import Base, SessionLocal, engine
+    from config.migrations import run_migrations
+    from controllers.weather_record_controller import get_weather_record_by_location
+    from models.weather_record import WeatherRecord
+
+    rng = random.Random(42)
+    Base.metadata.create_all(bind=engine)
+    start = time.perf_counter()
+    cities = populate(engine, rows, rng)
+    print(f"inserted {rows} rows in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    run_migrations(engine)
+    print(f"built search indexes in {time.perf_counter() - start:.1f}s")
+
+    target = rng.choice(cities)
+    db = SessionLocal()
+
+    def legacy():
+        db.execute(
+            select(WeatherRecord)
+            .where(WeatherRecord.location.ilike(f"%{target[1:5]}%"))
+            .order_by(WeatherRecord.saved_on.desc())
+            .limit(100)
+        ).all()
+
+    cases = {
+        "legacy ilike '%q%'": legacy,
+        "exact": lambda: get_weather_record_by_location(db, target, "exact"),
+        "prefix": lambda: get_weather_record_by_location(db, target[:4], "prefix"),
+        "contains (fts5 trigram)": lambda: get_weather_record_by_location(db, target[1:5], "contains"),
+    }
+    for name, fn in cases.items():
+        print(f"{name:<26} {timed(fn, repeat):8.2f} ms/query")
+
+    contains_by_matches(db, path, repeat)
+    db.close()
+
+
+def contains_by_matches(db, path: str, repeat: int):
+    from sqlalchemy import func, select, text
+    from controllers.weather_record_controller import _fts_phrase
+    from models.weather_record import WeatherRecord
+
+    def match_count(needle: str) -> int:
+        return db.execute(
+            text("SELECT count(*) FROM weather_records_fts WHERE weather_records_fts MATCH :q"),
+            {"q": _fts_phrase(needle)},
+        ).scalar_one()
+
+    candidates = {s + t for s in SYLLABLES for t in SYLLABLES if len(s + t) >= 3}
+    candidates |= {s for s in SYLLABLES if len(s) >= 3}
+    counts = sorted((match_count(needle), needle) for needle in candidates)
+    # One needle per order of magnitude of matches
+    picked = {}
+    for count, needle in counts:
+        if count:
+            picked.setdefault(len(str(count)), (count, needle))
+    total = db.scalar(select(func.count()).select_from(WeatherRecord))
+
+    print(f"\ncontains, first page of 100 ({total} rows); peak = RSS growth of a fresh process")
+    print(f"{'needle':<12} {'matches':>8}  {'fts + sort ms':>13} {'peak MB':>8}  {'by count ms':>11} {'peak MB':>8}")
+    for count, needle in sorted(picked.values()):
+        always = contains_child(path, needle, "fts", repeat)
+        chosen = contains_child(path, needle, "count", repeat)
+        print(
+            f"{needle:<12} {count:8d}  {always['ms']:13.2f} {always['peak_mb']:8.1f}  "
+            f"{chosen['ms']:11.2f} {chosen['peak_mb']:8.1f}"
+        )
+
+
+def contains_child(path: str, needle: str, plan: str, repeat: int) -> dict:
+    """
+    Run one contains page in its own process, so the SQLite page cache and
+    mmap it touches show up as RSS growth.
+    """
+    output = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.location_search",
+            "--child", needle, "--plan", plan, "--repeat", str(repeat),
+        ],
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def child(needle: str, plan: str, repeat: int):
+    from sqlalchemy import text
+    from config.database import SessionLocal
+    from controllers import weather_record_controller as controller
+
+    if plan == "fts":
+        # Every match loaded and sorted, as before plans were chosen by count
+        controller._use_fts = lambda db, location, match: True
+    db = SessionLocal()
+    db.execute(text("SELECT 1")).all()
+    before = rss_kb("VmRSS")
+    controller.get_weather_record_by_location(db, needle, "contains")
+    peak_mb = (rss_kb("VmHWM") - before) / 1024
+    ms = timed(lambda: controller.get_weather_record_by_location(db, needle, "contains"), repeat)
+    db.close()
+    print(json.dumps({"ms": ms, "peak_mb": peak_mb}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--plan", choices=("fts", "count"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.plan, args.repeat)
+    else:
+        main(args.rows, args.repeat)
@@ -0,0 +1,113 @@
+"""
+Measure what the metrics instrumentation costs.
+
+Requests: the app is served in-process over ASGI with and without
+MetricsMiddleware (same router, same process), alternating for `--rounds`
+rounds and keeping the best time of each, so the difference is the
+middleware and not process-to-process noise.
+
+Statements: `SELECT 1` on an in-memory SQLite engine with and without the
+statement events from instrument_engine, i.e. the floor a real query pays.
+
+    cd backend && python -m benchmarks.metrics_overhead --requests 3000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.response_serialization import call
+from benchmarks.stub_openweather import StubOpenWeather
+
+PATHS = ("/", "/weather?location=Kumasi", "/records?limit=20", "/records/filter?location=accra&limit=20")
+
+
+async def request_costs(requests: int, rounds: int) -> dict:
+    from fastapi import FastAPI
+    from benchmarks.location_search import populate
+    from config.database import engine
+    import main
+
+    populate(engine, 2000, random.Random(3))
+    on = main.app
+    off = FastAPI()
+    off.router = on.router
+    off.user_middleware = [m for m in on.user_middleware if m.cls.__name__ != "MetricsMiddleware"]
+
+    results = {}
+    for path in PATHS:
+        assert await call(on, path, []) == 200, path
+        best = {}
+        for _ in range(rounds):
+            for name, app in (("off", off), ("on", on)):
+                start = time.perf_counter()
+                for _ in range(requests):
+                    await call(app, path, [])
+                elapsed = (time.perf_counter() - start) / requests
+                best[name] = min(best.get(name, elapsed), elapsed)
+        results[path] = best
+    return results
+
+
+def statement_cost(samples: int = 30_000, rounds: int = 3) -> tuple[float, float]:
+    from sqlalchemy import create_engine
+    from utils.metrics import instrument_engine
+
+    connections = {}
+    for instrumented in (False, True):
+        engine = create_engine("sqlite://")
+        if instrumented:
+            instrument_engine(engine, name="bench")
+        connections[instrumented] = engine.connect()
+
+    best = {}
+    for _ in range(rounds):
+        for instrumented, conn in connections.items():
+            start = time.perf_counter()
+            for _ in range(samples):
+                conn.exec_driver_sql("SELECT 1").scalar()
+            elapsed = (time.perf_counter() - start) / samples
+            best[instrumented] = min(best.get(instrumented, elapsed), elapsed)
+    return best[False] * 1e6, best[True] * 1e6
+
+
+def observe_cost(samples: int = 200_000) -> float:
+    from utils.metrics import Histogram, Registry
+
+    histogram = Histogram("bench_seconds", "bench", ("route",), registry=Registry())
+    start = time.perf_counter()
+    for _ in range(samples):
+        histogram.observe(0.003, "/weather")
+    return (time.perf_counter() - start) / samples * 1e9
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp, StubOpenWeather(latency=0) as stub:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        os.environ["OPENWEATHER_BASE_URL"] = stub.base_url
+        os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+        os.environ["PREWARM_ENABLED"] = "false"
+        os.environ["METRICS_ENABLED"] = "true"
+        for path, best in (await request_costs(args.requests, args.rounds)).items():
+            off, on = best["off"] * 1e6, best["on"] * 1e6
+            print(
+                f"{path:<40} without {off:7.1f} us   with middleware {on:7.1f} us   "
+                f"{on - off:+5.1f} us ({on / off - 1:+.1%})"
+            )
+
+    bare, instrumented = statement_cost()
+    print(
+        f"{'SELECT 1 (sqlite memory)':<40} without {bare:7.1f} us   with events     "
+        f"{instrumented:7.1f} us   {instrumented - bare:+5.1f} us"
+    )
+    print(f"Histogram.observe: {observe_cost():.0f} ns")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
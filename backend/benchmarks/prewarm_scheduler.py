@@ -0,0 +1,105 @@
+"""
+Simulate Zipf-distributed weather traffic on a fake clock against the stub
+upstream, with and without the prewarm scheduler, and report how many
+requests for the popular locations hit an expired entry (the first request
+for each location is always cold and is not counted).
+
+    cd backend && python -m benchmarks.prewarm_scheduler --hours 2
+"""
+
+import argparse
+import asyncio
+import random
+
+import httpx
+
+from benchmarks.stub_openweather import StubOpenWeather
+from utils.cache import TTLCache, location_query
+from utils.cache_backends import MemoryCacheBackend
+from utils.prewarm import Prewarmer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+async def simulate(base_url: str, prewarm: bool, args) -> dict:
+    clock = FakeClock()
+    cache = TTLCache(MemoryCacheBackend(4096, clock=clock), "weather", ttl=args.ttl)
+    prewarmer = Prewarmer(
+        top_k=args.top_k,
+        lead=args.lead,
+        interval=args.interval,
+        quota=args.quota,
+        clock=clock,
+        sleep=clock.sleep,
+        rng=random.Random(1),
+    )
+    rng = random.Random(7)
+    cities = [f"City {i}" for i in range(args.cities)]
+    weights = [1 / (rank + 1) for rank in range(args.cities)]
+    top = {location_query(c)[0] for c in cities[: args.top_k]}
+    seen = set()
+    counts = {"requests": 0, "top_requests": 0, "top_misses": 0, "upstream": 0}
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+
+        async def fetch(location):
+            counts["upstream"] += 1
+            return (await client.get("/weather", params={"q": location})).json()
+
+        async def refresh(location):
+            key, _ = location_query(location)
+            await cache.refresh_encoded(key, lambda: fetch(location))
+
+        prewarmer.register("weather", cache, refresh)
+        next_pass = 0.0
+        for second in range(int(args.hours * 3600)):
+            clock.now = max(clock.now, float(second))
+            if prewarm and clock.now >= next_pass:
+                await prewarmer.run_once()
+                next_pass = clock.now + args.interval
+            for location in rng.choices(cities, weights, k=args.rps):
+                key, _ = location_query(location)
+                prewarmer.record("weather", key, location)
+                counts["requests"] += 1
+                if key in top and key in seen:
+                    counts["top_requests"] += 1
+                    counts["top_misses"] += cache.get_encoded(key) is None
+                seen.add(key)
+                await cache.get_or_fetch_encoded(key, lambda: fetch(location))
+    return {**counts, "refreshes": cache.refreshes}
+
+
+async def main(args):
+    with StubOpenWeather(latency=0) as stub:
+        for prewarm in (False, True):
+            r = await simulate(stub.base_url, prewarm, args)
+            label = "prewarm" if prewarm else "no prewarm"
+            print(
+                f"{label:<11} requests {r['requests']:>7}  "
+                f"top-{args.top_k} expired misses {r['top_misses']:>4} "
+                f"({r['top_misses'] / r['top_requests']:.3%})  "
+                f"upstream calls {r['upstream']:>5} (refreshes {r['refreshes']})"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=2)
+    parser.add_argument("--rps", type=int, default=5)
+    parser.add_argument("--cities", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--ttl", type=float, default=600)
+    parser.add_argument("--lead", type=float, default=90)
+    parser.add_argument("--interval", type=float, default=30)
+    parser.add_argument("--quota", type=int, default=30)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+"""
+Statements and wall time per update/delete: the previous ORM path (SELECT,
+setattr, COMMIT, refresh SELECT / SELECT then DELETE) versus single
+UPDATE/DELETE ... RETURNING statements, and N single updates versus one
+bulk PATCH-style statement.
+
+    cd backend && python -m benchmarks.record_mutations --records 2000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+def legacy_update(db, record_id: int, updates: dict):
+    # update_weather_record_controller before RETURNING
+    from models.weather_record import WeatherRecord
+
+    record = db.query(WeatherRecord).filter(WeatherRecord.id == record_id).first()
+    for key, value in updates.items():
+        setattr(record, key, value)
+    db.commit()
+    db.refresh(record)
+    return record
+
+
+def legacy_delete(db, record_id: int):
+    from models.weather_record import WeatherRecord
+
+    record = db.query(WeatherRecord).filter(WeatherRecord.id == record_id).first()
+    db.delete(record)
+    db.commit()
+
+
+def timed_run(engine, Session, fn, items) -> tuple[float, float]:
+    from sqlalchemy import event
+
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    with Session() as db:
+        fn(db, items)
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+    return elapsed, statements
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        os.environ["METRICS_ENABLED"] = "false"
+        from sqlalchemy.orm import sessionmaker
+        from config.database import Base, engine
+        from config.migrations import run_migrations
+        from benchmarks.location_search import populate
+        from controllers.weather_record_controller import (
+            MAX_BULK_CHANGES,
+            bulk_update_weather_records,
+            delete_weather_record_controller,
+            update_weather_record_controller,
+        )
+
+        Base.metadata.create_all(engine)
+        run_migrations(engine)
+        populate(engine, args.records * 4, random.Random(1))
+        Session = sessionmaker(bind=engine, autoflush=False)
+        rng = random.Random(2)
+        n = args.records
+        blocks = [list(range(1 + i * n, 1 + (i + 1) * n)) for i in range(4)]
+
+        cases = (
+            ("update: SELECT + COMMIT + refresh", blocks[0],
+             lambda db, ids: [legacy_update(db, i, {"temp": rng.uniform(0, 40)}) for i in ids]),
+            ("update: UPDATE ... RETURNING", blocks[1],
+             lambda db, ids: [update_weather_record_controller(db, i, {"temp": rng.uniform(0, 40)}) for i in ids]),
+            ("bulk update: one statement", blocks[0][:MAX_BULK_CHANGES],
+             lambda db, ids: bulk_update_weather_records(db, [{"id": i, "temp": rng.uniform(0, 40)} for i in ids])),
+            ("delete: SELECT + DELETE", blocks[2],
+             lambda db, ids: [legacy_delete(db, i) for i in ids]),
+            ("delete: DELETE ... RETURNING", blocks[3],
+             lambda db, ids: [delete_weather_record_controller(db, i) for i in ids]),
+        )
+        for label, ids, fn in cases:
+            elapsed, statements = timed_run(engine, Session, fn, ids)
+            print(
+                f"{label:<36} {len(ids):5d} records  {statements:5d} statements  "
+                f"{elapsed / len(ids) * 1e6:8.1f} us/record"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=2000)
+    main(parser.parse_args())
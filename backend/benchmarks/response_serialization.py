@@ -0,0 +1,104 @@
+"""
+Requests/s on one core for cache-hit /weather and /forecast responses:
+FastAPI's default dict -> response_model validation -> JSON path versus the
+pre-encoded bytes fast path, served in-process over ASGI.
+
+    cd backend && python -m benchmarks.response_serialization --requests 5000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_openweather import StubOpenWeather
+
+
+def legacy_app():
+    from fastapi import FastAPI
+    from controllers.forcast_controller import get_forecast_controller
+    from controllers.weather_controller import get_weather
+    from schemas.forcast_schema import WeeklyForecastResponse
+    from schemas.weather_schema import WeatherResponse
+
+    app = FastAPI()
+
+    @app.get("/weather", response_model=WeatherResponse)
+    async def weather(location: str):
+        return await get_weather(location)
+
+    @app.get("/forecast", response_model=WeeklyForecastResponse)
+    async def forecast(location: str):
+        return await get_forecast_controller(location)
+
+    return app
+
+
+async def call(app, path: str, headers: list) -> int:
+    # Drive the ASGI app directly so client overhead doesn't mask server cost
+    route, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": route,
+        "raw_path": route.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app, path: str, requests: int, headers=None) -> float:
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    assert await call(app, path, raw_headers) in (200, 304)  # warm the cache
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path, raw_headers)
+    return requests / (time.perf_counter() - start)
+
+
+async def run(requests: int):
+    with StubOpenWeather(latency=0) as stub:
+        os.environ["OPENWEATHER_BASE_URL"] = stub.base_url
+        os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+        from fastapi import FastAPI
+        from routes import forcast_route, weather_route
+        from utils.responses import strong_etag
+        from controllers.weather_controller import get_weather_encoded
+
+        fast = FastAPI()
+        fast.include_router(weather_route.router)
+        fast.include_router(forcast_route.router)
+        legacy = legacy_app()
+        etag = strong_etag(await get_weather_encoded("Kumasi"))
+
+        for path in ("/weather?location=Kumasi", "/forecast?location=Kumasi"):
+            before = await measure(legacy, path, requests)
+            after = await measure(fast, path, requests)
+            print(f"{path:<28} default {before:8.0f} req/s   fast path {after:8.0f} req/s ({after / before:.2f}x)")
+        not_modified = await measure(fast, "/weather?location=Kumasi", requests, {"If-None-Match": etag})
+        print(f"{'/weather 304 Not Modified':<28} {not_modified:8.0f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
@@ -0,0 +1,144 @@
+"""
+Retention on a synthetic year of records: time for one compaction pass,
+table sizes before and after, whether /records/stats answers are unchanged,
+and how long long-range stats take over raw rows versus rollups. "raw"
+reads every raw row (STATS_RAW_DAYS=0, as with retention off); "rollups"
+reads the last STATS_RAW_DAYS of raw rows plus the rollups.
+
+    cd backend && python -m benchmarks.retention --rows 500000 --days 400 --cities 20
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+MAINS = ["Clouds", "Rain", "Clear", "Mist", None]
+
+
+def populate(engine, rows: int, days: int, cities: int, now: datetime, rng: random.Random):
+    from benchmarks.location_search import city_names
+    from models.weather_record import normalize_location_name
+
+    cities = city_names(cities, rng)
+    step = days * 86400 / rows
+    start = now - timedelta(days=days)
+    raw = engine.raw_connection()
+    cursor = raw.cursor()
+    batch = []
+    for i in range(rows):
+        city = rng.choice(cities)
+        batch.append(
+            (city, normalize_location_name(city), "GH", rng.choice(MAINS), "x",
+             str(round(rng.uniform(-5, 40), 1)), str(rng.randint(20, 100)),
+             None if rng.random() < 0.05 else str(rng.randint(980, 1040)),
+             str(round(rng.uniform(0, 20), 1)), start + timedelta(seconds=i * step))
+        )
+    cursor.executemany(
+        "INSERT INTO weather_records (location, location_normalized, country, main, "
+        "description, temp, humidity, pressure, wind, saved_on) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        batch,
+    )
+    raw.commit()
+    raw.close()
+
+
+def same(old: list[dict], new: list[dict]) -> bool:
+    # Sums are added in a different order once compacted, so averages may
+    # round differently in the last place
+    if len(old) != len(new):
+        return False
+    for a, b in zip(old, new):
+        for key, value in a.items():
+            if isinstance(value, dict):
+                if {**value, "avg": None} != {**b[key], "avg": None}:
+                    return False
+                if (value["avg"] is None) != (b[key]["avg"] is None):
+                    return False
+                if value["avg"] is not None and abs(value["avg"] - b[key]["avg"]) > 0.011:
+                    return False
+            elif value != b[key]:
+                return False
+    return True
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        os.environ["METRICS_ENABLED"] = "false"
+        from sqlalchemy import func, select
+        from config.database import Base, SessionLocal, engine
+        from config.migrations import run_migrations
+        from controllers import weather_record_controller as controller
+        from models.weather_record import WeatherRecord, WeatherRollupDaily, WeatherRollupHourly
+        from utils.retention import Retention
+
+        now = datetime(2025, 6, 1, 12, 30)
+        Base.metadata.create_all(engine)
+        run_migrations(engine)
+        populate(engine, args.rows, args.days, args.cities, now, random.Random(3))
+
+        def sizes():
+            with engine.connect() as conn:
+                return {
+                    model.__tablename__: conn.execute(select(func.count()).select_from(model)).scalar_one()
+                    for model in (WeatherRecord, WeatherRollupHourly, WeatherRollupDaily)
+                }
+
+        queries = {
+            "day, whole range": {"bucket": "day"},
+            "week, whole range": {"bucket": "week"},
+            "hour, whole range": {"bucket": "hour"},
+            "hour, last 60 days": {"bucket": "hour", "start": now - timedelta(days=60)},
+            "day, last 7 days": {"bucket": "day", "start": now - timedelta(days=7)},
+        }
+
+        def answer():
+            results = {}
+            with SessionLocal() as db:
+                for label, query in queries.items():
+                    start = time.perf_counter()
+                    stats = controller.get_weather_record_stats(db, now=now, **query)
+                    results[label] = (time.perf_counter() - start, stats)
+            return results
+
+        print(f"before: {sizes()}")
+        controller.STATS_RAW_DAYS = 0
+        before = answer()
+        # As with RETENTION_ENABLED and RETENTION_RAW_DAYS=--raw-days
+        controller.STATS_RAW_DAYS = args.raw_days + 1
+        retention = Retention(
+            engine, raw_days=args.raw_days, hourly_days=args.hourly_days, daily_days=0,
+            batch_size=args.batch_size, clock=lambda: now,
+        )
+        start = time.perf_counter()
+        summary = retention.run_once()
+        elapsed = time.perf_counter() - start
+        print(
+            f"retention pass: {elapsed:.1f}s, compacted {summary['compacted_raw']} raw rows "
+            f"and {summary['compacted_hourly']} hourly rollups"
+        )
+        print(f"after:  {sizes()}")
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+        after = answer()
+        for label in queries:
+            (old_time, old), (new_time, new) = before[label], after[label]
+            print(
+                f"stats {label:<19} {len(new):5d} rows  raw {old_time * 1000:7.1f} ms  "
+                f"rollups {new_time * 1000:7.1f} ms  same answers: {same(old, new)}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--days", type=int, default=400)
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--raw-days", type=int, default=30)
+    parser.add_argument("--hourly-days", type=int, default=180)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    main(parser.parse_args())
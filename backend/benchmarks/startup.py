@@ -0,0 +1,86 @@
+"""
+Cold start: a fresh interpreter importing main, running the lifespan
+startup and serving its first requests, as a serverless instance or a new
+container would. Each run is a new process against an existing database;
+the median of `--runs` is reported.
+
+    cd backend && python -m benchmarks.startup --runs 7
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+async def child():
+    start = time.perf_counter()
+    import main
+
+    imported = time.perf_counter()
+    from benchmarks.response_serialization import call
+
+    async with main.lifespan(main.app):
+        started = time.perf_counter()
+        await call(main.app, "/", [])
+        root = time.perf_counter()
+        await call(main.app, "/records?limit=20", [])
+        records = time.perf_counter()
+    print(
+        json.dumps(
+            {
+                "import_ms": (imported - start) * 1000,
+                "lifespan_ms": (started - imported) * 1000,
+                "first_request_ms": (root - started) * 1000,
+                "first_db_request_ms": (records - root) * 1000,
+                "total_ms": (records - start) * 1000,
+            }
+        )
+    )
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "PREWARM_ENABLED": "false",
+            "METRICS_ENABLED": "false",
+        }
+        if args.migrate:
+            # Schema created once up front, as a deploy step would
+            subprocess.run([sys.executable, "migrate.py"], env=env, check=True, capture_output=True)
+        runs = []
+        for _ in range(args.runs + 1):
+            start = time.perf_counter()
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.startup", "--child"],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            result["process_ms"] = (time.perf_counter() - start) * 1000
+            runs.append(result)
+        # The first run also creates the database
+        runs = runs[1:]
+        for key in ("import_ms", "lifespan_ms", "first_request_ms", "first_db_request_ms", "total_ms", "process_ms"):
+            print(f"{key:<22} {statistics.median(r[key] for r in runs):8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--migrate", action="store_true", help="Run migrate.py once before measuring")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child())
+    else:
+        main(args)
@@ -0,0 +1,196 @@
+"""
+Minimal local stand-in for the OpenWeather API, used by the benchmarks.
+
+Serves canned `/weather` and `/forecast` payloads over HTTP/1.1 keep-alive
+with a configurable artificial latency (plus jitter), so runs need no
+network access. `error_rate` fails that fraction of requests with
+`error_status`; `forecast_slots` and `pad_bytes` control payload size.
+Set `fail_status` (and optionally `retry_after`) on a running stub to
+simulate an outage or rate limiting.
+
+    cd backend && python -m benchmarks.stub_openweather --port 8090 --latency 0.05 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+WEATHER_PAYLOAD = {
+    "coord": {"lon": -1.6244, "lat": 6.6885},
+    "weather": [
+        {"id": 804, "main": "Clouds", "description": "overcast clouds", "icon": "04d"}
+    ],
+    "main": {"temp": 25.6, "humidity": 81, "pressure": 1014},
+    "visibility": 10000,
+    "wind": {"speed": 1.78},
+    "dt": 1760000000,
+    "sys": {"country": "GH", "sunrise": 1759989600, "sunset": 1760032440},
+    "timezone": 0,
+    "name": "Kumasi",
+}
+
+
+def forecast_payload(slots: int = 40, start: int = 1760000000) -> dict:
+    mains = ["Clouds", "Rain", "Clear"]
+    return {
+        "list": [
+            {
+                "dt": start + i * 3 * 3600,
+                "main": {"temp": 22 + (i % 8)},
+                "weather": [
+                    {
+                        "main": mains[i % 3],
+                        "description": f"{mains[i % 3].lower()} sky",
+                        "icon": f"0{i % 3 + 1}d",
+                    }
+                ],
+            }
+            for i in range(slots)
+        ],
+        "city": {"name": "Kumasi", "country": "GH", "timezone": 0},
+    }
+
+
+class StubOpenWeather:
+    """
+    Run the stub server on a background thread:
+
+        with StubOpenWeather(latency=0.05) as stub:
+            os.environ["OPENWEATHER_BASE_URL"] = stub.base_url
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        forecast_slots: int = 40,
+        pad_bytes: int = 0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self.fail_status = None
+        self.retry_after = None
+        self._rng = random.Random(seed)
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+        weather, forecast = dict(WEATHER_PAYLOAD), forecast_payload(forecast_slots)
+        if pad_bytes:
+            # Ignored by the formatters; only grows what is sent and parsed
+            weather["padding"] = forecast["padding"] = "x" * pad_bytes
+        self._bodies = {
+            "/weather": json.dumps(weather).encode(),
+            "/forecast": json.dumps(forecast).encode(),
+        }
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b""):
+                    pass
+                path = request_line.split(b" ")[1].split(b"?")[0].decode()
+                self.requests += 1
+                delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+                if delay:
+                    await asyncio.sleep(delay)
+                endpoint = "/" + path.rstrip("/").rsplit("/", 1)[-1]
+                body = self._bodies.get(endpoint)
+                status = b"200 OK" if body else b"404 Not Found"
+                body = body or b'{"cod":"404","message":"not found"}'
+                extra = b""
+                fail_status = self.fail_status
+                if not fail_status and self.error_rate and self._rng.random() < self.error_rate:
+                    fail_status = self.error_status
+                if fail_status:
+                    self.errors += 1
+                    status = str(fail_status).encode() + b" Unavailable"
+                    body = b'{"cod":"%d","message":"unavailable"}' % fail_status
+                    if self.retry_after is not None:
+                        extra = b"Retry-After: " + str(self.retry_after).encode() + b"\r\n"
+                writer.write(
+                    b"HTTP/1.1 " + status + b"\r\n"
+                    b"Content-Type: application/json\r\n" + extra +
+                    b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return self
+
+    async def _shutdown(self):
+        self._server.close()
+        handlers = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--forecast-slots", type=int, default=40)
+    parser.add_argument("--pad-bytes", type=int, default=0)
+    args = parser.parse_args()
+    stub = StubOpenWeather(
+        latency=args.latency,
+        port=args.port,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        forecast_slots=args.forecast_slots,
+        pad_bytes=args.pad_bytes,
+    )
+    with stub:
+        print(f"Stub OpenWeather listening on {stub.base_url}")
+        while True:
+            time.sleep(3600)
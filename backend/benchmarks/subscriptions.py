@@ -0,0 +1,90 @@
+"""
+Live weather subscriptions: memory per idle SSE connection, time to fan
+one change out to every subscriber, and requests per hour compared with
+each client polling /weather.
+
+    cd backend && python -m benchmarks.subscriptions --connections 5000 --locations 50
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_openweather import StubOpenWeather
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def run(args):
+    from controllers.weather_controller import open_weather_stream, subscriptions
+
+    locations = [f"{5 + i * 0.1:.2f},{-1 - i * 0.1:.2f}" for i in range(args.locations)]
+    received = [0] * args.connections
+
+    async def consume(number: int, events):
+        async for frame in events:
+            if frame.startswith(b"event: weather"):
+                received[number] += 1
+
+    for location in locations:
+        # Warm the cache so only the subscription itself is measured
+        await subscriptions.fetch(location)
+    before = rss_mb()
+    start = time.perf_counter()
+    consumers = []
+    for i in range(args.connections):
+        events = await open_weather_stream([locations[i % len(locations)]])
+        consumers.append(asyncio.create_task(consume(i, events)))
+    while sum(received) < args.connections:
+        await asyncio.sleep(0.01)
+    opened = time.perf_counter() - start
+    per_connection = (rss_mb() - before) * 1024 / args.connections
+    print(
+        f"{args.connections} connections on {len(locations)} locations: opened in {opened:.2f}s, "
+        f"{per_connection:.1f} KB each"
+    )
+
+    start = time.perf_counter()
+    for topic in list(subscriptions._topics.values()):
+        # As the refresh loops would on a new reading
+        if topic.update(topic.payload.replace(b"25.6", b"31.5")):
+            subscriptions._publish(topic)
+    while sum(received) < 2 * args.connections:
+        await asyncio.sleep(0)
+    fanout = time.perf_counter() - start
+    print(
+        f"one change to every subscriber: {fanout * 1000:.1f} ms "
+        f"({fanout / args.connections * 1e6:.1f} us each)"
+    )
+
+    polled = args.connections * 3600 / args.poll_seconds
+    refreshes = len(locations) * 3600 / subscriptions.interval
+    print(
+        f"per hour: {polled:.0f} /weather requests polling every {args.poll_seconds:g}s vs "
+        f"{refreshes:.0f} cache reads from {len(locations)} refresh loops"
+    )
+    await subscriptions.stop()
+    await asyncio.gather(*consumers, return_exceptions=True)
+
+
+def main(args):
+    with StubOpenWeather(latency=0) as stub:
+        os.environ["OPENWEATHER_BASE_URL"] = stub.base_url
+        os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+        os.environ["SUBSCRIBE_MAX_CONNECTIONS"] = str(args.connections)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--poll-seconds", type=float, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,369 @@
+"""
+Reproducible load test: the API against the local OpenWeather stub and a
+synthetic database, with no network access. Each scenario runs in its own
+process (so peak RSS is per scenario) with closed-loop clients driving
+the app in-process over ASGI for a fixed time. Throughput, latency
+percentiles and peak RSS go to a JSON report; pass an earlier report as
+`--compare` to see what moved between two commits.
+
+    cd backend && python -m benchmarks.suite --rows 1M --out before.json
+    git checkout feature && python -m benchmarks.suite --rows 1M --compare before.json
+
+The dataset is keyed by row count and seed and reused from `--data-dir`
+when present, so both runs read identical rows. /weather and /forecast
+caches are primed with every location in the pool before timing; the
+app's own settings (UPSTREAM_RATE, WEATHER_CACHE_TTL...) are taken from
+the environment as usual.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+from benchmarks.datagen import cities, generate, parse_rows
+from benchmarks.stub_openweather import StubOpenWeather
+
+SCENARIOS = ("weather", "forecast", "records", "records_filter", "records_export")
+# Lower is better for these; everything else in a scenario result is context
+COMPARED = {"throughput_rps": -1, "p50_ms": 1, "p95_ms": 1, "p99_ms": 1, "peak_rss_mb": 1}
+
+
+async def request(app, path: str) -> tuple[int, bytes]:
+    # Like response_serialization.call, but keeps the body for cursors and byte counts
+    route, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": route,
+        "raw_path": route.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+    status = 0
+    chunks = []
+    received = False
+    finished = asyncio.Event()
+
+    async def receive():
+        # Then block until the response is done, as a server would; streaming
+        # responses poll this for a disconnect and would otherwise spin
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss survives exec on Linux, so a child would report the parent's
+    # peak (e.g. from generating the dataset); VmHWM starts fresh
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Scenario:
+    """
+    Hands out the next path for a client; `seen` lets paginated scenarios
+    follow the cursor in the response they just got.
+    """
+
+    def __init__(self, name: str, args):
+        rng = random.Random(args.seed)
+        self.name = name
+        self.rng = rng
+        self.cursors = {}
+        if name in ("weather", "forecast"):
+            self.locations = args.locations or [
+                f"{rng.uniform(-60, 70):.4f},{rng.uniform(-180, 180):.4f}"
+                for _ in range(args.location_pool)
+            ]
+        if name == "records_filter":
+            names = cities(args.cities, args.seed)
+            self.terms = [name[: rng.randint(2, 4)] for name in names]
+
+    def prime_paths(self) -> list[str]:
+        # Every location once, so the timed phase sees steady-state caches
+        if self.name in ("weather", "forecast"):
+            return [f"/{self.name}?location={quote(location)}" for location in self.locations]
+        return []
+
+    def next_path(self, client: int) -> str:
+        if self.name in ("weather", "forecast"):
+            return f"/{self.name}?location={quote(self.rng.choice(self.locations))}"
+        if self.name == "records":
+            cursor = self.cursors.get(client)
+            return f"/records?limit=100&cursor={cursor}" if cursor else "/records?limit=100"
+        if self.name == "records_filter":
+            match = self.rng.choice(("prefix", "contains"))
+            term = quote(self.rng.choice(self.terms))
+            return f"/records/filter?location={term}&match={match}&limit=100"
+        return "/records/export?format=csv"
+
+    def seen(self, client: int, body: bytes):
+        if self.name == "records":
+            self.cursors[client] = json.loads(body).get("next_cursor")
+
+
+async def run_scenario(name: str, args) -> dict:
+    import main
+
+    scenario = Scenario(name, args)
+    concurrency = 1 if name == "records_export" else args.concurrency
+    latencies = []
+    errors = 0
+    received = 0
+
+    async def client(number: int, deadline: float):
+        nonlocal errors, received
+        # At least one request each, so slow scenarios still report something
+        while not latencies or time.perf_counter() < deadline:
+            path = scenario.next_path(number)
+            start = time.perf_counter()
+            status, body = await request(main.app, path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            received += len(body)
+            if status >= 400:
+                errors += 1
+            else:
+                scenario.seen(number, body)
+
+    async with main.lifespan(main.app):
+        paths = scenario.prime_paths()
+        for i in range(0, len(paths), concurrency):
+            await asyncio.gather(*(request(main.app, path) for path in paths[i : i + concurrency]))
+        # Warm-up: first-request route setup, connection pools
+        warmup = time.perf_counter() + args.warmup
+        await asyncio.gather(*(client(i, warmup) for i in range(concurrency)))
+        latencies.clear()
+        errors = received = 0
+        started = time.perf_counter()
+        deadline = started + args.seconds
+        await asyncio.gather(*(client(i, deadline) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(ordered) / elapsed, 1),
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+        "mb_per_s": round(received / elapsed / 1e6, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def git_revision() -> dict:
+    def git(*command):
+        return subprocess.run(["git", *command], capture_output=True, text=True).stdout.strip()
+
+    return {
+        "commit": git("rev-parse", "HEAD") or None,
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def dataset(args, data_dir: str) -> tuple[str, float | None]:
+    """
+    Path of the database for `--rows`/`--seed`, generated on first use.
+    Returns the generation time in seconds, or None when reused.
+    """
+    from sqlalchemy import func, select
+    from config.database import create_db_engine
+    from models.weather_record import WeatherRecord
+
+    path = os.path.join(data_dir, f"weather_{args.rows}_{args.seed}_{args.cities}.db")
+    url = f"sqlite:///{path}"
+    engine = create_db_engine(url)
+    try:
+        if os.path.exists(path):
+            with engine.connect() as conn:
+                if conn.scalar(select(func.count()).select_from(WeatherRecord.__table__)) == args.rows:
+                    return url, None
+            engine.dispose()
+            os.remove(path)
+            engine = create_db_engine(url)
+        return url, round(generate(engine, args.rows, args.seed, args.cities), 1)
+    finally:
+        engine.dispose()
+
+
+def run(args) -> dict:
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="weather-bench-")
+    os.makedirs(data_dir, exist_ok=True)
+    url, generated = dataset(args, data_dir)
+    stub = StubOpenWeather(
+        latency=args.stub_latency,
+        jitter=args.stub_jitter,
+        error_rate=args.stub_error_rate,
+        forecast_slots=args.stub_forecast_slots,
+        pad_bytes=args.stub_pad_bytes,
+        seed=args.seed,
+    )
+    report = {
+        "meta": {
+            **git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "dataset_seconds": generated,
+            "params": {
+                key: value
+                for key, value in vars(args).items()
+                if key not in ("out", "compare", "child", "data_dir", "only_compare", "threshold", "min_delta_ms")
+            },
+        },
+        "scenarios": {},
+    }
+    with stub:
+        env = {
+            **os.environ,
+            "DATABASE_URL": url,
+            "OPENWEATHER_BASE_URL": stub.base_url,
+            "OPENWEATHER_API_KEY": "benchmark",
+            "PREWARM_ENABLED": "false",
+            "RETENTION_ENABLED": "false",
+            "DB_MIGRATE_ON_STARTUP": "false",
+        }
+        child_args = [
+            f"--seconds={args.seconds}",
+            f"--warmup={args.warmup}",
+            f"--concurrency={args.concurrency}",
+            f"--seed={args.seed}",
+            f"--cities={args.cities}",
+            f"--location-pool={args.location_pool}",
+            *(f"--locations={location}" for location in args.locations),
+        ]
+        for name in args.scenarios:
+            upstream = stub.requests
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.suite", f"--child={name}", *child_args],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            result["upstream_requests"] = stub.requests - upstream
+            report["scenarios"][name] = result
+            print(
+                f"{name:<15} {result['throughput_rps']:9.1f} req/s  p50 {result['p50_ms']:8.2f}  "
+                f"p95 {result['p95_ms']:8.2f}  p99 {result['p99_ms']:8.2f} ms  "
+                f"rss {result['peak_rss_mb']:6.1f} MB  errors {result['errors']}"
+            )
+    return report
+
+
+def compare(report: dict, baseline: dict, threshold: float, min_delta_ms: float = 1.0) -> list[str]:
+    """
+    Print the change in each compared metric and return the ones that got
+    worse by more than `threshold` percent. Latency changes under
+    `min_delta_ms` are never flagged; sub-millisecond tails are mostly noise.
+    """
+    regressions = []
+    print(f"\nvs {(baseline['meta'].get('commit') or 'baseline')[:12]}")
+    for name, result in report["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            continue
+        changes = []
+        for metric, direction in COMPARED.items():
+            if not before.get(metric):
+                continue
+            delta = (result[metric] - before[metric]) / before[metric] * 100
+            changes.append(f"{metric} {delta:+.1f}%")
+            if metric.endswith("_ms") and abs(result[metric] - before[metric]) < min_delta_ms:
+                continue
+            if delta * direction > threshold:
+                regressions.append(f"{name}.{metric}")
+        print(f"{name:<15} " + "  ".join(changes))
+    if regressions:
+        print(f"regressed by more than {threshold:g}%: {', '.join(regressions)}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=parse_rows, default="10k", help="Dataset size, e.g. 10k, 1M, 10M")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cities", type=int, default=500)
+    parser.add_argument("--data-dir", help="Where generated databases are kept and reused")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--locations", action="append", default=[], help="Location names; default random coordinates")
+    parser.add_argument("--location-pool", type=int, default=50)
+    parser.add_argument("--stub-latency", type=float, default=0.05)
+    parser.add_argument("--stub-jitter", type=float, default=0.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-forecast-slots", type=int, default=40)
+    parser.add_argument("--stub-pad-bytes", type=int, default=0)
+    parser.add_argument("--out", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Earlier JSON report to diff against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold, percent")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore smaller latency changes")
+    parser.add_argument("--only-compare", help="Diff this report against --compare without running")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_scenario(args.child, args))))
+        sys.exit(0)
+    if args.only_compare:
+        with open(args.only_compare) as f:
+            report = json.load(f)
+    else:
+        report = run(args)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        sys.exit(1 if compare(report, baseline, args.threshold, args.min_delta_ms) else 0)
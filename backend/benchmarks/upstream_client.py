@@ -0,0 +1,58 @@
+"""
+Compare the old blocking `requests.get` controller with the pooled async
+client under concurrency, against the local OpenWeather stub.
+
+    cd backend && python -m benchmarks.upstream_client --concurrency 50
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_openweather import StubOpenWeather
+
+
+async def blocking_get_weather(base_url: str, location: str):
+    # The pre-pooling controller: a sync call inside an async function
+    import requests
+
+    res = requests.get(f"{base_url}/weather?q={location}&appid=x&units=metric", timeout=10)
+    return res.json()
+
+
+async def run(concurrency: int, rounds: int, latency: float):
+    with StubOpenWeather(latency=latency) as stub:
+        os.environ["OPENWEATHER_BASE_URL"] = stub.base_url
+        os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+        from config.http_client import close_http_client
+        from controllers.weather_controller import get_weather
+
+        results = {}
+        for name, call in (
+            ("blocking requests.get", lambda: blocking_get_weather(stub.base_url, "Kumasi")),
+            ("pooled httpx client", lambda: get_weather("Kumasi")),
+        ):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                await asyncio.gather(*(call() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+            results[name] = elapsed
+            print(
+                f"{name:<24} {concurrency * rounds} requests in {elapsed:.2f}s "
+                f"({concurrency * rounds / elapsed:.0f} req/s)"
+            )
+        await close_http_client()
+
+    serial = concurrency * rounds * latency
+    print(f"fully serialized lower bound: {serial:.2f}s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.rounds, args.latency))
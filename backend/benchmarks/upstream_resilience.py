@@ -0,0 +1,97 @@
+"""
+Replay traffic through an upstream outage (the stub answers 503 for a
+while, then recovers) and compare the old pass-through behaviour with the
+rate-limited, retried, circuit-broken path with stale fallback.
+
+Reports how many requests reached the upstream during the outage, how many
+clients got an error and how many were answered from the stale copy.
+
+    cd backend && python -m benchmarks.upstream_resilience
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_openweather import StubOpenWeather
+
+
+async def replay(stub, controller, args) -> dict:
+    from fastapi import HTTPException
+    from utils.cache import cache_backend, stale_backend
+
+    locations = [f"City {i}" for i in range(args.locations)]
+    cache_backend.clear()
+    stale_backend.clear()
+    stub.fail_status = None
+    await asyncio.gather(*(controller.get_weather_encoded(loc) for loc in locations))
+    await asyncio.sleep(controller.weather_cache.ttl)
+
+    counts = {"errors": 0, "ok": 0}
+
+    async def call(location):
+        try:
+            await controller.get_weather_encoded(location)
+            counts["ok"] += 1
+        except HTTPException:
+            counts["errors"] += 1
+
+    stub.fail_status = 503
+    before = stub.requests
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        await asyncio.gather(*(call(loc) for loc in locations))
+        await asyncio.sleep(args.pause)
+    elapsed = time.perf_counter() - start
+    return {
+        **counts,
+        "upstream_requests": stub.requests - before,
+        "stale_served": controller.weather_cache.stale_served,
+        "elapsed": elapsed,
+    }
+
+
+async def main(args):
+    with StubOpenWeather(latency=args.latency) as stub:
+        os.environ["OPENWEATHER_BASE_URL"] = stub.base_url
+        os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+        os.environ["WEATHER_CACHE_TTL"] = "0.2"
+        os.environ["PREWARM_ENABLED"] = "false"
+        os.environ.setdefault("UPSTREAM_RATE", "200")
+        os.environ.setdefault("UPSTREAM_BURST", str(args.locations))
+        from controllers import weather_controller
+        from utils import upstream as upstream_module
+        from utils.upstream import CircuitBreaker, RetryBudget, TokenBucket, Upstream
+
+        resilient = weather_controller.upstream
+        # Old behaviour: no limiter, no retries, no breaker, no stale copy
+        passthrough = Upstream(
+            limiter=TokenBucket(rate=1e9, burst=1e9, max_wait=0),
+            budget=RetryBudget(0, 0, 0),
+            breaker=CircuitBreaker(threshold=10**9, cooldown=0),
+            max_retries=0,
+        )
+        for label, client, stale_ttl in (
+            ("pass-through", passthrough, None),
+            ("resilient", resilient, weather_controller.weather_cache.stale_ttl),
+        ):
+            weather_controller.upstream = client
+            weather_controller.weather_cache.stale_ttl = stale_ttl
+            weather_controller.weather_cache.stale_served = 0
+            r = await replay(stub, weather_controller, args)
+            print(
+                f"{label:<13} upstream requests {r['upstream_requests']:>5}  "
+                f"errors {r['errors']:>5}  stale served {r['stale_served']:>5}  "
+                f"({r['elapsed']:.2f}s)"
+            )
+        print(f"breaker: {upstream_module.upstream.breaker.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--pause", type=float, default=0.05)
+    parser.add_argument("--latency", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
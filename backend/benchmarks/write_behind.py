@@ -0,0 +1,113 @@
+"""
+Sustained POST /records/save throughput on SQLite: one transaction per
+request (sync and DB_ASYNC engines) versus the write-behind group commit
+with either ack mode.
+
+Each mode runs in its own process, since settings are read at import
+time, on a fresh database, with `--clients` concurrent clients saving for
+`--seconds`. After the lifespan shuts down the rows in the table are
+counted, so saves acknowledged on enqueue are checked to have been
+flushed.
+
+    cd backend && python -m benchmarks.write_behind --clients 100 --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.async_records import SAVE_BODY, post
+
+MODES = {
+    "per-request": {"WRITE_BEHIND_ENABLED": "false"},
+    "per-request async": {"WRITE_BEHIND_ENABLED": "false", "DB_ASYNC": "true"},
+    "group, ack commit": {"WRITE_BEHIND_ENABLED": "true", "WRITE_BEHIND_ACK": "commit"},
+    "group, ack enqueue": {"WRITE_BEHIND_ENABLED": "true", "WRITE_BEHIND_ACK": "enqueue"},
+}
+
+
+async def child(clients: int, seconds: float):
+    import main
+    from sqlalchemy import func, select
+    from config.database import engine
+    from models.weather_record import WeatherRecord
+    from utils.write_behind import record_writer
+
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = await post(main.app, "/records/save", SAVE_BODY)
+            latencies.append(time.perf_counter() - start)
+            if status not in (200, 202):
+                errors += 1
+
+    async with main.lifespan(main.app):
+        start = time.perf_counter()
+        deadline = start + seconds
+        await asyncio.gather(*(client() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    with engine.connect() as conn:
+        stored = conn.scalar(select(func.count()).select_from(WeatherRecord.__table__))
+    latencies.sort()
+    print(
+        json.dumps(
+            {
+                "saves_per_s": len(latencies) / elapsed,
+                "p50_ms": latencies[len(latencies) // 2] * 1000,
+                "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+                "acked": len(latencies) - errors,
+                "stored": stored,
+                "errors": errors,
+                "avg_flush": record_writer.stats()["avg_flush"],
+            }
+        )
+    )
+
+
+def main(args):
+    print(f"{'mode':<20} {'saves/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'rows/commit':>11}  acked/stored")
+    for name, settings in MODES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ,
+                **settings,
+                "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+                "PREWARM_ENABLED": "false",
+                "METRICS_ENABLED": "false",
+            }
+            output = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.write_behind", "--child",
+                    "--clients", str(args.clients), "--seconds", str(args.seconds),
+                ],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{name:<20} {r['saves_per_s']:9.0f} {r['p50_ms']:8.1f} {r['p99_ms']:8.1f} "
+            f"{r['avg_flush'] or 1:11.1f}  {r['acked']}/{r['stored']}"
+            + (f"  ({r['errors']} errors)" if r["errors"] else "")
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child(args.clients, args.seconds))
+    else:
+        main(args)
@@ -1,17 +1,172 @@
-from sqlalchemy import create_engine
-from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from config.settings import env, env_bool, env_float, env_int
 from sqlalchemy.orm import sessionmaker, declarative_base
-import os
+from utils.metrics import instrument_engine
 
 # SQLite URL
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./backend/local.db")
+DATABASE_URL = env("DATABASE_URL", "sqlite:///./backend/local.db")
+# Optional read replica; read-only routes use it when set
+DATABASE_READ_URL = env("DATABASE_READ_URL")
 
-# Only pass SQLite-specific args if using SQLite
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)  # PostgreSQL does NOT need connect_args
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT = env_float("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+DB_QUERY_CACHE_SIZE = env_int("DB_QUERY_CACHE_SIZE", 1200)
+
+SQLITE_SYNCHRONOUS = env("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+# Negative values are KiB, so -65536 is a 64 MiB page cache per connection
+SQLITE_CACHE_SIZE = env_int("SQLITE_CACHE_SIZE", -65536)
+SQLITE_BUSY_TIMEOUT = env_int("SQLITE_BUSY_TIMEOUT", 5000)
+
+# psycopg 3 prepares a statement server-side after this many executions
+PG_PREPARE_THRESHOLD = env_int("PG_PREPARE_THRESHOLD", 5)
+# Driver for PostgreSQL URLs that don't name one (SQLAlchemy would pick psycopg2)
+PG_DEFAULT_DRIVER = "psycopg"
+
+# Serve the records API from an asyncio engine (aiosqlite / asyncpg)
+# instead of sync sessions in the threadpool
+DB_ASYNC = env_bool("DB_ASYNC", False)
+# backend -> async driver used when DATABASE_URL names a sync one
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.close()
+
+
+def _engine_options(url) -> dict:
+    """
+    create_engine keyword arguments for `url`: statement cache, connect
+    args and, except for in-memory SQLite, the configured pool.
+    """
+    options = {"query_cache_size": DB_QUERY_CACHE_SIZE}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            return options
+    elif url.get_driver_name() == "psycopg":
+        options["connect_args"] = {"prepare_threshold": PG_PREPARE_THRESHOLD}
+
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    return options
+
+
+def sync_database_url(url: str):
+    """
+    `url` with PG_DEFAULT_DRIVER filled in for a plain postgresql:// URL,
+    so PG_PREPARE_THRESHOLD and COPY use psycopg 3. Explicit drivers are kept.
+    """
+    parsed = make_url(url)
+    if parsed.drivername == "postgresql":
+        return parsed.set(drivername=f"postgresql+{PG_DEFAULT_DRIVER}")
+    return parsed
+
+
+def create_db_engine(url: str):
+    """
+    Engine for `url` with pool, statement cache and dialect settings from
+    the environment.
+
+    SQLite file databases get WAL, synchronous/mmap/cache pragmas and a busy
+    timeout on every new connection; in-memory SQLite keeps SQLAlchemy's
+    single-connection pool. PostgreSQL uses psycopg 3 unless the URL names
+    another driver, and prepares hot statements server-side.
+    """
+    parsed = sync_database_url(url)
+    engine = create_engine(parsed, **_engine_options(parsed))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _sqlite_pragmas)
+    return engine
+
+
+def async_database_url(url: str):
+    """
+    `url` with its driver swapped for an asyncio one (ASYNC_DRIVERS);
+    drivers that are already async, including psycopg 3, are kept.
+    """
+    parsed = make_url(url)
+    # The driver named in the URL; the implied default differs between
+    # SQLAlchemy versions
+    if parsed.drivername.partition("+")[2] in ("aiosqlite", "asyncpg", "psycopg"):
+        return parsed
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}'")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def create_async_db_engine(url: str):
+    """
+    Async counterpart of create_db_engine, with the same pool and dialect
+    settings.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    parsed = async_database_url(url)
+    engine = create_async_engine(parsed, **_engine_options(parsed))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _sqlite_pragmas)
+    return engine
+
+
+engine = create_db_engine(DATABASE_URL)
+read_engine = create_db_engine(DATABASE_READ_URL) if DATABASE_READ_URL else engine
+
+DIALECT = engine.dialect.name
+instrument_engine(engine)
+if read_engine is not engine:
+    instrument_engine(read_engine, name="replica")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Read-only sessions: nothing to flush, and loaded rows stay usable after
+# the request's session is closed
+ReadSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine
+)
+
+# Async engines and sessions exist only with DB_ASYNC, so the async drivers
+# stay optional otherwise
+async_engine = async_read_engine = AsyncSessionLocal = AsyncReadSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_async_db_engine(DATABASE_URL)
+    async_read_engine = (
+        create_async_db_engine(DATABASE_READ_URL) if DATABASE_READ_URL else async_engine
+    )
+    instrument_engine(async_engine.sync_engine, name="primary_async")
+    if async_read_engine is not async_engine:
+        instrument_engine(async_read_engine.sync_engine, name="replica_async")
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+async def dispose_async_engines():
+    """
+    Close pooled async connections; called on application shutdown.
+    """
+    for async_db_engine in {async_engine, async_read_engine} - {None}:
+        await async_db_engine.dispose()
+
+
 Base = declarative_base()
@@ -0,0 +1,67 @@
+from typing import TYPE_CHECKING
+from config.settings import env, env_float, env_int
+
+OPENWEATHER_BASE_URL = env(
+    "OPENWEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5"
+)
+HTTP_MAX_CONNECTIONS = env_int("HTTP_MAX_CONNECTIONS", 100)
+HTTP_MAX_KEEPALIVE = env_int("HTTP_MAX_KEEPALIVE", 20)
+HTTP_KEEPALIVE_EXPIRY = env_float("HTTP_KEEPALIVE_EXPIRY", 30)
+HTTP_CONNECT_TIMEOUT = env_float("HTTP_CONNECT_TIMEOUT", 3)
+HTTP_TIMEOUT = env_float("HTTP_TIMEOUT", 10)
+
+if TYPE_CHECKING:
+    import httpx
+
+# httpx and its TLS context load on the first upstream call, not at startup
+_client: "httpx.AsyncClient | None" = None
+
+
+def http2_available() -> bool:
+    """
+    HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 keep-alive.
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_http_client() -> "httpx.AsyncClient":
+    """
+    Build the pooled client shared by every upstream call.
+    """
+    import httpx
+
+    return httpx.AsyncClient(
+        base_url=OPENWEATHER_BASE_URL,
+        http2=http2_available(),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """
+    Return the shared client, creating it on first use when the app
+    lifespan has not started it (e.g. scripts or serverless handlers).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client():
+    """
+    Close the shared client and release its pooled connections.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,274 @@
+from sqlalchemy import (
+    Column,
+    MetaData,
+    String,
+    Table,
+    bindparam,
+    delete,
+    insert,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.engine import Engine
+from config.database import Base
+from config.settings import env_bool
+import hashlib
+
+MIGRATION_BATCH_SIZE = 5000
+# Run migrate() in the app lifespan; turn off when a deploy step runs migrate.py
+DB_MIGRATE_ON_STARTUP = env_bool("DB_MIGRATE_ON_STARTUP", True)
+# Bump when a data migration changes without a model change
+SCHEMA_REVISION = 1
+
+# Fingerprint of the models the database was last migrated to; kept out of
+# Base.metadata so it isn't part of the fingerprint itself
+_state_metadata = MetaData()
+schema_state = Table(
+    "schema_state", _state_metadata, Column("fingerprint", String(64), primary_key=True)
+)
+# Measurements that used to be stored as display strings ("25.6 °C")
+LEGACY_MEASUREMENT_COLUMNS = ("temp", "humidity", "pressure", "wind")
+
+
+def add_missing_columns(engine: Engine):
+    """
+    `create_all` never alters existing tables; add model columns that an
+    older database is missing. New columns are always nullable.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
+                )
+
+
+def create_missing_indexes(engine: Engine):
+    """
+    `create_all` only indexes tables it creates; add indexes declared on
+    the models afterwards to databases that already exist.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def backfill_location_normalized(engine: Engine):
+    """
+    Fill `location_normalized` for rows saved before the column existed.
+    """
+    from models.weather_record import WeatherRecord, normalize_location_name
+
+    table = WeatherRecord.__table__
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(table.c.id, table.c.location)
+                .where(table.c.location_normalized.is_(None))
+                .where(table.c.location.is_not(None))
+                .limit(MIGRATION_BATCH_SIZE)
+            ).all()
+            if not rows:
+                return
+            conn.execute(
+                update(table)
+                .where(table.c.id == bindparam("row_id"))
+                .values(location_normalized=bindparam("normalized")),
+                [
+                    {"row_id": row.id, "normalized": normalize_location_name(row.location)}
+                    for row in rows
+                ],
+            )
+
+
+def rename_legacy_measurement_columns(engine: Engine):
+    """
+    Move string-typed measurement columns aside as `<name>_legacy` so the
+    float columns can be added under the original names.
+    """
+    inspector = inspect(engine)
+    if "weather_records" not in inspector.get_table_names():
+        return
+    columns = {c["name"]: c["type"] for c in inspector.get_columns("weather_records")}
+    with engine.begin() as conn:
+        for name in LEGACY_MEASUREMENT_COLUMNS:
+            if isinstance(columns.get(name), String) and f"{name}_legacy" not in columns:
+                conn.execute(
+                    text(f"ALTER TABLE weather_records RENAME COLUMN {name} TO {name}_legacy")
+                )
+
+
+def convert_legacy_measurements(engine: Engine):
+    """
+    Parse `<name>_legacy` strings into the float columns in id-ordered
+    batches, then drop the legacy columns. Safe to resume if interrupted.
+    """
+    from utils.formatters import parse_measurement
+
+    columns = {c["name"] for c in inspect(engine).get_columns("weather_records")}
+    legacy = [name for name in LEGACY_MEASUREMENT_COLUMNS if f"{name}_legacy" in columns]
+    if not legacy:
+        return
+
+    select_columns = ", ".join(f"{name}_legacy" for name in legacy)
+    assignments = ", ".join(f"{name} = :{name}" for name in legacy)
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    f"SELECT id, {select_columns} FROM weather_records "
+                    "WHERE id > :last_id ORDER BY id LIMIT :limit"
+                ),
+                {"last_id": last_id, "limit": MIGRATION_BATCH_SIZE},
+            ).all()
+            if not rows:
+                break
+            conn.execute(
+                text(f"UPDATE weather_records SET {assignments} WHERE id = :row_id"),
+                [
+                    {
+                        "row_id": row[0],
+                        **{
+                            name: parse_measurement(value)
+                            for name, value in zip(legacy, row[1:])
+                        },
+                    }
+                    for row in rows
+                ],
+            )
+            last_id = rows[-1][0]
+
+    with engine.begin() as conn:
+        for name in legacy:
+            conn.execute(text(f"ALTER TABLE weather_records DROP COLUMN {name}_legacy"))
+
+
+def create_search_indexes(engine: Engine):
+    """
+    Substring search support for `location_normalized`: a pg_trgm GIN index
+    plus a pattern-ops B-tree for prefixes on PostgreSQL, or an FTS5 trigram
+    table kept in sync by triggers on SQLite.
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_weather_records_location_trgm "
+                    "ON weather_records USING gin (location_normalized gin_trgm_ops)"
+                )
+            )
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_weather_records_location_prefix "
+                    "ON weather_records (location_normalized text_pattern_ops)"
+                )
+            )
+    elif engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = 'weather_records_fts'")
+            ).first()
+            if exists:
+                return
+            try:
+                conn.execute(
+                    text(
+                        "CREATE VIRTUAL TABLE weather_records_fts USING fts5("
+                        "location_normalized, content='weather_records', "
+                        "content_rowid='id', tokenize='trigram')"
+                    )
+                )
+            except OperationalError:
+                # SQLite built without FTS5 / trigram (< 3.34): search falls back to LIKE
+                return
+            conn.execute(
+                text(
+                    "CREATE TRIGGER weather_records_fts_ai AFTER INSERT ON weather_records BEGIN "
+                    "INSERT INTO weather_records_fts(rowid, location_normalized) "
+                    "VALUES (new.id, new.location_normalized); END"
+                )
+            )
+            conn.execute(
+                text(
+                    "CREATE TRIGGER weather_records_fts_ad AFTER DELETE ON weather_records BEGIN "
+                    "INSERT INTO weather_records_fts(weather_records_fts, rowid, location_normalized) "
+                    "VALUES ('delete', old.id, old.location_normalized); END"
+                )
+            )
+            conn.execute(
+                text(
+                    "CREATE TRIGGER weather_records_fts_au AFTER UPDATE OF location_normalized "
+                    "ON weather_records BEGIN "
+                    "INSERT INTO weather_records_fts(weather_records_fts, rowid, location_normalized) "
+                    "VALUES ('delete', old.id, old.location_normalized); "
+                    "INSERT INTO weather_records_fts(rowid, location_normalized) "
+                    "VALUES (new.id, new.location_normalized); END"
+                )
+            )
+            conn.execute(
+                text("INSERT INTO weather_records_fts(weather_records_fts) VALUES ('rebuild')")
+            )
+
+
+def run_migrations(engine: Engine):
+    """
+    Bring an existing database up to the current models. Safe to re-run.
+    """
+    rename_legacy_measurement_columns(engine)
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
+    backfill_location_normalized(engine)
+    convert_legacy_measurements(engine)
+    create_search_indexes(engine)
+
+
+def schema_fingerprint() -> str:
+    """
+    Hash of every model table, column, type and index plus SCHEMA_REVISION.
+    """
+    import models.weather_record  # noqa: F401
+
+    parts = [str(SCHEMA_REVISION)]
+    for table in Base.metadata.sorted_tables:
+        parts.append(table.name)
+        parts += [f"{c.name}:{c.type!r}:{c.nullable}" for c in table.columns]
+        parts += sorted(index.name for index in table.indexes)
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def migrate(engine: Engine, force: bool = False) -> bool:
+    """
+    create_all plus run_migrations, skipped with a single SELECT when the
+    database was already migrated to the current models. Returns whether
+    anything ran.
+    """
+    fingerprint = schema_fingerprint()
+    if not force:
+        try:
+            with engine.connect() as conn:
+                current = conn.execute(select(schema_state.c.fingerprint)).scalar()
+        except SQLAlchemyError:
+            current = None
+        if current == fingerprint:
+            return False
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    _state_metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(delete(schema_state))
+        conn.execute(insert(schema_state).values(fingerprint=fingerprint))
+    return True
@@ -0,0 +1,35 @@
+from functools import cache
+import os
+
+# Single entry point for configuration: .env is parsed once, on the first
+# read, and every module takes its settings through these helpers.
+
+
+@cache
+def _load_env() -> bool:
+    from dotenv import load_dotenv
+
+    return load_dotenv()
+
+
+def env(name: str, default: str | None = None) -> str | None:
+    _load_env()
+    return os.getenv(name, default)
+
+
+def env_int(name: str, default: int) -> int:
+    return int(env(name, str(default)))
+
+
+def env_float(name: str, default: float) -> float:
+    return float(env(name, str(default)))
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """
+    "1", "true" or "yes" (any case) is True; anything else set is False.
+    """
+    value = env(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
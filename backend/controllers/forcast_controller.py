@@ -1,24 +1,57 @@
-import requests
 from fastapi import HTTPException
 from utils.formatters import format_forecast_data
-from dotenv import load_dotenv
-import os
+from utils.gazetteer import GAZETTEER_STRICT, gazetteer
+from utils.cache import decode, location_query, forecast_cache
+from utils.prewarm import prewarmer
+from utils.upstream import UpstreamError, upstream
+from config.settings import env
 
-load_dotenv()
-API_KEY = os.getenv("OPENWEATHER_API_KEY")
+API_KEY = env("OPENWEATHER_API_KEY")
 
 
-async def get_forecast_controller(loc: str):
-
-    if "," in loc:
-        lat, lon = [x.strip() for x in loc.split(",")]
-        url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={API_KEY}&units=metric"
-    else:
-        url = f"https://api.openweathermap.org/data/2.5/forecast?q={loc}&appid={API_KEY}&units=metric"
-
-    res = requests.get(url)
+async def _fetch_forecast(loc: str, query: dict):
+    params = {**query, "appid": API_KEY, "units": "metric"}
+    res = await upstream.get("/forecast", params=params)
     if res.status_code != 200:
         raise HTTPException(status_code=400, detail="Forecast data not found")
+    formatted = format_forecast_data(res.json())
+    place = gazetteer.resolve(loc)
+    if place is not None:
+        formatted.update(location=place.name, country=place.country)
+    return formatted
+
+
+async def get_forecast_encoded(loc: str) -> bytes:
+    """
+    Daily forecast for `loc` as encoded JSON bytes, straight from the cache
+    on a hit, or the last good payload while the upstream is failing.
+    """
+    key, query = location_query(loc)
+    if GAZETTEER_STRICT and "q" in query:
+        raise HTTPException(status_code=404, detail=f"Unknown location '{loc}'.")
+    try:
+        encoded = await forecast_cache.get_or_fetch_encoded(
+            key, lambda: _fetch_forecast(loc, query)
+        )
+    except UpstreamError as e:
+        stale = forecast_cache.get_stale_encoded(key)
+        if stale is not None:
+            return stale
+        raise e.as_http_exception("Forecast service unavailable")
+    prewarmer.record("forecast", key, loc)
+    return encoded
+
 
-    data = res.json()
-    return format_forecast_data(data)
+async def refresh_forecast(loc: str):
+    """
+    Re-fetch `loc` into the cache ahead of expiry (used by the prewarmer).
+    """
+    key, query = location_query(loc)
+    await forecast_cache.refresh_encoded(key, lambda: _fetch_forecast(loc, query))
+
+
+prewarmer.register("forecast", forecast_cache, refresh_forecast)
+
+
+async def get_forecast_controller(loc: str):
+    return decode(await get_forecast_encoded(loc))
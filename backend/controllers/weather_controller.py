@@ -1,34 +1,267 @@
-from fastapi import HTTPException
-from dotenv import load_dotenv
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+from config.settings import env, env_int
 from utils.formatters import format_weather_data
-import requests
-import os
+from utils.gazetteer import GAZETTEER_STRICT, gazetteer
+from utils.cache import decode, location_query, weather_cache
+from utils.prewarm import prewarmer
+from utils.subscriptions import (
+    SUBSCRIBE_HEARTBEAT,
+    SUBSCRIBE_SEND_TIMEOUT,
+    SubscriptionHub,
+    SubscriptionsFull,
+)
+from utils.upstream import UpstreamError, upstream
+import asyncio
+import orjson
 
-load_dotenv()
-API_KEY = os.getenv("OPENWEATHER_API_KEY")
+API_KEY = env("OPENWEATHER_API_KEY")
+BATCH_CONCURRENCY = env_int("WEATHER_BATCH_CONCURRENCY", 16)
 
 
-async def get_weather(location: str):
-    if not API_KEY:
-        raise HTTPException(
-            status_code=500, detail="OPENWEATHER_API_KEY not set in environment."
-        )
-    if "," in location:
-        parts = [p.strip() for p in location.split(",")]
-        try:
-            lat = float(parts[0])
-            lon = float(parts[1])
-            url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={API_KEY}&units=metric"
-        except ValueError:
-            url = f"https://api.openweathermap.org/data/2.5/weather?q={location}&appid={API_KEY}&units=metric"
-    else:
-        url = f"https://api.openweathermap.org/data/2.5/weather?q={location}&appid={API_KEY}&units=metric"
-
-    res = requests.get(url, timeout=10)
+async def _fetch_weather(location: str, query: dict):
+    params = {**query, "appid": API_KEY, "units": "metric"}
+    res = await upstream.get("/weather", params=params)
     if res.status_code != 200:
         raise HTTPException(
             status_code=400,
             detail=f"Could not fetch weather for '{location}'. ({res.status_code})",
         )
-    payload = res.json()
-    return format_weather_data(payload)
+    formatted = format_weather_data(res.json())
+    place = gazetteer.resolve(location)
+    if place is not None:
+        # Upstream names coordinates after its nearest station
+        formatted.update(location=place.name, country=place.country)
+    return formatted
+
+
+async def get_weather_encoded(location: str) -> bytes:
+    """
+    Current weather for `location` as encoded JSON bytes, straight from the
+    cache on a hit. While the upstream is failing, the last good payload is
+    served instead of an error.
+    """
+    if not API_KEY:
+        raise HTTPException(
+            status_code=500, detail="OPENWEATHER_API_KEY not set in environment."
+        )
+    key, query = location_query(location)
+    if GAZETTEER_STRICT and "q" in query:
+        raise HTTPException(status_code=404, detail=f"Unknown location '{location}'.")
+    try:
+        encoded = await weather_cache.get_or_fetch_encoded(
+            key, lambda: _fetch_weather(location, query)
+        )
+    except UpstreamError as e:
+        stale = weather_cache.get_stale_encoded(key)
+        if stale is not None:
+            return stale
+        raise e.as_http_exception(f"Weather service unavailable for '{location}'.")
+    # Only locations the upstream answered for are worth keeping warm
+    prewarmer.record("weather", key, location)
+    return encoded
+
+
+async def refresh_weather(location: str):
+    """
+    Re-fetch `location` into the cache ahead of expiry (used by the prewarmer).
+    """
+    key, query = location_query(location)
+    await weather_cache.refresh_encoded(key, lambda: _fetch_weather(location, query))
+
+
+prewarmer.register("weather", weather_cache, refresh_weather)
+
+
+async def get_weather(location: str):
+    return decode(await get_weather_encoded(location))
+
+
+def _batch_result(location: str, data=None, error: HTTPException | None = None):
+    if error is None:
+        return {"location": location, "success": True, "data": data}
+    return {
+        "location": location,
+        "success": False,
+        "status_code": error.status_code,
+        "error": error.detail,
+    }
+
+
+def _dedupe_locations(locations: list[str]) -> dict[str, str]:
+    """
+    Map each normalized cache key to the first spelling that requested it.
+    """
+    unique = {}
+    for location in locations:
+        key, _ = location_query(location)
+        unique.setdefault(key, location)
+    return unique
+
+
+async def iter_weather_batch(locations: list[str]):
+    """
+    Yield one result per distinct location as soon as it is ready: cached
+    entries first, then upstream fetches bounded by BATCH_CONCURRENCY.
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    pending = []
+
+    async def fetch(location: str):
+        async with semaphore:
+            try:
+                return _batch_result(location, await get_weather(location))
+            except HTTPException as e:
+                return _batch_result(location, error=e)
+
+    for key, location in _dedupe_locations(locations).items():
+        cached = weather_cache.lookup(key)
+        if cached is not None:
+            # Misses are recorded by get_weather once the upstream answered
+            prewarmer.record("weather", key, location)
+            yield _batch_result(location, cached)
+        else:
+            pending.append(asyncio.create_task(fetch(location)))
+
+    try:
+        for next_done in asyncio.as_completed(pending):
+            yield await next_done
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def get_weather_batch(locations: list[str]) -> list[dict]:
+    """
+    Resolve many locations concurrently, returning results in request order.
+    """
+    order = {location: i for i, location in enumerate(_dedupe_locations(locations).values())}
+    results = [result async for result in iter_weather_batch(locations)]
+    return sorted(results, key=lambda r: order[r["location"]])
+
+
+async def stream_weather_batch(locations: list[str]):
+    """
+    NDJSON variant of get_weather_batch: one JSON line per location.
+    """
+    async for result in iter_weather_batch(locations):
+        yield orjson.dumps(result) + b"\n"
+
+
+subscriptions = SubscriptionHub(get_weather_encoded)
+
+
+def _socket_error(status_code: int, error) -> bytes:
+    return orjson.dumps({"type": "error", "status_code": status_code, "error": error})
+
+
+def _sse(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def open_weather_stream(locations: list[str]):
+    """
+    Subscribe a new SSE client to `locations` and return its event stream.
+    Raises before anything is streamed, so bad locations get a plain error
+    response: ValueError (too many), HTTPException (unknown, upstream down,
+    or 503 when the worker is at its connection limit).
+    """
+    try:
+        subscriber = subscriptions.connect()
+    except SubscriptionsFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    try:
+        subscribed = await subscriptions.subscribe(subscriber, locations)
+    except BaseException:
+        subscriptions.disconnect(subscriber)
+        raise
+    return _weather_events(subscriber, subscribed)
+
+
+async def _weather_events(subscriber, subscribed: list[dict]):
+    try:
+        yield _sse("subscribed", subscribed)
+        while True:
+            topics = await subscriber.updates(SUBSCRIBE_HEARTBEAT)
+            if topics is None:
+                return
+            if not topics:
+                # Keeps proxies from timing out idle streams, and finds dead peers
+                yield b": ping\n\n"
+            for topic in topics:
+                yield topic.event
+    finally:
+        subscriptions.disconnect(subscriber)
+
+
+async def serve_weather_socket(websocket: WebSocket):
+    """
+    WebSocket variant: locations from `?location=` on connect, then
+    {"action": "subscribe" | "unsubscribe", "locations": [...]} messages.
+    A client that can't take a push within SUBSCRIBE_SEND_TIMEOUT is
+    disconnected.
+    """
+    try:
+        subscriber = subscriptions.connect()
+    except SubscriptionsFull:
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+    lock = asyncio.Lock()
+
+    async def send(message: bytes):
+        async with lock:
+            await asyncio.wait_for(websocket.send_text(message.decode()), SUBSCRIBE_SEND_TIMEOUT)
+
+    async def handle(action, locations):
+        try:
+            if not isinstance(locations, list) or not all(isinstance(l, str) for l in locations):
+                raise ValueError("'locations' must be a list of strings.")
+            locations = [location.strip() for location in locations]
+            if action == "subscribe":
+                data = await subscriptions.subscribe(subscriber, locations)
+            elif action == "unsubscribe":
+                data = subscriptions.unsubscribe(subscriber, locations)
+            else:
+                raise ValueError("'action' must be subscribe or unsubscribe.")
+            await send(orjson.dumps({"type": f"{action}d", "data": data}))
+        except ValueError as e:
+            await send(_socket_error(400, str(e)))
+        except HTTPException as e:
+            await send(_socket_error(e.status_code, e.detail))
+
+    async def receive():
+        locations = websocket.query_params.getlist("location")
+        if locations:
+            await handle("subscribe", locations)
+        while True:
+            try:
+                message = orjson.loads(await websocket.receive_text())
+            except orjson.JSONDecodeError:
+                message = None
+            if not isinstance(message, dict):
+                await send(_socket_error(400, "Expected a JSON object."))
+                continue
+            await handle(message.get("action"), message.get("locations"))
+
+    async def push():
+        while True:
+            topics = await subscriber.updates(SUBSCRIBE_HEARTBEAT)
+            if topics is None:
+                return
+            for topic in topics:
+                await send(topic.message)
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(push())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        # Server shutting down
+        await websocket.close(code=1001)
+    except (WebSocketDisconnect, asyncio.TimeoutError):
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        subscriptions.disconnect(subscriber)
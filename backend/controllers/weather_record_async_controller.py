@@ -0,0 +1,319 @@
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from models.weather_record import WeatherRecord
+from datetime import datetime
+from utils.metrics import timed
+from typing import Iterable
+from utils.exporters import aiter_encoded, aiter_record_batches
+from fastapi.responses import StreamingResponse
+from controllers import weather_record_controller as sync_controller
+from controllers.weather_record_controller import (
+    DEFAULT_PAGE_SIZE,
+    FTS_INDEX_QUERY,
+    FTS_MATCH_COUNT_QUERY,
+    FTS_MAX_MATCHES,
+    MAX_PAGE_SIZE,
+    MAX_STATS_ROWS,
+    WeatherData,
+    _bulk_delete_result,
+    _bulk_delete_statement,
+    _bulk_update_result,
+    _bulk_update_statement,
+    _count_statement,
+    _export_plan,
+    _fts_match_params,
+    _insert_rows_statement,
+    _location_filter,
+    _page_from_rows,
+    _page_statement,
+    _raw_stats_cutoff,
+    _returned_record,
+    _stats_from_rows,
+    _stats_statement,
+    _uncompacted_statement,
+    _update_statement,
+    _validated_batches,
+    row_record,
+)
+
+# Async versions of the weather_record_controller functions for an
+# AsyncSession (DB_ASYNC). Statements are built by the shared helpers there.
+
+
+async def create_weather_record(db: AsyncSession, data: WeatherData):
+    """
+    Create a new weather record entry in the database.
+    """
+    try:
+        record = WeatherRecord(**data.model_dump(), saved_on=datetime.utcnow())
+
+        db.add(record)
+        await db.commit()
+        await db.refresh(record)
+        return record
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise Exception(f"Database error while creating weather record: {str(e)}")
+    except Exception as e:
+        await db.rollback()
+        raise Exception(f"Unexpected error creating record: {str(e)}")
+
+
+async def insert_weather_rows(db: AsyncSession, rows: list[dict]) -> list[dict]:
+    """
+    Insert rows from weather_row_values in one transaction and return them
+    as records, with their new ids, in the same order.
+    """
+    try:
+        ids = (await db.scalars(_insert_rows_statement(), rows)).all()
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise Exception(f"Database error while saving {len(rows)} weather records: {str(e)}")
+    return [row_record(row, record_id) for row, record_id in zip(rows, ids)]
+
+
+@timed("bulk_create_weather_records")
+async def bulk_create_weather_records(
+    db: AsyncSession, rows: Iterable[tuple[int, dict | Exception]]
+) -> dict:
+    """
+    Validate rows with WeatherData and insert the valid ones in batches of
+    BULK_BATCH_SIZE, committing each batch. Invalid rows are reported back
+    and skipped instead of aborting the upload.
+    """
+    result = {"inserted": 0, "rejected": 0, "rejects": []}
+    batches = _validated_batches(rows, result)
+    try:
+        # Parsing and validating a batch is CPU work; it runs in the
+        # threadpool so the event loop keeps serving other requests
+        while (batch := await run_in_threadpool(next, batches, None)) is not None:
+            await db.execute(insert(WeatherRecord.__table__), batch)
+            await db.commit()
+            result["inserted"] += len(batch)
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise Exception(
+            f"Database error during bulk insert after {result['inserted']} rows: {str(e)}"
+        )
+
+    return result
+
+
+async def _fetch_page(
+    db: AsyncSession,
+    filters: list,
+    limit: int,
+    cursor: str | None,
+    fields: list[str] | None,
+    with_total: bool,
+) -> dict:
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    result = await db.execute(_page_statement(filters, limit, cursor, fields))
+    page = _page_from_rows([dict(row) for row in result.mappings()], limit)
+    if with_total:
+        page["total"] = (await db.execute(_count_statement(filters))).scalar_one()
+    return page
+
+
+async def get_all_weather_records(
+    db: AsyncSession,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+    with_total: bool = False,
+):
+    """
+    Retrieve one page of weather records, newest first.
+    """
+    try:
+        return await _fetch_page(db, [], limit, cursor, fields, with_total)
+    except SQLAlchemyError as e:
+        raise Exception(f"Database error while fetching records: {str(e)}")
+
+
+async def get_weather_record_by_id(db: AsyncSession, record_id: int):
+    """
+    Retrieve a single weather record by its unique ID.
+    """
+    try:
+        result = await db.execute(select(WeatherRecord).where(WeatherRecord.id == record_id))
+        return result.scalars().first()
+    except SQLAlchemyError as e:
+        raise Exception(
+            f"Database error while fetching record by ID {record_id}: {str(e)}"
+        )
+    except Exception as e:
+        raise Exception(
+            f"Unexpected error retrieving record by ID {record_id}: {str(e)}"
+        )
+
+
+async def _has_fts_index(db: AsyncSession) -> bool:
+    # Shares the sync controller's cached answer
+    if sync_controller._fts_available is None:
+        result = await db.execute(FTS_INDEX_QUERY)
+        sync_controller._fts_available = result.first() is not None
+    return sync_controller._fts_available
+
+
+async def _use_fts(db: AsyncSession, location: str, match: str) -> bool:
+    params = _fts_match_params(location, match)
+    if params is None or not await _has_fts_index(db):
+        return False
+    result = await db.execute(FTS_MATCH_COUNT_QUERY, params)
+    return result.scalar_one() <= FTS_MAX_MATCHES
+
+
+async def get_weather_record_by_location(
+    db: AsyncSession,
+    location: str,
+    match: str = "contains",
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+    with_total: bool = False,
+):
+    """
+    Retrieve one page of weather records for a specific location.
+    """
+    try:
+        use_fts = await _use_fts(db, location, match)
+        return await _fetch_page(
+            db,
+            [_location_filter(location, match, use_fts)],
+            limit,
+            cursor,
+            fields,
+            with_total,
+        )
+    except SQLAlchemyError as e:
+        raise Exception(f"Database error while fetching records by location: {str(e)}")
+
+
+@timed("get_weather_record_stats")
+async def get_weather_record_stats(
+    db: AsyncSession,
+    bucket: str = "day",
+    location: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = MAX_STATS_ROWS,
+    now: datetime | None = None,
+):
+    """
+    Per-location, per-bucket min/max/avg of each measurement plus the
+    dominant `main` condition, computed entirely in the database. Raw
+    records older than STATS_RAW_DAYS before `now` are skipped once none
+    are left there, since that history is then read from the rollups.
+    """
+    cutoff = _raw_stats_cutoff(start, now)
+    try:
+        if cutoff is not None and (await db.execute(_uncompacted_statement(cutoff))).first():
+            # Retention has not compacted them yet; read them raw
+            cutoff = None
+        stmt = _stats_statement(bucket, location, start, end, limit, cutoff)
+        rows = (await db.execute(stmt)).mappings().all()
+    except SQLAlchemyError as e:
+        raise Exception(f"Database error while computing record stats: {str(e)}")
+    return _stats_from_rows(rows)
+
+
+async def export_weather_records_controller(
+    db: AsyncSession,
+    record_id: int | None = None,
+    compress: bool = False,
+    export_format: str = "csv",
+):
+    """
+    Export weather records (all or single) as a CSV, NDJSON, Arrow IPC or
+    Parquet stream, read from an async server-side cursor batch by batch.
+    """
+    plan = _export_plan(record_id, compress, export_format)
+    if (await db.execute(plan["exists"])).first() is None:
+        return None
+
+    batches = aiter_record_batches(db, plan["stmt"], plan["batch_size"])
+    chunks = aiter_encoded(plan["encode"], batches)
+    return StreamingResponse(chunks, media_type=plan["media_type"], headers=plan["headers"])
+
+
+async def update_weather_record_controller(db: AsyncSession, record_id: int, updates: dict):
+    """
+    Update an existing weather record by ID with a single
+    UPDATE ... RETURNING. Returns None when there is no such record.
+    """
+    stmt = _update_statement(record_id, updates)
+    try:
+        row = (await db.execute(stmt)).mappings().first()
+        await db.commit()
+        return _returned_record(row) if row else None
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise Exception(
+            f"Database error while updating record ID {record_id}: {str(e)}"
+        )
+    except Exception as e:
+        await db.rollback()
+        raise Exception(f"Unexpected error updating record: {str(e)}")
+
+
+async def bulk_update_weather_records(db: AsyncSession, updates: list[dict]) -> dict:
+    """
+    Apply a list of {"id": ..., field: value} updates in one statement.
+    """
+    ids, stmt = _bulk_update_statement(updates)
+    try:
+        rows = (await db.execute(stmt)).mappings().all()
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise Exception(f"Database error while updating records: {str(e)}")
+    return _bulk_update_result(ids, rows)
+
+
+async def delete_weather_record_controller(db: AsyncSession, record_id: int):
+    """
+    Delete a weather record by ID with a single DELETE ... RETURNING.
+    """
+    table = WeatherRecord.__table__
+    try:
+        result = await db.execute(
+            delete(table).where(table.c.id == record_id).returning(table.c.id)
+        )
+        deleted = result.first()
+        await db.commit()
+        return True if deleted else None
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise Exception(
+            f"Database error while deleting record ID {record_id}: {str(e)}"
+        )
+    except Exception as e:
+        await db.rollback()
+        raise Exception(f"Unexpected error deleting record: {str(e)}")
+
+
+async def bulk_delete_weather_records(
+    db: AsyncSession,
+    ids: list[int] | None = None,
+    location: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> dict:
+    """
+    Delete records by id and/or location and saved_on range in one statement.
+    """
+    stmt = _bulk_delete_statement(ids, location, start, end)
+    try:
+        result = _bulk_delete_result(ids, await db.execute(stmt))
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise Exception(f"Database error while deleting records: {str(e)}")
+    return result
@@ -1,41 +1,166 @@
+from sqlalchemy import (
+    Float,
+    Integer,
+    and_,
+    case,
+    cast,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    text,
+    tuple_,
+    union_all,
+    update,
+)
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from models.weather_record import WeatherRecord
-from datetime import datetime
-from pydantic import BaseModel
+from config.database import DIALECT
+from config.settings import env_int
+from models.weather_record import (
+    WeatherRecord,
+    WeatherRollupDaily,
+    WeatherRollupHourly,
+    normalize_location_name,
+)
+from datetime import datetime, timedelta
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+from utils.formatters import parse_measurement
+from utils.metrics import timed
+from utils.retention import RETENTION_ENABLED, RETENTION_RAW_DAYS
+from typing import Iterable
+from utils.exporters import (
+    CSV_FIELDS,
+    CSV_HEADER,
+    EXPORT_FORMATS,
+    gzip_chunks,
+    iter_record_batches,
+    pyarrow_available,
+)
+import base64
 import csv
 import io
+import json
+from fastapi import HTTPException
 from fastapi.responses import StreamingResponse
 
+INTERNAL_FIELDS = {"location_normalized"}
+RECORD_FIELDS = tuple(
+    column.name
+    for column in WeatherRecord.__table__.columns
+    if column.name not in INTERNAL_FIELDS
+)
+LOCATION_MATCH_MODES = ("contains", "prefix", "exact")
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+BULK_BATCH_SIZE = 5000
+MAX_REPORTED_REJECTS = 1000
+STATS_BUCKETS = ("hour", "day", "week")
+STATS_METRICS = ("temp", "humidity", "pressure", "wind")
+MAX_STATS_ROWS = 5000
+MEASUREMENT_FIELDS = ("temp", "humidity", "pressure", "wind", "visibility")
+# With retention compacting raw records, stats read them from the last
+# STATS_RAW_DAYS only and older history from the rollups. One day past the
+# retention window, so rows waiting for the next compaction still count.
+# 0 (the default without retention) reads every raw row.
+STATS_RAW_DAYS = env_int(
+    "STATS_RAW_DAYS", RETENTION_RAW_DAYS + 1 if RETENTION_ENABLED and RETENTION_RAW_DAYS else 0
+)
+# Bucket size of each rollup table
+ROLLUP_RESOLUTION = {WeatherRollupHourly: "hour", WeatherRollupDaily: "day"}
+# Records per PATCH/DELETE /records request; keeps the statement's bound
+# parameters under SQLite's limit
+MAX_BULK_CHANGES = 1000
+# contains searches on SQLite read the FTS table only up to this many
+# matches; past it walking the saved_on index finds a page sooner
+FTS_MAX_MATCHES = 2000
+# CSV uploads accept the /records/export headers as well as field names
+CSV_HEADER_FIELDS = dict(zip(CSV_HEADER, CSV_FIELDS))
+
+_fts_available: bool | None = None
+
 
 class WeatherData(BaseModel):
     location: str
     country: str
     main: str
     description: str
-    temp: str
-    humidity: str
-    pressure: str
-    wind: str
+    temp: float
+    humidity: float
+    pressure: float
+    wind: float
+    icon: str | None = None
+    visibility: float | None = None
+    lat: float | None = None
+    lon: float | None = None
+    observed_at: datetime | None = None
+
+    @field_validator(*MEASUREMENT_FIELDS, mode="before")
+    @classmethod
+    def _parse_measurement(cls, value):
+        # Accept display strings such as "25.6 °C" as well as plain numbers
+        return parse_measurement(value)
+
+
+# An empty CSV cell is null for these
+OPTIONAL_FIELDS = frozenset(
+    name for name, field in WeatherData.model_fields.items() if not field.is_required()
+)
+
+
+class WeatherRecordUpdate(BaseModel):
+    """
+    Fields a client may change on a saved record; `id`, `saved_on` and
+    unknown fields are rejected.
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    location: str | None = None
+    country: str | None = None
+    main: str | None = None
+    description: str | None = None
+    temp: float | None = None
+    humidity: float | None = None
+    pressure: float | None = None
+    wind: float | None = None
+    icon: str | None = None
+    visibility: float | None = None
+    lat: float | None = None
+    lon: float | None = None
+    observed_at: datetime | None = None
+
+    @field_validator(*MEASUREMENT_FIELDS, mode="before")
+    @classmethod
+    def _parse_measurement(cls, value):
+        # null clears a measurement; text without a number is an error
+        parsed = parse_measurement(value)
+        if parsed is None and value is not None:
+            raise ValueError("expected a number")
+        return parsed
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in error.errors()
+    )
+
+
+def serialize_record(record: WeatherRecord) -> dict:
+    """
+    Plain dict of a record's public columns.
+    """
+    return {name: getattr(record, name) for name in RECORD_FIELDS}
 
 
 def create_weather_record(db: Session, data: WeatherData):
     """
     Create a new weather record entry in the database.
     """
-    print(data)
     try:
-        record = WeatherRecord(
-            location=data.get("location"),
-            country=data.get("country"),
-            main=data.get("main"),
-            description=data.get("description"),
-            temp=data.get("temp"),
-            humidity=data.get("humidity"),
-            pressure=data.get("pressure"),
-            wind=data.get("wind"),
-            saved_on=datetime.utcnow(),
-        )
+        record = WeatherRecord(**data.model_dump(), saved_on=datetime.utcnow())
 
         db.add(record)
         db.commit()
@@ -45,19 +170,258 @@ def create_weather_record(db: Session, data: WeatherData):
     except SQLAlchemyError as e:
         db.rollback()
         raise Exception(f"Database error while creating weather record: {str(e)}")
-    except KeyError as e:
-        raise Exception(f"Missing required field in input data: {str(e)}")
     except Exception as e:
         db.rollback()
         raise Exception(f"Unexpected error creating record: {str(e)}")
 
 
-def get_all_weather_records(db: Session):
+def weather_row_values(data: WeatherData, saved_on: datetime | None = None) -> dict:
+    """
+    Insert-ready column values for one validated record.
+    """
+    values = data.model_dump()
+    values["location_normalized"] = normalize_location_name(data.location)
+    values["saved_on"] = saved_on or datetime.utcnow()
+    return values
+
+
+def insert_weather_rows(db: Session, rows: list[dict]) -> list[dict]:
+    """
+    Insert rows from weather_row_values in one transaction and return them
+    as records, with their new ids, in the same order.
+    """
+    try:
+        ids = db.scalars(_insert_rows_statement(), rows).all()
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"Database error while saving {len(rows)} weather records: {str(e)}")
+    return [row_record(row, record_id) for row, record_id in zip(rows, ids)]
+
+
+def _insert_rows_statement():
+    # Multi-row INSERT ... RETURNING, ids in parameter order
+    return insert(WeatherRecord.__table__).returning(
+        WeatherRecord.id, sort_by_parameter_order=True
+    )
+
+
+def row_record(row: dict, record_id: int | None = None) -> dict:
+    """
+    Public columns of an insert row as a record; `id` is None until saved.
+    """
+    record = {name: row.get(name) for name in RECORD_FIELDS}
+    record["id"] = record_id
+    return record
+
+
+def _csv_record(row: dict) -> dict:
+    """
+    A CSV row as a record: export headers renamed to their fields and empty
+    optional cells read as null.
+    """
+    record = {}
+    for name, value in row.items():
+        name = CSV_HEADER_FIELDS.get(name, name)
+        record[name] = None if value == "" and name in OPTIONAL_FIELDS else value
+    return record
+
+
+def parse_bulk_rows(body: bytes, content_type: str) -> Iterable[tuple[int, dict | Exception]]:
+    """
+    Yield (row number, row) pairs from a JSON array, NDJSON or CSV body.
+    Rows that fail to parse are yielded as the exception instead.
+    """
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        for index, line in enumerate(body.splitlines()):
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError as e:
+                yield index, e
+    elif content_type in ("text/csv", "application/csv"):
+        reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+        for index, row in enumerate(reader):
+            yield index, _csv_record(row)
+    elif content_type == "application/json":
+        rows = json.loads(body)
+        if not isinstance(rows, list):
+            raise ValueError("Expected a JSON array of records")
+        yield from enumerate(rows)
+    else:
+        raise ValueError(
+            f"Unsupported content type '{content_type}'. "
+            "Use application/json, application/x-ndjson or text/csv."
+        )
+
+
+def _insert_batch(db: Session, batch: list[dict]):
+    """
+    Insert one batch in a single round-trip: COPY on PostgreSQL (psycopg 3
+    or psycopg2), executemany everywhere else.
+    """
+    connection = db.connection()
+    driver = connection.dialect.driver
+    if driver in ("psycopg", "psycopg2"):
+        columns = list(batch[0].keys())
+        copy_sql = f"COPY weather_records ({', '.join(columns)}) FROM STDIN"
+        with connection.connection.dbapi_connection.cursor() as cursor:
+            if driver == "psycopg":
+                with cursor.copy(copy_sql) as copy:
+                    for row in batch:
+                        copy.write_row([row[c] for c in columns])
+                return
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows([row[c] for c in columns] for row in batch)
+            buffer.seek(0)
+            cursor.copy_expert(f"{copy_sql} WITH (FORMAT csv)", buffer)
+        return
+    db.execute(insert(WeatherRecord.__table__), batch)
+
+
+def _validated_batches(rows: Iterable[tuple[int, dict | Exception]], result: dict):
+    """
+    Validate rows with WeatherData and yield the valid ones as insert-ready
+    batches of BULK_BATCH_SIZE. Invalid rows are counted and reported in
+    `result` instead.
+    """
+    batch = []
+    saved_on = datetime.utcnow()
+
+    def reject(index, error):
+        result["rejected"] += 1
+        if len(result["rejects"]) < MAX_REPORTED_REJECTS:
+            result["rejects"].append({"row": index, "error": error})
+
+    for index, row in rows:
+        if isinstance(row, Exception):
+            reject(index, f"Could not parse row: {row}")
+            continue
+        try:
+            data = WeatherData.model_validate(row)
+        except ValidationError as e:
+            reject(index, _validation_message(e))
+            continue
+        batch.append(weather_row_values(data, saved_on))
+        if len(batch) >= BULK_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@timed("bulk_create_weather_records")
+def bulk_create_weather_records(
+    db: Session, rows: Iterable[tuple[int, dict | Exception]]
+) -> dict:
+    """
+    Validate rows with WeatherData and insert the valid ones in batches of
+    BULK_BATCH_SIZE, committing each batch. Invalid rows are reported back
+    and skipped instead of aborting the upload.
+    """
+    result = {"inserted": 0, "rejected": 0, "rejects": []}
+    try:
+        for batch in _validated_batches(rows, result):
+            _insert_batch(db, batch)
+            db.commit()
+            result["inserted"] += len(batch)
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(
+            f"Database error during bulk insert after {result['inserted']} rows: {str(e)}"
+        )
+
+    return result
+
+
+def encode_cursor(saved_on: datetime, record_id: int) -> str:
+    raw = f"{saved_on.isoformat()}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        saved_on, record_id = base64.urlsafe_b64decode(cursor).decode().split("|")
+        return datetime.fromisoformat(saved_on), int(record_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _select_columns(fields: list[str] | None):
+    """
+    Columns to load for a page. `id` and `saved_on` are always included
+    because the next cursor is built from them.
+    """
+    if not fields:
+        return [WeatherRecord.__table__.c[name] for name in RECORD_FIELDS]
+    unknown = [f for f in fields if f not in RECORD_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(RECORD_FIELDS)}"
+        )
+    names = ["id", "saved_on"] + [f for f in fields if f not in ("id", "saved_on")]
+    return [WeatherRecord.__table__.c[name] for name in names]
+
+
+def _page_statement(filters: list, limit: int, cursor: str | None, fields: list[str] | None):
+    """
+    Keyset page over (saved_on DESC, id DESC), loading only `fields`. One
+    extra row is fetched to tell whether there is a next page.
+    """
+    stmt = select(*_select_columns(fields)).where(*filters)
+    if cursor:
+        stmt = stmt.where(
+            tuple_(WeatherRecord.saved_on, WeatherRecord.id) < decode_cursor(cursor)
+        )
+    stmt = stmt.order_by(WeatherRecord.saved_on.desc(), WeatherRecord.id.desc())
+    return stmt.limit(limit + 1)
+
+
+def _count_statement(filters: list):
+    return select(func.count()).select_from(WeatherRecord).where(*filters)
+
+
+def _page_from_rows(rows: list[dict], limit: int) -> dict:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["saved_on"], rows[-1]["id"])
+    return {"data": rows, "next_cursor": next_cursor}
+
+
+def _fetch_page(
+    db: Session,
+    filters: list,
+    limit: int,
+    cursor: str | None,
+    fields: list[str] | None,
+    with_total: bool,
+) -> dict:
+    """
+    Keyset-paginate over (saved_on DESC, id DESC), loading only `fields`.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stmt = _page_statement(filters, limit, cursor, fields)
+    page = _page_from_rows([dict(row) for row in db.execute(stmt).mappings()], limit)
+    if with_total:
+        page["total"] = db.execute(_count_statement(filters)).scalar_one()
+    return page
+
+
+def get_all_weather_records(
+    db: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+    with_total: bool = False,
+):
     """
-    Retrieve all weather records from the database.
+    Retrieve one page of weather records, newest first.
     """
     try:
-        return db.query(WeatherRecord).order_by(WeatherRecord.saved_on.desc()).all()
+        return _fetch_page(db, [], limit, cursor, fields, with_total)
     except SQLAlchemyError as e:
         raise Exception(f"Database error while fetching records: {str(e)}")
 
@@ -79,98 +443,571 @@ def get_weather_record_by_id(db: Session, record_id: int):
         )
 
 
-def get_weather_record_by_location(db: Session, location: str):
+FTS_INDEX_QUERY = text("SELECT 1 FROM sqlite_master WHERE name = 'weather_records_fts'")
+# Matches counted (up to FTS_MAX_MATCHES + 1) before choosing a contains plan
+FTS_MATCH_COUNT_QUERY = text(
+    "SELECT count(*) FROM (SELECT rowid FROM weather_records_fts "
+    "WHERE weather_records_fts MATCH :q LIMIT :n)"
+)
+
+
+def _has_fts_index(db: Session) -> bool:
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = db.execute(FTS_INDEX_QUERY).first() is not None
+    return _fts_available
+
+
+def _fts_phrase(location: str) -> str | None:
+    """
+    FTS5 phrase query for a contains search, or None when the needle is
+    too short for the trigram tokenizer.
+    """
+    needle = normalize_location_name(location)
+    if len(needle) < 3:
+        return None
+    return '"' + needle.replace('"', '""') + '"'
+
+
+def _fts_match_params(location: str, match: str) -> dict | None:
+    """
+    Parameters for FTS_MATCH_COUNT_QUERY when a contains search could use
+    the FTS table, else None.
+    """
+    if DIALECT != "sqlite" or match != "contains":
+        return None
+    phrase = _fts_phrase(location)
+    return {"q": phrase, "n": FTS_MAX_MATCHES + 1} if phrase else None
+
+
+def _use_fts(db: Session, location: str, match: str) -> bool:
+    params = _fts_match_params(location, match)
+    if params is None or not _has_fts_index(db):
+        return False
+    return db.execute(FTS_MATCH_COUNT_QUERY, params).scalar_one() <= FTS_MAX_MATCHES
+
+
+def _location_filter(location: str, match: str, use_fts: bool):
+    """
+    Index-backed filter on `location_normalized`.
+
+    exact/prefix use the B-tree index. contains uses the pg_trgm index on
+    PostgreSQL. On SQLite it uses the FTS5 trigram table when `use_fts`
+    (the needle is selective, see FTS_MAX_MATCHES): the matching rows are
+    loaded and sorted. Otherwise it is a LIKE checked while walking the
+    (saved_on, id) index, which stops once the page is full, so a common
+    needle reads a few hundred rows rather than sorting every match.
+    """
+    if match not in LOCATION_MATCH_MODES:
+        raise ValueError(
+            f"Invalid match '{match}'. Allowed: {', '.join(LOCATION_MATCH_MODES)}"
+        )
+    needle = normalize_location_name(location)
+    column = WeatherRecord.location_normalized
+
+    if match == "exact":
+        return column == needle
+    if match == "prefix":
+        if DIALECT == "sqlite":
+            # SQLite's LIKE can't use a binary-collated index; a range scan can
+            return and_(column >= needle, column < needle + "\U0010ffff")
+        return column.startswith(needle, autoescape=True)
+    if use_fts:
+        matches = (
+            text(
+                "SELECT rowid FROM weather_records_fts WHERE weather_records_fts MATCH :q"
+            )
+            .bindparams(q=_fts_phrase(location))
+            .columns(rowid=Integer)
+        )
+        return WeatherRecord.id.in_(matches)
+    return column.contains(needle, autoescape=True)
+
+
+def get_weather_record_by_location(
+    db: Session,
+    location: str,
+    match: str = "contains",
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+    with_total: bool = False,
+):
     """
-    Retrieve weather records for a specific location.
+    Retrieve one page of weather records for a specific location.
     """
     try:
-        return (
-            db.query(WeatherRecord)
-            .filter(WeatherRecord.location.ilike(f"%{location}%"))
-            .order_by(WeatherRecord.saved_on.desc())
-            .all()
+        return _fetch_page(
+            db,
+            [_location_filter(location, match, _use_fts(db, location, match))],
+            limit,
+            cursor,
+            fields,
+            with_total,
         )
     except SQLAlchemyError as e:
         raise Exception(f"Database error while fetching records by location: {str(e)}")
 
 
-def export_weather_records_controller(db: Session, record_id: int | None = None):
+def _bucket_expression(bucket: str, column=WeatherRecord.saved_on):
     """
-    Export weather records (all or single) as a CSV stream.
+    `column` truncated to the start of its hour, day or ISO week (Monday).
     """
-    query = db.query(WeatherRecord)
-    if record_id:
-        query = query.filter(WeatherRecord.id == record_id)
+    if DIALECT == "postgresql":
+        return func.date_trunc(bucket, column)
+    formats = {"hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00"}
+    if bucket in formats:
+        return func.strftime(formats[bucket], column)
+    # SQLite: step forward to Sunday, then back to that week's Monday
+    return func.strftime("%Y-%m-%d 00:00:00", func.date(column, "weekday 0", "-6 days"))
 
-    records = query.order_by(WeatherRecord.saved_on.desc()).all()
-    if not records:
+
+def _stats_partials(
+    bucket: str,
+    location: str | None,
+    start: datetime | None,
+    end: datetime | None,
+    raw_start: datetime | None,
+):
+    """
+    Partial aggregates per (location, bucket, main) from the raw records
+    since `raw_start` and both rollup tables. Retention moves each record
+    into exactly one of them, so combining the partials gives the same
+    statistics however much history has been compacted. Rollups are placed
+    by their bucket start, so buckets finer than a rollup's resolution get
+    its whole hour/day; a rollup row then already is its own group and is
+    read as is instead of being grouped again.
+    """
+    branches = []
+    for source in (WeatherRecord, WeatherRollupHourly, WeatherRollupDaily):
+        raw = source is WeatherRecord
+        time_column = source.saved_on if raw else source.bucket
+        filters = []
+        if location:
+            filters.append(source.location_normalized == normalize_location_name(location))
+        if raw and raw_start:
+            filters.append(time_column >= raw_start)
+        elif start:
+            filters.append(time_column >= start)
+        if end:
+            filters.append(time_column < end)
+
+        bucket_column = _bucket_expression(bucket, time_column)
+        if not raw and STATS_BUCKETS.index(bucket) <= STATS_BUCKETS.index(
+            ROLLUP_RESOLUTION[source]
+        ):
+            columns = [
+                source.location_normalized.label("location_key"),
+                source.location.label("location"),
+                bucket_column.label("bucket"),
+                source.main.label("main"),
+                source.count.label("n"),
+            ]
+            for metric in STATS_METRICS:
+                columns += [
+                    getattr(source, f"{metric}_{part}").label(f"{metric}_{part}")
+                    for part in ("min", "max", "sum", "count")
+                ]
+            branches.append(select(*columns).where(*filters))
+            continue
+
+        main = func.coalesce(source.main, "") if raw else source.main
+        aggregates = [(func.count() if raw else func.sum(source.count)).label("n")]
+        for metric in STATS_METRICS:
+            if raw:
+                column = getattr(source, metric)
+                parts = (func.min(column), func.max(column), func.sum(column), func.count(column))
+            else:
+                parts = (
+                    func.min(getattr(source, f"{metric}_min")),
+                    func.max(getattr(source, f"{metric}_max")),
+                    func.sum(getattr(source, f"{metric}_sum")),
+                    func.sum(getattr(source, f"{metric}_count")),
+                )
+            aggregates += [
+                part.label(f"{metric}_{name}")
+                for part, name in zip(parts, ("min", "max", "sum", "count"))
+            ]
+        branches.append(
+            select(
+                source.location_normalized.label("location_key"),
+                func.min(source.location).label("location"),
+                bucket_column.label("bucket"),
+                main.label("main"),
+                *aggregates,
+            )
+            .where(*filters)
+            .group_by(source.location_normalized, bucket_column, main)
+        )
+    return union_all(*branches).cte("partials")
+
+
+def _raw_stats_cutoff(start: datetime | None, now: datetime | None = None) -> datetime | None:
+    """
+    Where the raw tier may be cut: STATS_RAW_DAYS before `now`. None when
+    every raw row is read or `start` is later anyway.
+    """
+    if STATS_RAW_DAYS <= 0:
         return None
+    cutoff = (now or datetime.utcnow()) - timedelta(days=STATS_RAW_DAYS)
+    return cutoff if start is None or start < cutoff else None
+
+
+def _uncompacted_statement(cutoff: datetime):
+    """
+    Any raw record saved before `cutoff`, i.e. not in the rollups yet.
+    """
+    return select(WeatherRecord.id).where(WeatherRecord.saved_on < cutoff).limit(1)
+
+
+def _stats_statement(
+    bucket: str,
+    location: str | None,
+    start: datetime | None,
+    end: datetime | None,
+    limit: int,
+    raw_start: datetime | None = None,
+):
+    """
+    Per-location, per-bucket aggregates with the dominant `main`, as one
+    statement. Raw records are read from `raw_start` on when it is given.
+    """
+    if bucket not in STATS_BUCKETS:
+        raise ValueError(f"Invalid bucket '{bucket}'. Allowed: {', '.join(STATS_BUCKETS)}")
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(
-        [
-            "ID",
-            "Location",
-            "Country",
-            "Main",
-            "Description",
-            "Temp (°C)",
-            "Humidity",
-            "Pressure",
-            "Wind",
-            "Saved On",
+    limit = max(1, min(limit, MAX_STATS_ROWS))
+    partials = _stats_partials(bucket, location, start, end, raw_start)
+    # Only the newest `limit` (location, bucket) pairs are returned: find
+    # the oldest bucket among them, so older partials skip the windows
+    groups = (
+        select(partials.c.location_key, partials.c.bucket)
+        .where(partials.c.bucket.is_not(None))
+        .distinct()
+        .subquery("groups")
+    )
+    oldest_bucket = (
+        select(groups.c.bucket)
+        .order_by(groups.c.bucket.desc())
+        .offset(limit - 1)
+        .limit(1)
+        .scalar_subquery()
+    )
+    # One GROUP BY per (location, bucket, main); window functions over each
+    # (location, bucket) partition then roll those groups up and rank the
+    # conditions, so no self-join is needed
+    partition = (partials.c.location_key, partials.c.bucket)
+    group_count = func.sum(partials.c.n)
+    columns = [
+        partials.c.bucket,
+        func.min(func.min(partials.c.location)).over(partition_by=partition).label("location"),
+        cast(func.sum(group_count).over(partition_by=partition), Integer).label("count"),
+        partials.c.main.label("dominant_main"),
+        cast(group_count, Integer).label("dominant_main_count"),
+        func.row_number()
+        .over(partition_by=partition, order_by=(group_count.desc(), partials.c.main))
+        .label("rank"),
+    ]
+    for metric in STATS_METRICS:
+        total = func.sum(func.sum(partials.c[f"{metric}_sum"])).over(partition_by=partition)
+        counted = func.sum(func.sum(partials.c[f"{metric}_count"])).over(partition_by=partition)
+        columns += [
+            func.min(func.min(partials.c[f"{metric}_min"]))
+            .over(partition_by=partition)
+            .label(f"{metric}_min"),
+            func.max(func.max(partials.c[f"{metric}_max"]))
+            .over(partition_by=partition)
+            .label(f"{metric}_max"),
+            (total / func.nullif(counted, 0)).label(f"{metric}_avg"),
         ]
+    conditions = (
+        select(*columns)
+        .where(
+            or_(
+                partials.c.bucket.is_(None),
+                partials.c.bucket >= func.coalesce(oldest_bucket, partials.c.bucket),
+            )
+        )
+        .group_by(partials.c.location_key, partials.c.bucket, partials.c.main)
+        .subquery("conditions")
+    )
+    return (
+        select(conditions)
+        .where(conditions.c.rank == 1)
+        .order_by(conditions.c.bucket.desc(), conditions.c.location)
+        .limit(limit)
     )
 
-    for record in records:
-        writer.writerow(
-            [
-                record.id,
-                record.location,
-                record.country,
-                record.main,
-                record.description,
-                record.temp,
-                record.humidity,
-                record.pressure,
-                record.wind,
-                (
-                    record.saved_on.strftime("%Y-%m-%d %H:%M:%S")
-                    if record.saved_on
-                    else ""
-                ),
-            ]
+
+def _stats_from_rows(rows) -> list[dict]:
+    stats = []
+    for row in rows:
+        entry = {
+            "location": row["location"],
+            "bucket": str(row["bucket"]),
+            "count": row["count"],
+            "dominant_main": row["dominant_main"] or None,
+            "dominant_main_count": row["dominant_main_count"],
+        }
+        for metric in STATS_METRICS:
+            avg = row[f"{metric}_avg"]
+            entry[metric] = {
+                "min": row[f"{metric}_min"],
+                "max": row[f"{metric}_max"],
+                "avg": round(avg, 2) if avg is not None else None,
+            }
+        stats.append(entry)
+    return stats
+
+
+@timed("get_weather_record_stats")
+def get_weather_record_stats(
+    db: Session,
+    bucket: str = "day",
+    location: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = MAX_STATS_ROWS,
+    now: datetime | None = None,
+):
+    """
+    Per-location, per-bucket min/max/avg of each measurement plus the
+    dominant `main` condition, computed entirely in the database. Raw
+    records older than STATS_RAW_DAYS before `now` are skipped once none
+    are left there, since that history is then read from the rollups.
+    """
+    cutoff = _raw_stats_cutoff(start, now)
+    try:
+        if cutoff is not None and db.execute(_uncompacted_statement(cutoff)).first():
+            # Retention has not compacted them yet; read them raw
+            cutoff = None
+        stmt = _stats_statement(bucket, location, start, end, limit, cutoff)
+        rows = db.execute(stmt).mappings().all()
+    except SQLAlchemyError as e:
+        raise Exception(f"Database error while computing record stats: {str(e)}")
+    return _stats_from_rows(rows)
+
+
+def _export_plan(record_id: int | None, compress: bool, export_format: str) -> dict:
+    """
+    Everything an export needs besides the session: the existence check,
+    the row statement, the encoder and the response headers.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Invalid format '{export_format}'. Allowed: {', '.join(EXPORT_FORMATS)}"
+        )
+    encoder, media_type, extension, batch_size, needs_pyarrow = EXPORT_FORMATS[
+        export_format
+    ]
+    if needs_pyarrow and not pyarrow_available():
+        raise HTTPException(
+            status_code=501, detail=f"pyarrow is required for {export_format} export."
         )
 
-    output.seek(0)
+    filters = [WeatherRecord.id == record_id] if record_id else []
+    stmt = (
+        select(*[WeatherRecord.__table__.c[name] for name in RECORD_FIELDS])
+        .where(*filters)
+        .order_by(WeatherRecord.saved_on.desc(), WeatherRecord.id.desc())
+    )
 
     # dynamic filename
-    filename = f"weather_record_{record_id}.csv" if record_id else "weather_records.csv"
-
-    return StreamingResponse(
-        output,
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    filename = (
+        f"weather_record_{record_id}.{extension}"
+        if record_id
+        else f"weather_records.{extension}"
     )
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
 
+    return {
+        "exists": select(WeatherRecord.id).where(*filters).limit(1),
+        "stmt": stmt,
+        "batch_size": batch_size,
+        "encode": (lambda batches: gzip_chunks(encoder(batches))) if compress else encoder,
+        "media_type": media_type,
+        "headers": headers,
+    }
 
-def update_weather_record_controller(db: Session, record_id: int, updates: dict):
+
+def export_weather_records_controller(
+    db: Session,
+    record_id: int | None = None,
+    compress: bool = False,
+    export_format: str = "csv",
+):
+    """
+    Export weather records (all or single) as a CSV, NDJSON, Arrow IPC or
+    Parquet stream.
+
+    Rows are read from the cursor in batches and written to the response as
+    they arrive, so memory stays flat regardless of table size.
+    """
+    plan = _export_plan(record_id, compress, export_format)
+    if db.execute(plan["exists"]).first() is None:
+        return None
+
+    chunks = plan["encode"](iter_record_batches(db, plan["stmt"], plan["batch_size"]))
+    return StreamingResponse(chunks, media_type=plan["media_type"], headers=plan["headers"])
+
+
+RETURNED_COLUMNS = [WeatherRecord.__table__.c[name] for name in RECORD_FIELDS]
+FLOAT_FIELDS = tuple(
+    name for name in RECORD_FIELDS if isinstance(WeatherRecord.__table__.c[name].type, Float)
+)
+
+
+def _returned_record(row) -> dict:
+    """
+    An UPDATE ... RETURNING row as a record. SQLite returns values before
+    column affinity applies, so 30.0 written to a REAL column comes back as
+    30; float columns are converted so the record matches a later read.
+    """
+    record = dict(row)
+    for name in FLOAT_FIELDS:
+        if record[name] is not None:
+            record[name] = float(record[name])
+    return record
+
+
+def _update_values(updates: dict) -> dict:
     """
-    Update an existing weather record by ID.
+    Column values for an update, validated against WeatherRecordUpdate.
+    Raises ValueError for unknown fields or bad values.
     """
     try:
-        record = db.query(WeatherRecord).filter(WeatherRecord.id == record_id).first()
-        if not record:
-            return None
+        values = WeatherRecordUpdate.model_validate(updates).model_dump(exclude_unset=True)
+    except ValidationError as e:
+        raise ValueError(_validation_message(e))
+    if "location" in values:
+        # Core UPDATEs bypass the model's validator
+        values["location_normalized"] = normalize_location_name(values["location"])
+    return values
+
+
+def _update_statement(record_id: int, updates: dict):
+    """
+    UPDATE ... RETURNING the changed record, or a plain SELECT of it when
+    there is nothing to change.
+    """
+    table = WeatherRecord.__table__
+    values = _update_values(updates)
+    if not values:
+        return select(*RETURNED_COLUMNS).where(table.c.id == record_id)
+    return (
+        update(table)
+        .where(table.c.id == record_id)
+        .values(values)
+        .returning(*RETURNED_COLUMNS)
+    )
+
+
+def _bulk_update_statement(updates: list[dict]):
+    """
+    (record ids, statement) updating every record in `updates` with one
+    UPDATE ... RETURNING. Each column is set through a CASE on id, so rows
+    keep the columns their update doesn't mention.
+    """
+    if not updates:
+        raise ValueError("No updates given")
+    if len(updates) > MAX_BULK_CHANGES:
+        raise ValueError(f"At most {MAX_BULK_CHANGES} records per request")
+
+    by_id = {}
+    for index, item in enumerate(updates):
+        if not isinstance(item, dict):
+            raise ValueError(f"Update {index}: expected an object")
+        record_id = item.get("id")
+        if not isinstance(record_id, int) or isinstance(record_id, bool):
+            raise ValueError(f"Update {index}: 'id' must be an integer")
+        try:
+            values = _update_values({k: v for k, v in item.items() if k != "id"})
+        except ValueError as e:
+            raise ValueError(f"Update {index}: {e}")
+        by_id.setdefault(record_id, {}).update(values)
+
+    table = WeatherRecord.__table__
+    columns = {}
+    for record_id, values in by_id.items():
+        for name, value in values.items():
+            columns.setdefault(name, {})[record_id] = literal(value, table.c[name].type)
+    ids = list(by_id)
+    if not columns:
+        return ids, select(*RETURNED_COLUMNS).where(table.c.id.in_(ids))
+    stmt = (
+        update(table)
+        .where(table.c.id.in_(ids))
+        .values(
+            {
+                name: case(whens, value=table.c.id, else_=table.c[name])
+                for name, whens in columns.items()
+            }
+        )
+        .returning(*RETURNED_COLUMNS)
+    )
+    return ids, stmt
+
+
+def _bulk_delete_statement(
+    ids: list[int] | None,
+    location: str | None,
+    start: datetime | None,
+    end: datetime | None,
+):
+    """
+    DELETE for the given ids and/or location and saved_on range. Deleting
+    by id returns the deleted ids so missing ones can be reported.
+    """
+    table = WeatherRecord.__table__
+    filters = []
+    if ids:
+        if len(ids) > MAX_BULK_CHANGES:
+            raise ValueError(f"At most {MAX_BULK_CHANGES} ids per request")
+        filters.append(table.c.id.in_(ids))
+    if location:
+        filters.append(table.c.location_normalized == normalize_location_name(location))
+    if start:
+        filters.append(table.c.saved_on >= start)
+    if end:
+        filters.append(table.c.saved_on < end)
+    if not filters:
+        raise ValueError("Give ids, a location or a start/end range to delete")
+
+    stmt = delete(table).where(*filters)
+    return stmt.returning(table.c.id) if ids else stmt
+
 
-        for key, value in updates.items():
-            if hasattr(record, key):
-                setattr(record, key, value)
+def _bulk_update_result(ids: list[int], rows) -> dict:
+    records = [_returned_record(row) for row in rows]
+    found = {record["id"] for record in records}
+    return {
+        "updated": len(records),
+        "not_found": [record_id for record_id in ids if record_id not in found],
+        "data": records,
+    }
 
+
+def _bulk_delete_result(ids: list[int] | None, result) -> dict:
+    if not ids:
+        return {"deleted": result.rowcount}
+    deleted = set(result.scalars().all())
+    return {
+        "deleted": len(deleted),
+        "not_found": [record_id for record_id in dict.fromkeys(ids) if record_id not in deleted],
+    }
+
+
+def update_weather_record_controller(db: Session, record_id: int, updates: dict):
+    """
+    Update an existing weather record by ID with a single
+    UPDATE ... RETURNING. Returns None when there is no such record.
+    """
+    stmt = _update_statement(record_id, updates)
+    try:
+        row = db.execute(stmt).mappings().first()
         db.commit()
-        db.refresh(record)
-        return record
+        return _returned_record(row) if row else None
 
     except SQLAlchemyError as e:
         db.rollback()
@@ -182,19 +1019,31 @@ def update_weather_record_controller(db: Session, record_id: int, updates: dict)
         raise Exception(f"Unexpected error updating record: {str(e)}")
 
 
-def delete_weather_record_controller(db: Session, record_id: int):
+def bulk_update_weather_records(db: Session, updates: list[dict]) -> dict:
     """
-    Delete a weather record by ID.
+    Apply a list of {"id": ..., field: value} updates in one statement.
     """
+    ids, stmt = _bulk_update_statement(updates)
     try:
-        record = db.query(WeatherRecord).filter(WeatherRecord.id == record_id).first()
-        print(record)
-        if not record:
-            return None
+        rows = db.execute(stmt).mappings().all()
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"Database error while updating records: {str(e)}")
+    return _bulk_update_result(ids, rows)
 
-        db.delete(record)
+
+def delete_weather_record_controller(db: Session, record_id: int):
+    """
+    Delete a weather record by ID with a single DELETE ... RETURNING.
+    """
+    table = WeatherRecord.__table__
+    try:
+        deleted = db.execute(
+            delete(table).where(table.c.id == record_id).returning(table.c.id)
+        ).first()
         db.commit()
-        return True
+        return True if deleted else None
 
     except SQLAlchemyError as e:
         db.rollback()
@@ -204,3 +1053,23 @@ def delete_weather_record_controller(db: Session, record_id: int):
     except Exception as e:
         db.rollback()
         raise Exception(f"Unexpected error deleting record: {str(e)}")
+
+
+def bulk_delete_weather_records(
+    db: Session,
+    ids: list[int] | None = None,
+    location: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> dict:
+    """
+    Delete records by id and/or location and saved_on range in one statement.
+    """
+    stmt = _bulk_delete_statement(ids, location, start, end)
+    try:
+        result = _bulk_delete_result(ids, db.execute(stmt))
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise Exception(f"Database error while deleting records: {str(e)}")
+    return result
@@ -1,20 +1,55 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import importlib
-import pkgutil
-import routes as routes_pkg
-from config.database import Base, engine
-from models.weather_record import WeatherRecord
+from config.database import dispose_async_engines, engine
+from config.migrations import DB_MIGRATE_ON_STARTUP, migrate
+from config.http_client import close_http_client
+from config.settings import env_int
+from controllers.weather_controller import subscriptions
+from utils.prewarm import prewarmer
+from utils.retention import retention
+from utils.write_behind import record_writer
+from utils.metrics import METRICS_ENABLED, MetricsMiddleware
+from routes import (
+    forcast_route,
+    locations_route,
+    metrics_route,
+    records_route,
+    stats_route,
+    weather_route,
+)
+
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes belong to `python migrate.py`; this is a one-query
+    # check when the database is already current
+    if DB_MIGRATE_ON_STARTUP:
+        migrate(engine)
+    # The pooled upstream client is created on first use, closed on shutdown
+    prewarmer.start()
+    retention.start()
+    record_writer.start()
+    yield
+    await subscriptions.stop()
+    # Queued saves are committed before the engines go away
+    await record_writer.stop()
+    await retention.stop()
+    await prewarmer.stop()
+    await close_http_client()
+    await dispose_async_engines()
 
 
 app = FastAPI(
     title="Weather App API",
     description="API for detecting weather",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -23,11 +58,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-for _, module_name, _ in pkgutil.iter_modules(routes_pkg.__path__):
-    module = importlib.import_module(f"routes.{module_name}")
-    if hasattr(module, "router"):
-        app.include_router(module.router)
-        print(f"✅ Loaded routes from: {module_name}")
+for module in (
+    forcast_route,
+    locations_route,
+    metrics_route,
+    records_route,
+    stats_route,
+    weather_route,
+):
+    app.include_router(module.router)
 
 
 @app.get("/")
@@ -38,4 +77,4 @@ def root():
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("PORT", 8080)))
+    uvicorn.run("main:app", host="0.0.0.0", port=env_int("PORT", 8080))
@@ -0,0 +1,24 @@
+"""
+Create and migrate the database schema. Run once per deploy (before the
+app starts) and set DB_MIGRATE_ON_STARTUP=false so instances skip it.
+
+    cd backend && python migrate.py
+    cd backend && python migrate.py --force
+"""
+
+import argparse
+from config.database import engine
+from config.migrations import migrate
+
+
+def main(args):
+    if migrate(engine, force=args.force):
+        print("schema migrated")
+    else:
+        print("schema already up to date")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force", action="store_true", help="Migrate even if the schema looks current")
+    main(parser.parse_args())
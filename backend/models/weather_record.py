@@ -1,18 +1,107 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index, JSON, UniqueConstraint
+from sqlalchemy.orm import validates
 from datetime import datetime
 from config.database import Base
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_location_name(location: str | None) -> str | None:
+    """
+    Search form of a location: case-folded with whitespace collapsed.
+    """
+    if location is None:
+        return None
+    return _WHITESPACE.sub(" ", location).strip().casefold()
 
 
 class WeatherRecord(Base):
     __tablename__ = "weather_records"
+    __table_args__ = (
+        # Keyset pagination walks (saved_on DESC, id DESC)
+        Index("ix_weather_records_saved_on_id", "saved_on", "id"),
+        # Per-location time-range scans for /records/stats
+        Index(
+            "ix_weather_records_location_normalized_saved_on",
+            "location_normalized",
+            "saved_on",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     location = Column(String, index=True)
+    location_normalized = Column(String, index=True)
     country = Column(String)
     main = Column(String)
     description = Column(String)
-    temp = Column(String)
-    humidity = Column(String)
-    pressure = Column(String)
-    wind = Column(String)
+    # Stored in canonical units; display formatting happens at response time
+    temp = Column(Float)  # °C
+    humidity = Column(Float)  # %
+    pressure = Column(Float)  # hPa
+    wind = Column(Float)  # km/h
+    icon = Column(String)
+    visibility = Column(Float)  # km
+    lat = Column(Float)
+    lon = Column(Float)
+    observed_at = Column(DateTime)
     saved_on = Column(DateTime, default=datetime.utcnow)
+
+    @validates("location")
+    def _sync_location_normalized(self, key, value):
+        self.location_normalized = normalize_location_name(value)
+        return value
+
+
+class _RollupColumns:
+    """
+    Mergeable aggregates of the records in one (location, bucket, main)
+    group: counts, min/max and sums, so rollups of rollups stay exact.
+    """
+
+    id = Column(Integer, primary_key=True)
+    location_normalized = Column(String, nullable=False)
+    location = Column(String)
+    bucket = Column(DateTime, nullable=False)
+    main = Column(String, nullable=False)  # "" when the records had none
+    count = Column(Integer, nullable=False)
+    temp_min = Column(Float)
+    temp_max = Column(Float)
+    temp_sum = Column(Float)
+    temp_count = Column(Integer)
+    humidity_min = Column(Float)
+    humidity_max = Column(Float)
+    humidity_sum = Column(Float)
+    humidity_count = Column(Integer)
+    pressure_min = Column(Float)
+    pressure_max = Column(Float)
+    pressure_sum = Column(Float)
+    pressure_count = Column(Integer)
+    wind_min = Column(Float)
+    wind_max = Column(Float)
+    wind_sum = Column(Float)
+    wind_count = Column(Integer)
+
+
+class WeatherRollupHourly(_RollupColumns, Base):
+    """
+    Raw records older than RETENTION_RAW_DAYS, compacted per hour.
+    """
+
+    __tablename__ = "weather_rollups_hourly"
+    __table_args__ = (
+        UniqueConstraint("location_normalized", "bucket", "main", name="uq_weather_rollups_hourly_group"),
+        Index("ix_weather_rollups_hourly_bucket", "bucket"),
+    )
+
+
+class WeatherRollupDaily(_RollupColumns, Base):
+    """
+    Hourly rollups older than RETENTION_HOURLY_DAYS, compacted per day.
+    """
+
+    __tablename__ = "weather_rollups_daily"
+    __table_args__ = (
+        UniqueConstraint("location_normalized", "bucket", "main", name="uq_weather_rollups_daily_group"),
+        Index("ix_weather_rollups_daily_bucket", "bucket"),
+    )
@@ -0,0 +1,33 @@
+"""
+Run one retention pass outside the API process (e.g. from cron), or
+convert weather_records to a daily-partitioned table on PostgreSQL.
+
+    cd backend && python retention.py --dry-run
+    cd backend && python retention.py
+    cd backend && python retention.py --partition
+"""
+
+import argparse
+import json
+from config.database import engine
+from config.migrations import migrate
+from utils.retention import partition_weather_records, retention
+
+
+def main(args):
+    migrate(engine)
+    if args.partition:
+        converted = partition_weather_records(engine)
+        print("weather_records partitioned" if converted else "weather_records already partitioned")
+    if args.dry_run:
+        cutoffs = {k: v.isoformat() if v else None for k, v in retention.cutoffs().items()}
+        print(json.dumps({"cutoffs": cutoffs, "pending": retention.pending()}, indent=2))
+        return
+    print(json.dumps(retention.run_once(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be compacted")
+    parser.add_argument("--partition", action="store_true", help="Partition weather_records by day (PostgreSQL)")
+    main(parser.parse_args())
@@ -1,16 +1,22 @@
-import os
-from dotenv import load_dotenv
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request
 from schemas.weather_schema import WeatherRequest
-from controllers.forcast_controller import get_forecast_controller
-
-load_dotenv()
-API_KEY = os.getenv("OPENWEATHER_API_KEY")
+from schemas.forcast_schema import WeeklyForecastResponse
+from controllers.forcast_controller import get_forecast_encoded
+from utils.responses import json_bytes_response
 
 router = APIRouter(prefix="/forecast", tags=["weather"])
 
 
-@router.post("")
+@router.post("", response_model=WeeklyForecastResponse)
 async def weather(req: WeatherRequest):
     loc = req.location.strip()
-    return await get_forecast_controller(loc)
+    return json_bytes_response(await get_forecast_encoded(loc), conditional=False)
+
+
+@router.get("", response_model=WeeklyForecastResponse)
+async def forecast_by_query(request: Request, location: str = Query(...)):
+    """
+    Cacheable variant of POST /forecast: responses carry a strong ETag and
+    a matching If-None-Match returns 304 Not Modified.
+    """
+    return json_bytes_response(await get_forecast_encoded(location.strip()), request)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Query
+from utils.gazetteer import MAX_SUGGESTIONS, gazetteer
+
+router = APIRouter(prefix="/locations", tags=["locations"])
+
+
+@router.get("/suggest")
+def suggest_locations(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+):
+    """
+    Autocomplete place names from the local gazetteer, most populous first.
+    `q` may be qualified like "spring, MA" or "lon, CA". Each result's
+    `query` can be passed back to /weather or /forecast as the location.
+    """
+    places = gazetteer.suggest(q, limit)
+    data = [{**place._asdict(), "query": f"{place.name},{place.country}"} for place in places]
+    return {"success": True, "count": len(data), "data": data}
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+from utils.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter(tags=["stats"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus scrape endpoint. Values are per worker process.
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,16 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from config.database import SessionLocal
+import asyncio
+import orjson
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
+from config.database import (
+    DB_ASYNC,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    async_engine,
+    async_read_engine,
+    AsyncReadSessionLocal,
+    AsyncSessionLocal,
+    ReadSessionLocal,
+    SessionLocal,
+)
+from utils.formatters import format_record
+from utils.write_behind import record_writer
 from controllers.weather_record_controller import (
-    create_weather_record,
-    get_all_weather_records,
-    get_weather_record_by_id,
-    get_weather_record_by_location,
-    update_weather_record_controller,
-    delete_weather_record_controller,
-    export_weather_records_controller,
+    WeatherData,
+    serialize_record,
+    parse_bulk_rows,
+    row_record,
+    weather_row_values,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
 )
 
+if DB_ASYNC:
+    from controllers import weather_record_async_controller as records
+else:
+    from controllers import weather_record_controller as records
+
 router = APIRouter(prefix="/records", tags=["records"])
 
 
@@ -22,67 +42,240 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """
+    Session for read-only routes, bound to DATABASE_READ_URL when a replica
+    is configured (reads may then lag writes by the replication delay).
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Requests queue here, in arrival order, for one of the pool's connections.
+# Waiting in the async pool itself lets newcomers overtake earlier waiters,
+# which shows up as multi-second tail latency under load.
+_async_sessions = asyncio.Semaphore(DB_POOL_SIZE + DB_MAX_OVERFLOW)
+_async_read_sessions = (
+    _async_sessions
+    if async_read_engine is async_engine
+    else asyncio.Semaphore(DB_POOL_SIZE + DB_MAX_OVERFLOW)
+)
+
+
+async def get_async_db():
+    async with _async_sessions, AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with _async_read_sessions, AsyncReadSessionLocal() as db:
+        yield db
+
+
+# Session dependencies for the configured engine (DB_ASYNC)
+write_db = get_async_db if DB_ASYNC else get_db
+read_db = get_async_read_db if DB_ASYNC else get_read_db
+
+
+async def _call(controller, *args):
+    """
+    Await an async controller, or run a sync one in the threadpool so its
+    blocking session calls don't hold up the event loop.
+    """
+    if DB_ASYNC:
+        return await controller(*args)
+    return await run_in_threadpool(controller, *args)
+
+
+async def _write_records(rows: list[dict]) -> list[dict]:
+    """
+    One group commit for record_writer, on a session of its own.
+    """
+    if DB_ASYNC:
+        async with _async_sessions, AsyncSessionLocal() as db:
+            return await records.insert_weather_rows(db, rows)
+    db = SessionLocal()
+    try:
+        return await _call(records.insert_weather_rows, db, rows)
+    finally:
+        db.close()
+
+
+record_writer.register(_write_records)
+
+
+async def _no_db():
+    # async so FastAPI doesn't hop to the threadpool for it
+    return None
+
+
+# With write-behind, /records/save never holds a session of its own
+save_db = _no_db if record_writer.enabled else write_db
+
+
+def _split_fields(fields: str | None) -> list[str] | None:
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
+
+def _present(record, raw: bool = False) -> dict:
+    """
+    Records are stored as numbers; format them for display unless `raw`.
+    """
+    if not isinstance(record, dict):
+        record = serialize_record(record)
+    return record if raw else format_record(record)
+
+
+def _page_response(page: dict, raw: bool = False) -> dict:
+    response = {
+        "success": True,
+        "count": len(page["data"]),
+        "next_cursor": page["next_cursor"],
+        "data": [_present(record, raw) for record in page["data"]],
+    }
+    if "total" in page:
+        response["total"] = page["total"]
+    return response
+
+
 @router.get("")
-def list_weather_records(db: Session = Depends(get_db)):
+async def list_weather_records(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None),
+    fields: str | None = Query(None, description="Comma-separated columns"),
+    include_total: bool = Query(False),
+    raw: bool = Query(False, description="Return numeric values unformatted"),
+    db=Depends(read_db),
+):
     """
-    Retrieve all saved weather records.
+    Retrieve saved weather records, newest first, one page at a time.
+    Pass the returned `next_cursor` back as `cursor` for the next page.
     """
     try:
-        records = get_all_weather_records(db)
-        return {"success": True, "count": len(records), "data": records}
+        page = await _call(
+            records.get_all_weather_records,
+            db,
+            limit,
+            cursor,
+            _split_fields(fields),
+            include_total,
+        )
+        return _page_response(page, raw)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/filter")
-def list_weather_records_by_location(location: str, db: Session = Depends(get_db)):
+async def list_weather_records_by_location(
+    location: str,
+    match: str = Query("contains", description="contains, prefix or exact"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None),
+    fields: str | None = Query(None, description="Comma-separated columns"),
+    include_total: bool = Query(False),
+    raw: bool = Query(False, description="Return numeric values unformatted"),
+    db=Depends(read_db),
+):
     """
-    Retrieve all weather records for a given location.
+    Retrieve weather records for a given location, one page at a time.
     """
     try:
-        records = get_weather_record_by_location(db, location)
-        if not records:
+        page = await _call(
+            records.get_weather_record_by_location,
+            db,
+            location,
+            match,
+            limit,
+            cursor,
+            _split_fields(fields),
+            include_total,
+        )
+        if not page["data"] and not cursor:
             raise HTTPException(
                 status_code=404, detail=f"No records found for location '{location}'"
             )
-        return {"success": True, "count": len(records), "data": records}
+        return _page_response(page, raw)
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/stats")
+async def weather_record_stats(
+    bucket: str = Query("day", description="hour, day or week"),
+    location: str | None = Query(None),
+    start: datetime | None = Query(None),
+    end: datetime | None = Query(None),
+    db=Depends(read_db),
+):
+    """
+    Min/max/avg temperature, humidity, pressure and wind plus the dominant
+    condition, per location and time bucket. With retention enabled, history
+    older than STATS_RAW_DAYS days comes from the rollups.
+    """
+    try:
+        stats = await _call(records.get_weather_record_stats, db, bucket, location, start, end)
+        return {"success": True, "count": len(stats), "data": stats}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/export")
-def export_weather_records(id: int | None = Query(None), db: Session = Depends(get_db)):
+async def export_weather_records(
+    id: int | None = Query(None),
+    gzip: bool = Query(False),
+    format: str = Query("csv", description="csv, ndjson, arrow or parquet"),
+    db=Depends(read_db),
+):
     """
     Export all weather records or a single record by ID.
     Example:
-      /records/export         → All records
-      /record/export?id=3     → Single record
+      /records/export                 → All records as CSV
+      /record/export?id=3             → Single record
+      /records/export?gzip=true       → All records, gzip-compressed on the fly
+      /records/export?format=parquet  → All records as Parquet
     """
     try:
-        response = export_weather_records_controller(db, id)
+        response = await _call(records.export_weather_records_controller, db, id, gzip, format)
         if not response:
             raise HTTPException(status_code=404, detail="No records found for export.")
         return response
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{record_id}")
-def get_weather_record(record_id: int, db: Session = Depends(get_db)):
+async def get_weather_record(
+    record_id: int,
+    raw: bool = Query(False, description="Return numeric values unformatted"),
+    db=Depends(read_db),
+):
     """
     Retrieve a single weather record by its ID.
     """
     try:
-        record = get_weather_record_by_id(db, record_id)
+        record = await _call(records.get_weather_record_by_id, db, record_id)
         if not record:
             raise HTTPException(
                 status_code=404, detail=f"Record with ID {record_id} not found"
             )
-        return {"success": True, "data": record}
+        return {"success": True, "data": _present(record, raw)}
     except HTTPException:
         raise
     except Exception as e:
@@ -90,28 +283,123 @@ def get_weather_record(record_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/save")
-def save_weather_record(data: dict, db: Session = Depends(get_db)):
+async def save_weather_record(data: WeatherData, db=Depends(save_db)):
     """
     Save a new weather record to the database.
+
+    With WRITE_BEHIND_ENABLED the record is committed together with other
+    saves; under WRITE_BEHIND_ACK=enqueue the reply is 202 as soon as it is
+    queued, and carries no id yet.
     """
     try:
-        record = create_weather_record(db, data)
-        return {
+        if not record_writer.enabled:
+            record = await _call(records.create_weather_record, db, data)
+        else:
+            row = weather_row_values(data)
+            record = await record_writer.submit(row)
+            if record is None:
+                body = {
+                    "success": True,
+                    "message": "Weather record queued",
+                    "data": _present(row_record(row)),
+                }
+                return Response(orjson.dumps(body), status_code=202, media_type="application/json")
+        body = {
             "success": True,
             "message": "Weather record created successfully",
-            "data": record,
+            "data": _present(record),
         }
+        # Same bytes as the default JSONResponse, without jsonable_encoder
+        return Response(orjson.dumps(body), media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/bulk")
+async def bulk_save_weather_records(request: Request, db=Depends(write_db)):
+    """
+    Save many weather records at once from a JSON array, NDJSON or CSV body
+    (or a multipart upload with a `file` field). Invalid rows are skipped
+    and reported back with their row number.
+    """
+    content_type = request.headers.get("content-type", "application/json")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing 'file' upload.")
+        body = await upload.read()
+        content_type = upload.content_type or "text/csv"
+    else:
+        body = await request.body()
+
+    try:
+        rows = parse_bulk_rows(body, content_type)
+        result = await _call(records.bulk_create_weather_records, db, rows)
+        return {"success": True, **result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.patch("")
+async def bulk_update_weather_records(updates: list[dict], db=Depends(write_db)):
+    """
+    Update many records at once from a list of {"id": ..., field: value}
+    objects, in a single statement. Unknown ids are reported back.
+    """
+    try:
+        result = await _call(records.bulk_update_weather_records, db, updates)
+        return {
+            "success": True,
+            "updated": result["updated"],
+            "not_found": result["not_found"],
+            "data": [_present(record) for record in result["data"]],
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("")
+async def bulk_delete_weather_records(
+    ids: str | None = Query(None, description="Comma-separated record IDs"),
+    location: str | None = Query(None),
+    start: datetime | None = Query(None),
+    end: datetime | None = Query(None),
+    db=Depends(write_db),
+):
+    """
+    Delete records by ID list and/or by location and saved_on range, in a
+    single statement. At least one filter is required.
+    Example:
+      DELETE /records?ids=3,4,5
+      DELETE /records?location=Accra&end=2024-01-01
+    """
+    try:
+        try:
+            record_ids = [int(i) for i in _split_fields(ids) or []]
+        except ValueError:
+            raise ValueError("ids must be comma-separated integers")
+        result = await _call(
+            records.bulk_delete_weather_records, db, record_ids, location, start, end
+        )
+        return {"success": True, **result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.put("/{record_id}")
-def update_weather_record(record_id: int, updates: dict, db: Session = Depends(get_db)):
+async def update_weather_record(record_id: int, updates: dict, db=Depends(write_db)):
     """
     Update a specific weather record.
     """
     try:
-        updated = update_weather_record_controller(db, record_id, updates)
+        updated = await _call(records.update_weather_record_controller, db, record_id, updates)
         if not updated:
             raise HTTPException(
                 status_code=404, detail=f"Record with ID {record_id} not found"
@@ -119,21 +407,23 @@ def update_weather_record(record_id: int, updates: dict, db: Session = Depends(g
         return {
             "success": True,
             "message": "Weather record updated successfully",
-            "data": updated,
+            "data": _present(updated),
         }
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.delete("/{record_id}")
-def delete_weather_record(record_id: int, db: Session = Depends(get_db)):
+async def delete_weather_record(record_id: int, db=Depends(write_db)):
     """
     Delete a specific weather record by ID.
     """
     try:
-        deleted = delete_weather_record_controller(db, record_id)
+        deleted = await _call(records.delete_weather_record_controller, db, record_id)
         if not deleted:
             raise HTTPException(
                 status_code=404, detail=f"Record with ID {record_id} not found"
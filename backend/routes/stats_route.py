@@ -0,0 +1,64 @@
+from fastapi import APIRouter
+from controllers.weather_controller import subscriptions
+from utils.cache import cache_backend, forecast_cache, stale_backend, weather_cache
+from utils.prewarm import prewarmer
+from utils.retention import retention
+from utils.upstream import upstream
+from utils.write_behind import record_writer
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("/cache")
+def cache_stats():
+    """
+    Hit/miss/coalesced counters for the weather and forecast caches and the
+    prewarm scheduler. Counters are per worker; backend size is shared when
+    the backend is.
+    """
+    return {
+        "success": True,
+        "data": {
+            "weather": weather_cache.stats(),
+            "forecast": forecast_cache.stats(),
+            "backend": cache_backend.stats(),
+            "stale_backend": stale_backend.stats(),
+            "prewarm": prewarmer.stats(),
+        },
+    }
+
+
+@router.get("/upstream")
+def upstream_stats():
+    """
+    Circuit breaker state, rate limiter and retry budget counters for the
+    OpenWeather client in this worker.
+    """
+    return {"success": True, "data": upstream.stats()}
+
+
+@router.get("/retention")
+def retention_stats():
+    """
+    Retention worker settings, pass/failure counters and what the last pass
+    compacted, expired or dropped in this worker.
+    """
+    return {"success": True, "data": retention.stats()}
+
+
+@router.get("/subscriptions")
+def subscription_stats():
+    """
+    Open live-weather connections, refreshed locations and push counters
+    for this worker.
+    """
+    return {"success": True, "data": subscriptions.stats()}
+
+
+@router.get("/writes")
+def write_stats():
+    """
+    Write-behind queue depth and group-commit counters for /records/save
+    in this worker.
+    """
+    return {"success": True, "data": record_writer.stats()}
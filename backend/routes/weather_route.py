@@ -1,16 +1,71 @@
-import os
-from dotenv import load_dotenv
-from fastapi import APIRouter
-from schemas.weather_schema import WeatherRequest
-from controllers.weather_controller import get_weather
-
-load_dotenv()
-API_KEY = os.getenv("OPENWEATHER_API_KEY")
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket
+from fastapi.responses import StreamingResponse
+from schemas.weather_schema import WeatherRequest, WeatherBatchRequest, WeatherResponse
+from controllers.weather_controller import (
+    get_weather_encoded,
+    get_weather_batch,
+    open_weather_stream,
+    serve_weather_socket,
+    stream_weather_batch,
+)
+from utils.responses import json_bytes_response
 
 router = APIRouter(prefix="/weather", tags=["weather"])
 
 
-@router.post("")
+@router.post("", response_model=WeatherResponse)
 async def weather(req: WeatherRequest):
     loc = req.location.strip()
-    return await get_weather(loc)
+    return json_bytes_response(await get_weather_encoded(loc), conditional=False)
+
+
+@router.get("", response_model=WeatherResponse)
+async def weather_by_query(request: Request, location: str = Query(...)):
+    """
+    Cacheable variant of POST /weather: responses carry a strong ETag and
+    a matching If-None-Match returns 304 Not Modified.
+    """
+    return json_bytes_response(await get_weather_encoded(location.strip()), request)
+
+
+@router.post("/batch")
+async def weather_batch(req: WeatherBatchRequest, stream: bool = Query(False)):
+    """
+    Fetch current weather for many locations in one call.
+    Duplicate locations are resolved once. With `?stream=true` results are
+    sent as NDJSON, one line per location, in completion order.
+    """
+    locations = [item.location.strip() for item in req.locations]
+    if stream:
+        return StreamingResponse(
+            stream_weather_batch(locations), media_type="application/x-ndjson"
+        )
+    results = await get_weather_batch(locations)
+    return {"success": True, "count": len(results), "data": results}
+
+
+@router.get("/subscribe")
+async def subscribe_weather(location: list[str] = Query(...)):
+    """
+    Live weather as Server-Sent Events for one or more `?location=`.
+    A "subscribed" event lists each location's key, then a "weather" event
+    carries the current payload and every later change for that key.
+    """
+    try:
+        events = await open_weather_stream([loc.strip() for loc in location])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/subscribe")
+async def subscribe_weather_socket(websocket: WebSocket):
+    """
+    Same updates over a WebSocket; subscriptions can be changed by sending
+    {"action": "subscribe" | "unsubscribe", "locations": [...]}.
+    """
+    await serve_weather_socket(websocket)
@@ -3,6 +3,8 @@ from pydantic import BaseModel
 
 class DailyForecast(BaseModel):
     date: str
+    day: str
+    main: str
     temp_min: float
     temp_max: float
     description: str
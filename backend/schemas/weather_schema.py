@@ -7,6 +7,10 @@ class WeatherRequest(BaseModel):
     date_range: Optional[str] = None
 
 
+class WeatherBatchRequest(BaseModel):
+    locations: list[WeatherRequest] = Field(..., min_length=1, max_length=250)
+
+
 class SunriseAndSunset(BaseModel):
     sunrise: Optional[str] = Field(None, example="06:00 AM")
     sunset: Optional[str] = Field(None, example="06:14 PM")
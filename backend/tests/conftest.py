@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+
+# Settings are read at import time, so the test database and switches must
+# be in place before any app module is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ.setdefault("PREWARM_ENABLED", "false")
+os.environ.setdefault("METRICS_ENABLED", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def db(client):
+    from config.database import SessionLocal
+
+    session = SessionLocal()
+    yield session
+    session.close()
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+from models.weather_record import WeatherRecord
+
+MEASURED = ("location", "country", "main", "description", "temp", "humidity", "pressure", "wind")
+
+
+def upload_csv(client, body: bytes) -> dict:
+    response = client.post("/records/bulk", content=body, headers={"content-type": "text/csv"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def stored(db) -> list[dict]:
+    db.expire_all()
+    records = db.execute(select(WeatherRecord).order_by(WeatherRecord.location)).scalars()
+    return [{name: getattr(record, name) for name in MEASURED} for record in records]
+
+
+def test_csv_export_uploads_again(client, db):
+    db.execute(delete(WeatherRecord))
+    db.add_all(
+        [
+            WeatherRecord(
+                location="Accra", country="GH", main="Clouds", description="overcast clouds",
+                temp=25.6, humidity=81, pressure=1014, wind=6.4, saved_on=datetime(2025, 5, 1),
+            ),
+            WeatherRecord(
+                location="Lomé", country="TG", main="Clear", description="clear sky",
+                temp=-1.5, humidity=60, pressure=1009.5, wind=0, saved_on=datetime(2025, 5, 2),
+            ),
+        ]
+    )
+    db.commit()
+    before = stored(db)
+    exported = client.get("/records/export?format=csv").content
+    db.execute(delete(WeatherRecord))
+    db.commit()
+
+    result = upload_csv(client, exported)
+
+    assert (result["inserted"], result["rejected"]) == (2, 0)
+    assert stored(db) == before
+
+
+def test_csv_empty_optional_cells_are_null(client, db):
+    db.execute(delete(WeatherRecord))
+    db.commit()
+    body = (
+        "location,country,main,description,temp,humidity,pressure,wind,"
+        "icon,visibility,lat,lon,observed_at\n"
+        "Accra,GH,Clouds,overcast clouds,25.6,81,1014,6.4,,,,,\n"
+        "Tema,GH,Rain,light rain,24,90,1012,3,10d,8.5,5.67,-0.01,2025-05-01T12:00:00\n"
+    ).encode()
+
+    result = upload_csv(client, body)
+
+    assert (result["inserted"], result["rejected"]) == (2, 0)
+    records = {record.location: record for record in db.execute(select(WeatherRecord)).scalars()}
+    accra, tema = records["Accra"], records["Tema"]
+    assert (accra.icon, accra.visibility, accra.lat, accra.lon, accra.observed_at) == (
+        None, None, None, None, None
+    )
+    assert (tema.icon, tema.visibility, tema.lat, tema.observed_at) == (
+        "10d", 8.5, 5.67, datetime(2025, 5, 1, 12)
+    )
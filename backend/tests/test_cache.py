@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from utils.cache import TTLCache
+from utils.cache_backends import MemoryCacheBackend, SQLiteCacheBackend
+
+
+class SlowFetch:
+    """
+    Returns `value` (or raises it) once released, counting calls.
+    """
+
+    def __init__(self, value):
+        self.value = value
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.value, Exception):
+            raise self.value
+        return self.value
+
+
+def test_cancelled_caller_does_not_cancel_coalesced_ones():
+    async def scenario():
+        cache = TTLCache(MemoryCacheBackend(maxsize=16), "weather", ttl=60)
+        fetch = SlowFetch({"temp": 25.6})
+        leader = asyncio.create_task(cache.get_or_fetch("accra", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_fetch("accra", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        fetch.release.set()
+
+        assert await follower == {"temp": 25.6}
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert fetch.calls == 1
+        assert cache.get("accra") == {"temp": 25.6}
+        assert cache.stats()["coalesced"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_fetch_reaches_every_caller_and_is_not_cached():
+    async def scenario():
+        cache = TTLCache(MemoryCacheBackend(maxsize=16), "weather", ttl=60)
+        fetch = SlowFetch(RuntimeError("upstream down"))
+        callers = [asyncio.create_task(cache.get_or_fetch("accra", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        fetch.release.set()
+
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert [str(result) for result in results] == ["upstream down"] * 3
+        assert fetch.calls == 1
+        assert cache.get("accra") is None
+
+    asyncio.run(scenario())
+
+
+def test_stale_copies_do_not_evict_fresh_entries(tmp_path):
+    for backend, stale in (
+        (MemoryCacheBackend(maxsize=4), MemoryCacheBackend(maxsize=2)),
+        (
+            SQLiteCacheBackend(str(tmp_path / "cache.db"), maxsize=4, prune_every=1),
+            SQLiteCacheBackend(
+                str(tmp_path / "cache.db"), maxsize=2, prune_every=1, table="cache_stale"
+            ),
+        ),
+    ):
+        cache = TTLCache(backend, "weather", ttl=60, stale_ttl=86400, stale_backend=stale)
+        for i in range(4):
+            cache.set(f"city-{i}", {"temp": i})
+
+        assert [cache.get(f"city-{i}") for i in range(4)] == [{"temp": i} for i in range(4)]
+        assert backend.size() == 4
+        assert stale.size() == 2
+        assert cache.get_stale_encoded("city-3") == b'{"temp":3}'
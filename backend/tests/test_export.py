@@ -0,0 +1,94 @@
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete, select
+
+from controllers.weather_record_controller import RECORD_FIELDS
+from models.weather_record import WeatherRecord
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+FLOAT_FIELDS = ("temp", "humidity", "pressure", "wind", "visibility", "lat", "lon")
+TIMESTAMP_FIELDS = ("observed_at", "saved_on")
+
+
+@pytest.fixture
+def stored(db):
+    """
+    Three records covering nulls and fractional values, as the database
+    returns them, newest first like the export.
+    """
+    db.execute(delete(WeatherRecord))
+    db.add_all(
+        [
+            WeatherRecord(
+                location="Accra", country="GH", main="Clouds", description="overcast clouds",
+                temp=25.6, humidity=81, pressure=1014, wind=6.4, icon="04d", visibility=10,
+                lat=5.556, lon=-0.1969, observed_at=datetime(2025, 5, 1, 11, 50),
+                saved_on=datetime(2025, 5, 1, 12, 0, 0, 250000),
+            ),
+            WeatherRecord(
+                location="Kumasi", country="GH", main="Rain", description="light rain",
+                temp=-1.5, humidity=99.5, pressure=None, wind=0, icon=None, visibility=None,
+                lat=None, lon=None, observed_at=None, saved_on=datetime(2025, 5, 2, 8, 30),
+            ),
+            WeatherRecord(
+                location="Lomé", country="TG", main="Clear", description="clear sky",
+                temp=31, humidity=60, pressure=1009.5, wind=3.1, icon="01d", visibility=8.2,
+                lat=6.1375, lon=1.2123, observed_at=datetime(2025, 5, 3, 14, 0),
+                saved_on=datetime(2025, 5, 3, 14, 5),
+            ),
+        ]
+    )
+    db.commit()
+    columns = [WeatherRecord.__table__.c[name] for name in RECORD_FIELDS]
+    stmt = select(*columns).order_by(WeatherRecord.saved_on.desc(), WeatherRecord.id.desc())
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+
+def export(client, format: str) -> bytes:
+    response = client.get(f"/records/export?format={format}")
+    assert response.status_code == 200
+    return response.content
+
+
+def test_ndjson_round_trip(client, stored):
+    rows = [json.loads(line) for line in export(client, "ndjson").splitlines()]
+
+    assert len(rows) == len(stored)
+    for row, expected in zip(rows, stored):
+        assert isinstance(row["id"], int)
+        for field in FLOAT_FIELDS:
+            assert row[field] is None or isinstance(row[field], float)
+        for field in TIMESTAMP_FIELDS:
+            if row[field] is not None:
+                row[field] = datetime.fromisoformat(row[field])
+        assert row == expected
+
+
+def check_arrow_table(table, stored):
+    schema = table.schema
+    assert pa.types.is_int64(schema.field("id").type)
+    for field in FLOAT_FIELDS:
+        assert pa.types.is_floating(schema.field(field).type)
+    for field in TIMESTAMP_FIELDS:
+        assert pa.types.is_timestamp(schema.field(field).type)
+    assert schema.names == list(RECORD_FIELDS)
+    assert table.to_pylist() == stored
+
+
+def test_arrow_round_trip(client, stored):
+    table = pa.ipc.open_stream(export(client, "arrow")).read_all()
+    check_arrow_table(table, stored)
+
+
+def test_parquet_round_trip(client, stored):
+    table = pq.read_table(io.BytesIO(export(client, "parquet")))
+    check_arrow_table(table, stored)
+
+
+def test_unknown_format_is_rejected(client, stored):
+    assert client.get("/records/export?format=xml").status_code == 400
@@ -0,0 +1,157 @@
+import asyncio
+import random
+
+from fastapi import HTTPException
+
+from utils.prewarm import Prewarmer
+from utils.upstream import UpstreamError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.now += delay
+        await asyncio.sleep(0)
+
+
+class StubCache:
+    """
+    Seconds to expiry per key; a missing key is not cached.
+    """
+
+    def __init__(self, **remaining):
+        self.remaining = remaining
+
+    def ttl_remaining(self, key):
+        return self.remaining.get(key)
+
+
+class StubUpstream:
+    """
+    Refresh function failing with `errors[location]` and otherwise caching
+    the location for `ttl` seconds.
+    """
+
+    def __init__(self, cache, ttl=600, **errors):
+        self.cache = cache
+        self.ttl = ttl
+        self.errors = errors
+        self.calls = []
+
+    async def __call__(self, location):
+        self.calls.append(location)
+        if location in self.errors:
+            raise self.errors[location]
+        self.cache.remaining[location] = self.ttl
+
+
+def prewarmer(clock, **kwargs) -> Prewarmer:
+    settings = dict(top_k=10, lead=90, rate=1000, jitter=0, quota=100, quota_window=60)
+    settings.update(kwargs)
+    return Prewarmer(
+        **settings, enabled=True, clock=clock, sleep=clock.sleep, rng=random.Random(1)
+    )
+
+
+def record(warmer, kind, key, times=1):
+    for _ in range(times):
+        warmer.record(kind, key, key)
+
+
+def test_due_is_uncached_or_expiring_keys_most_popular_first():
+    clock = FakeClock()
+    warmer = prewarmer(clock)
+    warmer.register("weather", StubCache(fresh=600, expiring=30), StubUpstream(None))
+    record(warmer, "weather", "fresh", 5)
+    record(warmer, "weather", "expiring", 2)
+    record(warmer, "weather", "missing", 3)
+    record(warmer, "forecast", "unregistered", 9)
+
+    assert warmer.due() == [("weather", "missing"), ("weather", "expiring")]
+
+
+def test_quota_caps_refreshes_per_window():
+    clock = FakeClock()
+    cache = StubCache()
+    refresh = StubUpstream(cache)
+    warmer = prewarmer(clock, quota=2)
+    warmer.register("weather", cache, refresh)
+    for times, key in enumerate(["a", "b", "c"]):
+        record(warmer, "weather", key, 3 - times)
+
+    assert asyncio.run(warmer.run_once()) == 2
+    assert refresh.calls == ["a", "b"]
+    assert warmer.quota_exhausted == 1
+
+    clock.now += 60
+    assert asyncio.run(warmer.run_once()) == 1
+    assert refresh.calls == ["a", "b", "c"]
+    assert warmer.stats()["quota_used"] == 1
+
+
+def test_rejected_keys_are_dropped_and_unavailable_ones_kept():
+    clock = FakeClock()
+    cache = StubCache()
+    refresh = StubUpstream(
+        cache,
+        Lodnon=HTTPException(status_code=400, detail="Could not fetch weather for 'Lodnon'."),
+        Paris=UpstreamError("HTTP 503", status_code=503),
+    )
+    warmer = prewarmer(clock)
+    warmer.register("weather", cache, refresh)
+    record(warmer, "weather", "Lodnon")
+    record(warmer, "weather", "Paris")
+
+    assert asyncio.run(warmer.run_once()) == 0
+    assert warmer.stats()["failed"] == 2
+    assert warmer.stats()["dropped"] == 1
+    assert warmer.due() == [("weather", "Paris")]
+
+    asyncio.run(warmer.run_once())
+    assert refresh.calls.count("Lodnon") == 1
+    assert refresh.calls.count("Paris") == 2
+
+
+def test_stop_cancels_the_scheduler():
+    clock = FakeClock()
+    cache = StubCache()
+    refresh = StubUpstream(cache)
+    warmer = prewarmer(clock, interval=30)
+    warmer.register("weather", cache, refresh)
+    record(warmer, "weather", "a")
+
+    async def scenario():
+        warmer.start()
+        assert warmer.stats()["running"]
+        while warmer.passes < 3:
+            await asyncio.sleep(0)
+        await warmer.stop()
+
+    asyncio.run(scenario())
+    stats = warmer.stats()
+    assert not stats["running"]
+    assert stats["passes"] == 3
+    assert refresh.calls == ["a"]
+
+
+def test_weather_batch_records_only_answered_locations(monkeypatch):
+    from controllers import weather_controller
+
+    monkeypatch.setattr(weather_controller, "API_KEY", "")
+    warmer = prewarmer(FakeClock())
+    monkeypatch.setattr(weather_controller, "prewarmer", warmer)
+    key, _ = weather_controller.location_query("Prewarm Batch City")
+    weather_controller.weather_cache.set(key, {"temp": 25.6})
+
+    results = asyncio.run(
+        weather_controller.get_weather_batch(["Prewarm Batch City", "Lodnon Prewarm"])
+    )
+
+    assert [result["success"] for result in results] == [True, False]
+    assert warmer.stats()["tracked"] == 1
+    assert warmer.popular() == [("weather", key)]
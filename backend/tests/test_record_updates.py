@@ -0,0 +1,31 @@
+SAVE_BODY = {
+    "location": "Accra", "country": "GH", "main": "Clouds", "description": "overcast clouds",
+    "temp": "25.6", "humidity": "81", "pressure": "1014", "wind": "6.4",
+}
+
+
+def saved_id(client) -> int:
+    response = client.post("/records/save", json=SAVE_BODY)
+    assert response.status_code == 200
+    return response.json()["data"]["id"]
+
+
+def test_put_returns_the_record_as_read_back(client):
+    record_id = saved_id(client)
+    response = client.put(f"/records/{record_id}", json={"temp": "30", "lat": 5})
+
+    assert response.status_code == 200
+    assert response.json()["data"]["temp"] == "30.0 °C"
+    assert response.json()["data"] == client.get(f"/records/{record_id}").json()["data"]
+
+
+def test_patch_returns_the_records_as_read_back(client):
+    record_ids = [saved_id(client), saved_id(client)]
+    response = client.patch(
+        "/records",
+        json=[{"id": record_ids[0], "temp": 31, "humidity": "40"}, {"id": record_ids[1], "wind": 2}],
+    )
+
+    assert response.status_code == 200
+    for record in response.json()["data"]:
+        assert record == client.get(f"/records/{record['id']}").json()["data"]
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from controllers import weather_record_controller as controller
+from models.weather_record import WeatherRecord
+
+NOW = datetime(2025, 6, 1, 12, 30)
+
+
+def saved(db, location, *ages_in_days):
+    for days in ages_in_days:
+        db.add(
+            WeatherRecord(
+                location=location, country="GH", main="Clouds", description="overcast",
+                temp=25.0, humidity=80, pressure=1013, wind=5.0,
+                saved_on=NOW - timedelta(days=days),
+            )
+        )
+    db.commit()
+
+
+def days_counted(db, location) -> list[int]:
+    stats = controller.get_weather_record_stats(db, "day", location, now=NOW)
+    return [entry["count"] for entry in stats]
+
+
+def test_stats_keep_raw_history_without_retention(db):
+    saved(db, "Stats Without Retention", 1, 40, 100)
+
+    assert controller.STATS_RAW_DAYS == 0
+    assert days_counted(db, "Stats Without Retention") == [1, 1, 1]
+
+
+def test_stats_read_old_raw_rows_until_they_are_compacted(db, monkeypatch):
+    monkeypatch.setattr(controller, "STATS_RAW_DAYS", 31)
+    saved(db, "Stats Before Compaction", 1, 40, 100)
+
+    assert days_counted(db, "Stats Before Compaction") == [1, 1, 1]
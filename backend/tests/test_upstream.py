@@ -0,0 +1,73 @@
+import asyncio
+import random
+
+import httpx
+import pytest
+
+from utils.upstream import CircuitBreaker, RetryBudget, TokenBucket, Upstream, UpstreamError
+
+
+class StubClient:
+    """
+    Answers every GET with the next of `responses` (status, headers), the
+    last one repeating.
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def __call__(self):
+        return self
+
+    async def get(self, path, params=None):
+        status, headers = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        return httpx.Response(status, headers=headers, request=httpx.Request("GET", path))
+
+
+async def no_sleep(delay):
+    pass
+
+
+def upstream(client, max_retries=2) -> Upstream:
+    return Upstream(
+        limiter=TokenBucket(1000, 1000, 1, sleep=no_sleep),
+        budget=RetryBudget(1, 100, 100),
+        breaker=CircuitBreaker(100, 30),
+        max_retries=max_retries,
+        client=client,
+        sleep=no_sleep,
+        rng=random.Random(1),
+    )
+
+
+def failure(client) -> UpstreamError:
+    with pytest.raises(UpstreamError) as raised:
+        asyncio.run(upstream(client).get("/weather", {}))
+    return raised.value
+
+
+@pytest.mark.parametrize(
+    "responses, status_code",
+    [
+        ([(429, {})], 503),
+        ([(429, {"Retry-After": "1"})], 503),
+        ([(503, {})], 503),
+        ([(500, {})], 502),
+        ([(502, {})], 502),
+        ([(500, {}), (429, {})], 503),
+        ([(429, {}), (500, {})], 502),
+    ],
+)
+def test_status_follows_the_last_upstream_answer(responses, status_code):
+    client = StubClient(*responses)
+    assert failure(client).status_code == status_code
+    assert client.calls == 3
+
+
+def test_non_retryable_answers_are_returned():
+    client = StubClient((404, {}))
+    response = asyncio.run(upstream(client).get("/weather", {}))
+    assert response.status_code == 404
+    assert client.calls == 1
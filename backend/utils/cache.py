@@ -0,0 +1,286 @@
+from config.settings import env, env_float, env_int
+from utils.cache_backends import CacheBackend, MemoryCacheBackend, SQLiteCacheBackend
+from utils.gazetteer import gazetteer
+from utils.metrics import Counter, Gauge
+import asyncio
+import orjson
+import re
+
+CACHE_BACKEND = env("CACHE_BACKEND", "memory")
+CACHE_SQLITE_PATH = env("CACHE_SQLITE_PATH", "./weather_cache.db")
+CACHE_SQLITE_BUSY_TIMEOUT_MS = env_float("CACHE_SQLITE_BUSY_TIMEOUT_MS", 50)
+CACHE_MAX_ENTRIES = env_int("CACHE_MAX_ENTRIES", 2048)
+# Stale copies have their own budget so they never push out fresh entries
+CACHE_STALE_MAX_ENTRIES = env_int("CACHE_STALE_MAX_ENTRIES", CACHE_MAX_ENTRIES)
+WEATHER_CACHE_TTL = env_float("WEATHER_CACHE_TTL", 600)
+FORECAST_CACHE_TTL = env_float("FORECAST_CACHE_TTL", 1800)
+STALE_CACHE_TTL = env_float("STALE_CACHE_TTL", 86400)
+CACHE_GRID_DEGREES = env_float("CACHE_GRID_DEGREES", 0.01)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _snap(value: float) -> float:
+    return round(round(value / CACHE_GRID_DEGREES) * CACHE_GRID_DEGREES, 6)
+
+
+def location_query(location: str) -> tuple[str, dict]:
+    """
+    Normalize a free-text location into a cache key and the OpenWeather
+    query params that produce it.
+
+    "lat,lon" pairs are snapped to a CACHE_GRID_DEGREES grid. Names the
+    gazetteer knows are replaced by the place's coordinates, so "Kumasi",
+    " kumasi " and "Kumasi,GH" share one entry and one upstream query.
+    Anything else is passed on as a city name, case-folded with whitespace
+    collapsed.
+    """
+    if "," in location:
+        parts = [p.strip() for p in location.split(",")]
+        try:
+            lat, lon = _snap(float(parts[0])), _snap(float(parts[1]))
+            return f"coord:{lat},{lon}", {"lat": lat, "lon": lon}
+        except (ValueError, IndexError):
+            pass
+
+    place = gazetteer.resolve(location)
+    if place is not None:
+        lat, lon = _snap(place.lat), _snap(place.lon)
+        return f"coord:{lat},{lon}", {"lat": lat, "lon": lon}
+
+    name = ",".join(
+        _WHITESPACE.sub(" ", part).strip() for part in location.casefold().split(",")
+    )
+    return f"q:{name}", {"q": name}
+
+
+def create_cache_backend(
+    kind: str = CACHE_BACKEND, maxsize: int = CACHE_MAX_ENTRIES, table: str = "cache"
+) -> CacheBackend:
+    """
+    Build the configured backend: "memory" (per worker) or "sqlite"
+    (shared by all workers on the host through CACHE_SQLITE_PATH, in
+    `table`).
+    """
+    if kind == "memory":
+        return MemoryCacheBackend(maxsize=maxsize)
+    if kind == "sqlite":
+        return SQLiteCacheBackend(
+            CACHE_SQLITE_PATH,
+            maxsize=maxsize,
+            busy_timeout=CACHE_SQLITE_BUSY_TIMEOUT_MS / 1000,
+            table=table,
+        )
+    raise ValueError(f"Unknown CACHE_BACKEND '{kind}' (expected memory or sqlite)")
+
+
+def encode(value) -> bytes:
+    return orjson.dumps(value)
+
+
+def decode(raw: bytes):
+    return orjson.loads(raw)
+
+
+class TTLCache:
+    """
+    Namespaced view over a CacheBackend with a TTL and single-flight loading.
+
+    Entries are stored as compact JSON bytes. Concurrent misses for the same
+    key in this worker wait on the first caller's fetch instead of issuing
+    their own upstream request. The fetch runs as its own task, so a caller
+    that is cancelled stops waiting without cancelling it for the others.
+
+    With `stale_ttl`, every write also keeps a copy for that long so callers
+    can fall back to the last good payload while the upstream is failing.
+    Copies go to `stale_backend` when given, so they are evicted against
+    each other rather than against fresh entries.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        namespace: str,
+        ttl: float,
+        stale_ttl: float | None = None,
+        stale_backend: CacheBackend | None = None,
+    ):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stale_backend = stale_backend or backend
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.stale_served = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _stale_key(self, key: str) -> str:
+        return f"{self.namespace}:stale:{key}"
+
+    def get(self, key: str):
+        raw = self.backend.get(self._key(key))
+        return None if raw is None else decode(raw)
+
+    def get_encoded(self, key: str) -> bytes | None:
+        return self.backend.get(self._key(key))
+
+    def lookup(self, key: str):
+        """
+        Like get(), but counted as a hit when the entry is present.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value, ttl: float | None = None):
+        self.set_encoded(key, encode(value), ttl)
+
+    def set_encoded(self, key: str, raw: bytes, ttl: float | None = None):
+        self.backend.set(self._key(key), raw, self.ttl if ttl is None else ttl)
+        if self.stale_ttl:
+            self.stale_backend.set(self._stale_key(key), raw, self.stale_ttl)
+
+    def get_stale_encoded(self, key: str) -> bytes | None:
+        """
+        Last good payload for `key`, even if its fresh entry has expired.
+        """
+        if not self.stale_ttl:
+            return None
+        raw = self.stale_backend.get(self._stale_key(key))
+        if raw is not None:
+            self.stale_served += 1
+        return raw
+
+    def ttl_remaining(self, key: str) -> float | None:
+        return self.backend.ttl_remaining(self._key(key))
+
+    async def get_or_fetch_encoded(self, key: str, fetch) -> bytes:
+        """
+        Return the cached bytes for `key`, or await `fetch()` once for all
+        concurrent callers, encode and cache its result. Failures are not
+        cached.
+        """
+        raw = self.get_encoded(key)
+        if raw is not None:
+            self.hits += 1
+            return raw
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        return await asyncio.shield(self._load(key, fetch))
+
+    async def refresh_encoded(self, key: str, fetch) -> bytes:
+        """
+        Re-fetch `key` regardless of what is cached, e.g. ahead of expiry.
+        Joins a load that is already in flight instead of starting another.
+        """
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        self.refreshes += 1
+        return await asyncio.shield(self._load(key, fetch))
+
+    def _load(self, key: str, fetch) -> asyncio.Task:
+        task = asyncio.ensure_future(self._fetch(key, fetch))
+        self._inflight[key] = task
+        # Retrieve the outcome so a failure nobody waits for any more
+        # doesn't log "exception was never retrieved"
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return task
+
+    async def _fetch(self, key: str, fetch) -> bytes:
+        try:
+            raw = encode(await fetch())
+            self.set_encoded(key, raw)
+            return raw
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get_or_fetch(self, key: str, fetch):
+        """
+        Decoded variant of get_or_fetch_encoded.
+        """
+        return decode(await self.get_or_fetch_encoded(key, fetch))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "stale_served": self.stale_served,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4)
+            if lookups
+            else 0.0,
+        }
+
+
+cache_backend = create_cache_backend()
+stale_backend = create_cache_backend(maxsize=CACHE_STALE_MAX_ENTRIES, table="cache_stale")
+weather_cache = TTLCache(
+    cache_backend,
+    "weather",
+    ttl=WEATHER_CACHE_TTL,
+    stale_ttl=STALE_CACHE_TTL,
+    stale_backend=stale_backend,
+)
+forecast_cache = TTLCache(
+    cache_backend,
+    "forecast",
+    ttl=FORECAST_CACHE_TTL,
+    stale_ttl=STALE_CACHE_TTL,
+    stale_backend=stale_backend,
+)
+
+
+def _cache_lookups():
+    return {
+        (cache.namespace, result): getattr(cache, attr)
+        for cache in (weather_cache, forecast_cache)
+        for result, attr in (
+            ("hit", "hits"),
+            ("miss", "misses"),
+            ("coalesced", "coalesced"),
+            ("refresh", "refreshes"),
+            ("stale", "stale_served"),
+        )
+    }
+
+
+Counter(
+    "cache_lookups_total",
+    "Cache lookups by outcome.",
+    ("cache", "result"),
+    _cache_lookups,
+)
+Gauge(
+    "cache_hit_ratio",
+    "Share of lookups answered without an upstream call.",
+    ("cache",),
+    lambda: {(c.namespace,): c.stats()["hit_ratio"] for c in (weather_cache, forecast_cache)},
+)
+Gauge(
+    "cache_entries",
+    "Live entries in the cache backend.",
+    ("backend",),
+    lambda: {(cache_backend.name,): cache_backend.size()},
+)
+Gauge(
+    "cache_stale_entries",
+    "Live stale copies kept for upstream outages.",
+    ("backend",),
+    lambda: {(stale_backend.name,): stale_backend.size()},
+)
@@ -0,0 +1,206 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import sqlite3
+import threading
+import time
+
+
+class CacheBackend(ABC):
+    """
+    Storage interface used by the weather/forecast caches.
+
+    Values are opaque bytes (the encoded response payload), so any backend
+    can be shared between worker processes without pickling.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def ttl_remaining(self, key: str) -> float | None:
+        """
+        Seconds until `key` expires, or None if it is not cached.
+        """
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def size(self) -> int:
+        ...
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "size": self.size()}
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Per-process LRU store with per-entry expiry.
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize: int, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key, value, ttl):
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def ttl_remaining(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        remaining = entry[0] - self.clock()
+        return remaining if remaining > 0 else None
+
+    def clear(self):
+        self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {**super().stats(), "maxsize": self.maxsize, "evictions": self.evictions}
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Local-disk store shared by every uvicorn worker on the host.
+
+    Uses WAL so readers never block the writer; expired and overflow rows
+    are pruned every `prune_every` writes, oldest expiry first. Backends
+    with different `table`s share the file but not their `maxsize`.
+
+    Calls are made from the event loop, so a write lock held by another
+    worker is waited on for at most `busy_timeout` seconds. After that a
+    read is a miss and a write is skipped (counted in `busy`) instead of
+    stalling every request on the worker.
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        maxsize: int,
+        prune_every: int = 256,
+        busy_timeout: float = 0.05,
+        table: str = "cache",
+    ):
+        self.path = path
+        self.maxsize = maxsize
+        self.table = table
+        self.prune_every = prune_every
+        self.busy = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_expires_at ON {table} (expires_at)"
+        )
+
+    def _execute(self, sql: str, params=()) -> tuple | None:
+        """
+        Run one statement and return its first row; None as well when the
+        database stayed locked past the busy timeout.
+        """
+        with self._lock:
+            try:
+                return self._conn.execute(sql, params).fetchone()
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                self.busy += 1
+                return None
+
+    def get(self, key):
+        row = self._execute(
+            f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        )
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        self._execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl),
+        )
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self._prune()
+
+    def _prune(self):
+        self._execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        self._execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+
+    def delete(self, key):
+        self._execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def ttl_remaining(self, key):
+        row = self._execute(f"SELECT expires_at FROM {self.table} WHERE key = ?", (key,))
+        if not row:
+            return None
+        remaining = row[0] - time.time()
+        return remaining if remaining > 0 else None
+
+    def clear(self):
+        self._execute(f"DELETE FROM {self.table}")
+
+    def size(self):
+        row = self._execute(
+            f"SELECT COUNT(*) FROM {self.table} WHERE expires_at > ?", (time.time(),)
+        )
+        return row[0] if row else 0
+
+    def stats(self):
+        return {
+            **super().stats(),
+            "maxsize": self.maxsize,
+            "path": self.path,
+            "table": self.table,
+            "busy": self.busy,
+        }
@@ -0,0 +1,250 @@
+from typing import AsyncIterator, Callable, Iterable, Iterator
+from sqlalchemy.orm import Session
+import csv
+import io
+import json
+import zlib
+
+EXPORT_BATCH_SIZE = 2000
+# Columnar formats write one record batch / row group per DB batch
+COLUMNAR_BATCH_SIZE = 50000
+TIMESTAMP_FIELDS = ("observed_at", "saved_on")
+
+CSV_HEADER = [
+    "ID",
+    "Location",
+    "Country",
+    "Main",
+    "Description",
+    "Temp (°C)",
+    "Humidity",
+    "Pressure",
+    "Wind",
+    "Saved On",
+]
+# Record field behind each CSV_HEADER column, so exports can be uploaded again
+CSV_FIELDS = (
+    "id",
+    "location",
+    "country",
+    "main",
+    "description",
+    "temp",
+    "humidity",
+    "pressure",
+    "wind",
+    "saved_on",
+)
+
+
+def iter_record_batches(db: Session, stmt, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Yield lists of rows straight off the DB cursor, `batch_size` at a time.
+    Uses a server-side cursor where the driver supports one (PostgreSQL).
+    """
+    result = db.execute(
+        stmt.execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for partition in result.partitions():
+        yield partition
+
+
+async def aiter_record_batches(db, stmt, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Async counterpart of iter_record_batches for an AsyncSession.
+    """
+    result = await db.stream(stmt.execution_options(yield_per=batch_size))
+    async for partition in result.partitions():
+        yield partition
+
+
+async def aiter_encoded(
+    encode: Callable[[Iterable], Iterator[bytes]], batches: AsyncIterator
+) -> AsyncIterator[bytes]:
+    """
+    Run a sync chunk encoder over an async batch source. Each encoder step
+    runs in a SQLAlchemy greenlet, so when it pulls the next batch it can
+    wait on the async cursor without blocking the event loop.
+    """
+    from sqlalchemy.util import await_only, greenlet_spawn
+
+    async def next_batch():
+        return await anext(batches, None)
+
+    chunks = encode(iter(lambda: await_only(next_batch()), None))
+    while (chunk := await greenlet_spawn(next, chunks, None)) is not None:
+        yield chunk
+
+
+def csv_chunks(batches: Iterable) -> Iterator[bytes]:
+    """
+    Encode record batches as CSV, one chunk per batch.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    yield buffer.getvalue().encode()
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (
+                row.id,
+                row.location,
+                row.country,
+                row.main,
+                row.description,
+                row.temp,
+                row.humidity,
+                row.pressure,
+                row.wind,
+                row.saved_on.strftime("%Y-%m-%d %H:%M:%S") if row.saved_on else "",
+            )
+            for row in batch
+        )
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Compress a byte stream on the fly into a single gzip member.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def ndjson_chunks(batches: Iterable) -> Iterator[bytes]:
+    """
+    One JSON object per line, with numeric measurements and ISO timestamps.
+    """
+    for batch in batches:
+        lines = []
+        for row in batch:
+            record = dict(row._mapping)
+            for field in TIMESTAMP_FIELDS:
+                if record.get(field) is not None:
+                    record[field] = record[field].isoformat()
+            lines.append(json.dumps(record, ensure_ascii=False))
+        lines.append("")
+        yield "\n".join(lines).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file that hands back whatever was written since the last drain.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("location", pa.string()),
+            ("country", pa.string()),
+            ("main", pa.string()),
+            ("description", pa.string()),
+            ("temp", pa.float64()),
+            ("humidity", pa.float64()),
+            ("pressure", pa.float64()),
+            ("wind", pa.float64()),
+            ("icon", pa.string()),
+            ("visibility", pa.float64()),
+            ("lat", pa.float64()),
+            ("lon", pa.float64()),
+            ("observed_at", pa.timestamp("us")),
+            ("saved_on", pa.timestamp("us")),
+        ]
+    )
+
+
+def _record_batch(schema, batch):
+    import pyarrow as pa
+
+    columns = {name: [] for name in schema.names}
+    for row in batch:
+        for name, value in row._mapping.items():
+            if name in columns:
+                columns[name].append(value)
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def arrow_chunks(batches: Iterable) -> Iterator[bytes]:
+    """
+    Arrow IPC stream: the schema message, then one record batch per DB batch.
+    """
+    import pyarrow as pa
+
+    schema = arrow_schema()
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield sink.drain()
+        for batch in batches:
+            writer.write_batch(_record_batch(schema, batch))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def parquet_chunks(batches: Iterable) -> Iterator[bytes]:
+    """
+    Parquet file written one row group per DB batch; the footer comes last.
+    """
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema()
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in batches:
+            writer.write_batch(_record_batch(schema, batch))
+            yield sink.drain()
+    yield sink.drain()
+
+
+# format -> (encoder, media type, file extension, DB batch size, needs pyarrow)
+EXPORT_FORMATS = {
+    "csv": (csv_chunks, "text/csv", "csv", EXPORT_BATCH_SIZE, False),
+    "ndjson": (ndjson_chunks, "application/x-ndjson", "ndjson", EXPORT_BATCH_SIZE, False),
+    "arrow": (
+        arrow_chunks,
+        "application/vnd.apache.arrow.stream",
+        "arrows",
+        COLUMNAR_BATCH_SIZE,
+        True,
+    ),
+    "parquet": (
+        parquet_chunks,
+        "application/vnd.apache.parquet",
+        "parquet",
+        COLUMNAR_BATCH_SIZE,
+        True,
+    ),
+}
+
+
+def pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
@@ -1,5 +1,11 @@
 from schemas.weather_schema import WeatherResponse
-from datetime import datetime
+from utils.metrics import timed
+from array import array
+from datetime import date, datetime, timedelta
+import math
+import re
+
+_NUMBER = re.compile(r"[-+]?\d+(?:\.\d+)?")
 
 
 def to_time(ts):
@@ -13,6 +19,42 @@ def mps_to_kmh(ms):
     return round(ms * 3.6, 1)
 
 
+def parse_measurement(value) -> float | None:
+    """
+    Pull the number out of a stored measurement such as "25.6 °C" or "81 %".
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    match = _NUMBER.search(str(value))
+    return float(match.group()) if match else None
+
+
+def _format_number(value) -> str:
+    return f"{value:g}"
+
+
+# field -> display formatter applied to stored floats at response time
+RECORD_DISPLAY_FORMATS = {
+    "temp": lambda v: f"{round(v, 1)} °C",
+    "humidity": _format_number,
+    "pressure": _format_number,
+    "wind": _format_number,
+    "visibility": _format_number,
+}
+
+
+def format_record(record: dict) -> dict:
+    """
+    Render a stored weather record for display, e.g. temp 25.6 -> "25.6 °C".
+    """
+    formatted = dict(record)
+    for field, render in RECORD_DISPLAY_FORMATS.items():
+        if formatted.get(field) is not None:
+            formatted[field] = render(formatted[field])
+    return formatted
+
+
+@timed("format_weather_data")
 def format_weather_data(data) -> WeatherResponse:
     formatted = {
         "location": data.get("name"),
@@ -38,61 +80,88 @@ def format_weather_data(data) -> WeatherResponse:
     return formatted
 
 
-from datetime import datetime, timedelta
-from collections import defaultdict
+SECONDS_PER_DAY = 86400
+_EPOCH = date(1970, 1, 1)
+_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
 
-from datetime import datetime, timedelta
-from collections import defaultdict
+
+def _day_label(day: int) -> tuple[str, str]:
+    """
+    ISO date and weekday abbreviation for a day index since the epoch.
+    """
+    dt_obj = _EPOCH + timedelta(days=day)
+    return dt_obj.isoformat(), _WEEKDAYS[dt_obj.weekday()]
 
 
+@timed("format_forecast_data")
 def format_forecast_data(data: dict) -> dict:
     """
     Format OpenWeather 5-day/3-hour forecast into 7 daily summaries
     with weekday abbreviations (MON, TUE, etc.), main, and description fields.
-    """
-    grouped = defaultdict(
-        lambda: {"temps": [], "mains": [], "descriptions": [], "icons": []}
-    )
 
-    for entry in data["list"]:
-        date = datetime.utcfromtimestamp(entry["dt"]).strftime("%Y-%m-%d")
-        grouped[date]["temps"].append(entry["main"]["temp"])
-        grouped[date]["mains"].append(entry["weather"][0]["main"])
-        grouped[date]["descriptions"].append(entry["weather"][0]["description"])
-        grouped[date]["icons"].append(entry["weather"][0]["icon"])
+    3-hour slots are grouped by integer day index in the city's local time
+    (`city.timezone` offset) and reduced in a single pass: per-day min/max
+    live in flat arrays and each modal field keeps a running count.
+    """
+    entries = data["list"]
+    offset = data["city"].get("timezone") or 0
+    days = array("q", [(entry["dt"] + offset) // SECONDS_PER_DAY for entry in entries])
+    first_day = min(days)
+    span = max(days) - first_day + 1
+
+    temp_min = array("d", [math.inf]) * span
+    temp_max = array("d", [-math.inf]) * span
+    # per day: [counts, best value, best count] for main, description, icon
+    modes = [None] * span
+
+    for entry, day in zip(entries, days):
+        slot = day - first_day
+        temp = entry["main"]["temp"]
+        if temp < temp_min[slot]:
+            temp_min[slot] = temp
+        if temp > temp_max[slot]:
+            temp_max[slot] = temp
+
+        weather = entry["weather"][0]
+        day_modes = modes[slot]
+        if day_modes is None:
+            day_modes = modes[slot] = [[{}, None, 0] for _ in range(3)]
+        for mode, value in zip(
+            day_modes, (weather["main"], weather["description"], weather["icon"])
+        ):
+            count = mode[0].get(value, 0) + 1
+            mode[0][value] = count
+            if count > mode[2]:
+                mode[1] = value
+                mode[2] = count
 
     forecast = []
-    sorted_dates = sorted(grouped.keys())
-
-    for date in sorted_dates:
-        dt_obj = datetime.strptime(date, "%Y-%m-%d")
-        weekday_abbr = dt_obj.strftime("%a")[:3]
-        values = grouped[date]
-
+    for slot in range(span):
+        if modes[slot] is None:
+            continue
+        date_str, weekday_abbr = _day_label(first_day + slot)
+        main, description, icon = (mode[1] for mode in modes[slot])
         forecast.append(
             {
-                "date": date,
+                "date": date_str,
                 "day": weekday_abbr,
-                "main": max(set(values["mains"]), key=values["mains"].count),
-                "description": max(
-                    set(values["descriptions"]), key=values["descriptions"].count
-                ).title(),
-                "icon": max(set(values["icons"]), key=values["icons"].count),
-                "temp_min": round(min(values["temps"]), 1),
-                "temp_max": round(max(values["temps"]), 1),
+                "main": main,
+                "description": description.title(),
+                "icon": icon,
+                "temp_min": round(temp_min[slot], 1),
+                "temp_max": round(temp_max[slot], 1),
             }
         )
 
     # Extend to 7 days if necessary
     if len(forecast) < 7:
-        last_date = datetime.strptime(forecast[-1]["date"], "%Y-%m-%d")
+        last_day = first_day + span - 1
         for i in range(7 - len(forecast)):
-            next_date = last_date + timedelta(days=i + 1)
-            next_day = next_date.strftime("%a").upper()[:3]
+            date_str, weekday_abbr = _day_label(last_day + i + 1)
             forecast.append(
                 {
-                    "date": next_date.strftime("%Y-%m-%d"),
-                    "day": next_day,
+                    "date": date_str,
+                    "day": weekday_abbr.upper(),
                     "main": forecast[-1]["main"],
                     "description": forecast[-1]["description"],
                     "icon": forecast[-1]["icon"],
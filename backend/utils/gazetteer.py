@@ -0,0 +1,276 @@
+from array import array
+from bisect import bisect_left
+from config.settings import env, env_bool, env_int
+from typing import NamedTuple
+import argparse
+import gzip
+import heapq
+import os
+import re
+import threading
+import unicodedata
+
+GAZETTEER_ENABLED = env_bool("GAZETTEER_ENABLED", True)
+GAZETTEER_PATH = env(
+    "GAZETTEER_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "gazetteer.tsv"),
+)
+# Reject names the gazetteer doesn't know instead of passing them upstream as q=
+GAZETTEER_STRICT = env_bool("GAZETTEER_STRICT", False)
+MAX_SUGGESTIONS = env_int("GAZETTEER_MAX_SUGGESTIONS", 20)
+
+COLUMNS = ("id", "name", "ascii_name", "alternate_names", "country", "admin1", "lat", "lon", "population")
+# Prefix ranges larger than this are ranked once and memoized
+_SCAN_LIMIT = 512
+_MAX_MEMOIZED = 4096
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_place_name(name: str) -> str:
+    """
+    Lookup form of a place name: accents stripped, case-folded, whitespace
+    collapsed, so "Zürich", "zurich" and " ZURICH " share one key.
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _WHITESPACE.sub(" ", stripped).strip().casefold()
+
+
+class Place(NamedTuple):
+    id: int
+    name: str
+    country: str
+    admin1: str
+    lat: float
+    lon: float
+    population: int
+
+
+class Gazetteer:
+    """
+    In-memory location index loaded from a GeoNames-style TSV.
+
+    Places live in parallel arrays; every name, ASCII name and alternate
+    name is a key in one sorted list pointing back at its place. That sorted
+    list acts as a flattened prefix trie: bisect finds the exact-match or
+    prefix range in O(log n), and within an equal key places are ordered by
+    population so the most populous match comes first.
+
+    The file is read on first use.
+    """
+
+    def __init__(self, path: str | None = GAZETTEER_PATH, enabled: bool = GAZETTEER_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._reset()
+        self.lookups = 0
+        self.resolved = 0
+
+    def _reset(self):
+        self._ids = array("q")
+        self._lat = array("d")
+        self._lon = array("d")
+        self._population = array("q")
+        self._names: list[str] = []
+        self._countries: list[str] = []
+        self._admin1: list[str] = []
+        self._keys: list[str] = []
+        self._places = array("I")
+        self._country_codes: set[str] = set()
+        self._top: dict[tuple[str, str | None], list[int]] = {}
+
+    def _read_rows(self):
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "rt", encoding="utf-8") as f:
+            header = None
+            for line in f:
+                if line.startswith("#") or not line.strip():
+                    continue
+                fields = line.rstrip("\n").split("\t")
+                if header is None:
+                    header = fields
+                    continue
+                yield dict(zip(header, fields))
+
+    def load_rows(self, rows):
+        """
+        Build the index from dicts with COLUMNS keys (replacing any current data).
+        """
+        self._reset()
+        entries = []
+        for row in rows:
+            index = len(self._names)
+            population = int(row.get("population") or 0)
+            self._ids.append(int(row["id"]))
+            self._lat.append(float(row["lat"]))
+            self._lon.append(float(row["lon"]))
+            self._population.append(population)
+            self._names.append(row["name"])
+            self._countries.append(row["country"].upper())
+            self._admin1.append(row.get("admin1") or "")
+            self._country_codes.add(row["country"].upper())
+            aliases = [row["name"], row.get("ascii_name") or ""]
+            aliases += (row.get("alternate_names") or "").split(",")
+            for key in {normalize_place_name(alias) for alias in aliases if alias}:
+                if key:
+                    entries.append((key, -population, index))
+        entries.sort()
+        self._keys = [key for key, _, _ in entries]
+        self._places = array("I", [index for _, _, index in entries])
+        self._loaded = True
+
+    def load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            if self.enabled and self.path and os.path.exists(self.path):
+                self.load_rows(self._read_rows())
+            else:
+                self._loaded = True
+
+    def __len__(self) -> int:
+        self.load()
+        return len(self._names)
+
+    def place(self, index: int) -> Place:
+        return Place(
+            self._ids[index],
+            self._names[index],
+            self._countries[index],
+            self._admin1[index],
+            self._lat[index],
+            self._lon[index],
+            self._population[index],
+        )
+
+    def _parse(self, location: str) -> list[tuple[str, str | None, str | None]]:
+        """
+        Readings of "name[, admin1][, CC]" as (normalized name, admin1,
+        country code). A trailing part that is a known country code is tried
+        as the country first and then as admin1, so "Springfield, MA" still
+        finds Massachusetts.
+        """
+        parts = [normalize_place_name(part) for part in location.split(",")]
+        parts = [part for part in parts if part]
+        if not parts:
+            return []
+        name, rest = parts[0], parts[1:]
+        readings = []
+        if rest and rest[-1].upper() in self._country_codes:
+            readings.append((name, rest[0] if len(rest) > 1 else None, rest[-1].upper()))
+        if len(rest) <= 1:
+            readings.append((name, rest[0] if rest else None, None))
+        return readings
+
+    def _matches(self, index: int, admin1: str | None, country: str | None) -> bool:
+        if country is not None and self._countries[index] != country:
+            return False
+        return admin1 is None or normalize_place_name(self._admin1[index]) == admin1
+
+    def resolve(self, location: str) -> Place | None:
+        """
+        The most populous place whose name or alias equals `location`
+        (optionally qualified as "name, admin1, CC"), or None.
+        """
+        self.load()
+        self.lookups += 1
+        for name, admin1, country in self._parse(location):
+            lo = bisect_left(self._keys, name)
+            for position in range(lo, len(self._keys)):
+                if self._keys[position] != name:
+                    break
+                index = self._places[position]
+                if self._matches(index, admin1, country):
+                    self.resolved += 1
+                    return self.place(index)
+        return None
+
+    def _ranked(self, lo: int, hi: int, admin1: str | None, country: str | None, limit: int) -> list[int]:
+        candidates = {
+            index for index in self._places[lo:hi] if self._matches(index, admin1, country)
+        }
+        return heapq.nlargest(limit, candidates, key=self._population.__getitem__)
+
+    def suggest(self, query: str, limit: int = 10) -> list[Place]:
+        """
+        Places whose name or alias starts with `query`, most populous first.
+        """
+        self.load()
+        limit = max(1, min(limit, MAX_SUGGESTIONS))
+        for prefix, admin1, country in self._parse(query):
+            lo = bisect_left(self._keys, prefix)
+            hi = bisect_left(self._keys, prefix + "\U0010ffff", lo)
+            if hi - lo <= _SCAN_LIMIT or admin1 is not None:
+                indexes = self._ranked(lo, hi, admin1, country, limit)
+            else:
+                # Short prefixes cover most of the index: rank them once
+                memo_key = (prefix, country)
+                indexes = self._top.get(memo_key)
+                if indexes is None:
+                    if len(self._top) >= _MAX_MEMOIZED:
+                        self._top.clear()
+                    indexes = self._ranked(lo, hi, None, country, MAX_SUGGESTIONS)
+                    self._top[memo_key] = indexes
+                indexes = indexes[:limit]
+            if indexes:
+                return [self.place(index) for index in indexes]
+        return []
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "loaded": self._loaded,
+            "places": len(self._names),
+            "keys": len(self._keys),
+            "lookups": self.lookups,
+            "resolved": self.resolved,
+        }
+
+
+gazetteer = Gazetteer()
+
+
+def _latin(name: str) -> bool:
+    return all(ord(ch) < 0x250 for ch in normalize_place_name(name))
+
+
+def build(source: str, target: str, min_population: int = 0, max_aliases: int = 8) -> int:
+    """
+    Convert a GeoNames dump (cities15000.txt and friends) into the TSV the
+    gazetteer loads, keeping Latin-script alternate names only.
+    """
+    count = 0
+    opener = gzip.open if target.endswith(".gz") else open
+    with open(source, encoding="utf-8") as src, opener(target, "wt", encoding="utf-8") as out:
+        out.write("# Built from GeoNames (geonames.org, CC BY 4.0)\n")
+        out.write("\t".join(COLUMNS) + "\n")
+        for line in src:
+            fields = line.rstrip("\n").split("\t")
+            population = int(fields[14] or 0)
+            if population < min_population:
+                continue
+            known = {normalize_place_name(fields[1]), normalize_place_name(fields[2])}
+            aliases = []
+            for alias in fields[3].split(","):
+                key = normalize_place_name(alias)
+                if len(key) >= 3 and key not in known and _latin(alias):
+                    known.add(key)
+                    aliases.append(alias.strip())
+                if len(aliases) == max_aliases:
+                    break
+            row = (fields[0], fields[1], fields[2], ",".join(aliases), fields[8], fields[10],
+                   fields[4], fields[5], str(population))
+            out.write("\t".join(row) + "\n")
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the gazetteer from a GeoNames dump")
+    parser.add_argument("source", help="GeoNames file, e.g. cities15000.txt")
+    parser.add_argument("--out", default=GAZETTEER_PATH)
+    parser.add_argument("--min-population", type=int, default=0)
+    args = parser.parse_args()
+    print(f"wrote {build(args.source, args.out, args.min_population)} places to {args.out}")
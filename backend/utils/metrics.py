@@ -0,0 +1,266 @@
+from bisect import bisect_left
+from config.settings import env_bool
+from sqlalchemy import event
+import functools
+import inspect
+import math
+import threading
+import time
+
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Registry:
+    """
+    Holds every metric and renders them in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=(), function=None, registry=REGISTRY):
+        """
+        `function`, when given, is called at scrape time and returns
+        {label values tuple: value}; the metric then holds no state itself.
+        """
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _items(self):
+        if self.function is not None:
+            return self.function().items()
+        with self._lock:
+            return list(self._values.items())
+
+    def _samples(self):
+        for labels, value in self._items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help, labelnames, registry=registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    def _samples(self):
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        names = self.labelnames + ("le",)
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = _format_labels(names, labels + (_format_value(bound),))
+                yield f"{self.name}_bucket{le} {cumulative}"
+            suffix = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{suffix} {_format_value(total)}"
+            yield f"{self.name}_count{suffix} {cumulative}"
+
+
+# Request and query counts are the histograms' _count series
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route and status.",
+    ("method", "route", "status"),
+)
+FUNCTION_SECONDS = Histogram(
+    "function_duration_seconds", "Latency of instrumented hot-path functions.", ("function",)
+)
+DB_QUERY_ERRORS = Counter("db_query_errors_total", "SQL statements that raised.", ("engine",))
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "SQL statement latency.", ("engine", "operation"), QUERY_BUCKETS
+)
+
+_engines = {}
+
+
+def _pool_stats():
+    values = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        for stat in ("size", "checkedout", "checkedin", "overflow"):
+            if hasattr(pool, stat):
+                # QueuePool reports unused overflow capacity as negative
+                values[(name, stat)] = max(0, getattr(pool, stat)())
+    return values
+
+
+DB_POOL = Gauge(
+    "db_pool_connections", "Connection pool usage by state.", ("engine", "state"), _pool_stats
+)
+
+
+def timed(function: str):
+    """
+    Record the wall time of a sync or async function in FUNCTION_SECONDS.
+    """
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    FUNCTION_SECONDS.observe(time.perf_counter() - start, function)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                FUNCTION_SECONDS.observe(time.perf_counter() - start, function)
+
+        return wrapper
+
+    return decorator if METRICS_ENABLED else (lambda fn: fn)
+
+
+_operations: dict[str, str] = {}
+
+
+def _operation(statement: str) -> str:
+    # Statements repeat (compiled cache), so remember their verb
+    operation = _operations.get(statement)
+    if operation is None:
+        head = statement.lstrip()[:10].split(None, 1)
+        operation = head[0].lower() if head else "other"
+        if len(_operations) < 4096:
+            _operations[statement] = operation
+    return operation
+
+
+def instrument_engine(engine, name: str = "primary"):
+    """
+    Count and time every statement run on `engine` and expose its pool
+    usage. The start time rides on the statement's execution context, so
+    concurrent sessions on other threads don't interfere.
+    """
+    if not METRICS_ENABLED:
+        return
+    _engines[name] = engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_start
+        DB_QUERY_SECONDS.observe(elapsed, name, _operation(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        DB_QUERY_ERRORS.inc(name)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts and latency per route
+    template (e.g. "/records/{record_id}"), so label cardinality stays
+    bounded by the number of routes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            HTTP_SECONDS.observe(time.perf_counter() - start, method, path, status)
@@ -0,0 +1,202 @@
+from collections import deque
+from config.settings import env_bool, env_float, env_int
+import asyncio
+import heapq
+import random
+import time
+
+PREWARM_ENABLED = env_bool("PREWARM_ENABLED", True)
+PREWARM_TOP_K = env_int("PREWARM_TOP_K", 20)
+PREWARM_LEAD_SECONDS = env_float("PREWARM_LEAD_SECONDS", 90)
+PREWARM_INTERVAL = env_float("PREWARM_INTERVAL", 30)
+PREWARM_RATE = env_float("PREWARM_RATE", 2)
+PREWARM_JITTER = env_float("PREWARM_JITTER", 0.25)
+PREWARM_QUOTA = env_int("PREWARM_QUOTA", 30)
+PREWARM_QUOTA_WINDOW = env_float("PREWARM_QUOTA_WINDOW", 60)
+PREWARM_HALF_LIFE = env_float("PREWARM_HALF_LIFE", 3600)
+PREWARM_MAX_TRACKED = env_int("PREWARM_MAX_TRACKED", 10000)
+
+# Decayed counts below this are forgotten
+_MIN_SCORE = 0.05
+
+
+class Prewarmer:
+    """
+    Keeps the most requested locations warm.
+
+    Controllers call record() on every successful lookup; counts decay with
+    a half-life so popularity follows recent traffic. Every `interval` seconds (plus
+    jitter) the top-K keys whose cache entry is missing or expires within
+    `lead` seconds are refreshed through their registered refresh function,
+    at most `rate` calls per second and `quota` calls per `quota_window`.
+    A key whose refresh is rejected (a 4xx `status_code`, e.g. an unknown
+    city) is forgotten so it does not spend the quota again every pass.
+
+    `clock`, `sleep` and `rng` are injectable so the scheduler can be driven
+    with a fake clock.
+    """
+
+    def __init__(
+        self,
+        top_k: int = PREWARM_TOP_K,
+        lead: float = PREWARM_LEAD_SECONDS,
+        interval: float = PREWARM_INTERVAL,
+        rate: float = PREWARM_RATE,
+        jitter: float = PREWARM_JITTER,
+        quota: int = PREWARM_QUOTA,
+        quota_window: float = PREWARM_QUOTA_WINDOW,
+        half_life: float = PREWARM_HALF_LIFE,
+        max_tracked: int = PREWARM_MAX_TRACKED,
+        enabled: bool = PREWARM_ENABLED,
+        clock=time.monotonic,
+        sleep=asyncio.sleep,
+        rng: random.Random | None = None,
+    ):
+        self.top_k = top_k
+        self.lead = lead
+        self.interval = interval
+        self.rate = rate
+        self.jitter = jitter
+        self.quota = quota
+        self.quota_window = quota_window
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self.enabled = enabled
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self._targets: dict[str, tuple] = {}
+        self._scores: dict[tuple[str, str], float] = {}
+        self._locations: dict[tuple[str, str], str] = {}
+        self._calls: deque[float] = deque()
+        self._next_call_at = 0.0
+        self._decayed_at = clock()
+        self._task: asyncio.Task | None = None
+        self.passes = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.quota_exhausted = 0
+
+    def register(self, kind: str, cache, refresh):
+        """
+        Prewarm `kind` entries of `cache` with `await refresh(location)`.
+        """
+        self._targets[kind] = (cache, refresh)
+
+    def record(self, kind: str, key: str, location: str):
+        """
+        Count one request for the normalized cache `key`.
+        """
+        entry = (kind, key)
+        self._scores[entry] = self._scores.get(entry, 0.0) + 1.0
+        self._locations.setdefault(entry, location)
+
+    def forget(self, kind: str, key: str):
+        self._scores.pop((kind, key), None)
+        self._locations.pop((kind, key), None)
+
+    def _decay(self):
+        now = self.clock()
+        factor = 0.5 ** ((now - self._decayed_at) / self.half_life)
+        self._decayed_at = now
+        scores = {k: s * factor for k, s in self._scores.items() if s * factor >= _MIN_SCORE}
+        if len(scores) > self.max_tracked:
+            scores = dict(heapq.nlargest(self.max_tracked, scores.items(), key=lambda kv: kv[1]))
+        self._scores = scores
+        self._locations = {k: self._locations[k] for k in scores}
+
+    def popular(self) -> list[tuple[str, str]]:
+        return heapq.nlargest(self.top_k, self._scores, key=self._scores.get)
+
+    def due(self) -> list[tuple[str, str]]:
+        """
+        Popular keys that are not cached or expire within `lead` seconds,
+        most popular first.
+        """
+        due = []
+        for kind, key in self.popular():
+            target = self._targets.get(kind)
+            if target is None:
+                continue
+            remaining = target[0].ttl_remaining(key)
+            if remaining is None or remaining <= self.lead:
+                due.append((kind, key))
+        return due
+
+    def _quota_available(self) -> bool:
+        cutoff = self.clock() - self.quota_window
+        while self._calls and self._calls[0] <= cutoff:
+            self._calls.popleft()
+        return len(self._calls) < self.quota
+
+    async def _throttle(self):
+        wait = self._next_call_at - self.clock()
+        if wait > 0:
+            await self.sleep(wait)
+        now = self.clock()
+        self._calls.append(now)
+        self._next_call_at = now + (1 + self.rng.uniform(0, self.jitter)) / self.rate
+
+    async def run_once(self) -> int:
+        """
+        One scheduling pass. Returns the number of entries refreshed.
+        """
+        self.passes += 1
+        self._decay()
+        refreshed = 0
+        for kind, key in self.due():
+            if not self._quota_available():
+                self.quota_exhausted += 1
+                break
+            await self._throttle()
+            try:
+                await self._targets[kind][1](self._locations[(kind, key)])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                if 400 <= getattr(e, "status_code", 500) < 500:
+                    # Retrying will not change the answer
+                    self.forget(kind, key)
+                    self.dropped += 1
+            else:
+                refreshed += 1
+        self.refreshed += refreshed
+        return refreshed
+
+    async def run(self):
+        while True:
+            await self.run_once()
+            await self.sleep(self.interval * (1 + self.rng.uniform(0, self.jitter)))
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None,
+            "tracked": len(self._scores),
+            "passes": self.passes,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "quota_exhausted": self.quota_exhausted,
+            "quota_used": len(self._calls),
+            "quota": self.quota,
+        }
+
+
+prewarmer = Prewarmer()
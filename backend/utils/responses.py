@@ -0,0 +1,34 @@
+from fastapi import Request, Response
+import hashlib
+
+
+def strong_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def json_bytes_response(
+    body: bytes, request: Request | None = None, conditional: bool = True
+) -> Response:
+    """
+    Send already-encoded JSON as-is with a strong ETag, answering a
+    matching If-None-Match with 304 when `conditional` (GET/HEAD only).
+    """
+    etag = strong_etag(body)
+    headers = {"ETag": etag}
+    if (
+        conditional
+        and request is not None
+        and _etag_matches(request.headers.get("if-none-match"), etag)
+    ):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,464 @@
+from datetime import date, datetime, timedelta
+from config.settings import env_bool, env_float, env_int
+from sqlalchemy import case, column, delete, func, select, table, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+from config.database import engine as default_engine
+from models.weather_record import WeatherRecord, WeatherRollupDaily, WeatherRollupHourly
+import asyncio
+import re
+
+RETENTION_ENABLED = env_bool("RETENTION_ENABLED", False)
+# Age after which each tier is compacted into the next one; 0 keeps it forever
+RETENTION_RAW_DAYS = env_int("RETENTION_RAW_DAYS", 30)
+RETENTION_HOURLY_DAYS = env_int("RETENTION_HOURLY_DAYS", 365)
+RETENTION_DAILY_DAYS = env_int("RETENTION_DAILY_DAYS", 0)
+RETENTION_BATCH_SIZE = env_int("RETENTION_BATCH_SIZE", 5000)
+RETENTION_INTERVAL = env_float("RETENTION_INTERVAL", 3600)
+# PostgreSQL: daily partitions created this many days ahead
+RETENTION_PARTITION_DAYS_AHEAD = env_int("RETENTION_PARTITION_DAYS_AHEAD", 7)
+
+METRICS = ("temp", "humidity", "pressure", "wind")
+ROLLUP_COLUMNS = ["location_normalized", "location", "bucket", "main", "count"] + [
+    f"{metric}_{part}" for metric in METRICS for part in ("min", "max", "sum", "count")
+]
+GROUP_COLUMNS = ["location_normalized", "bucket", "main"]
+PARTITION_NAME = re.compile(r"^weather_records_p(\d{8})$")
+# pg_try_advisory_lock key, so only one worker runs retention at a time
+ADVISORY_LOCK_KEY = 0x77657468
+
+
+class ConcurrentRun(Exception):
+    """
+    Another worker compacted the same rows first; this batch was rolled back.
+    """
+
+
+def _truncate(value, unit: str, dialect: str):
+    """
+    `value` truncated to the start of its hour or day, in the same format
+    SQLAlchemy stores DateTime values in.
+    """
+    if dialect == "postgresql":
+        return func.date_trunc(unit, value)
+    fmt = "%Y-%m-%d %H:00:00.000000" if unit == "hour" else "%Y-%m-%d 00:00:00.000000"
+    return func.strftime(fmt, value)
+
+
+def _rollup_select(source, raw: bool, unit: str, dialect: str):
+    """
+    SELECT of ROLLUP_COLUMNS grouping `source` (raw records or a rollup
+    table) per location, `unit` bucket and main condition.
+    """
+    c = source.c
+    bucket = _truncate(c.saved_on if raw else c.bucket, unit, dialect)
+    location_key = func.coalesce(c.location_normalized, "")
+    main = func.coalesce(c.main, "")
+    columns = [location_key, func.min(c.location), bucket, main]
+    columns.append(func.count() if raw else func.sum(c.count))
+    for metric in METRICS:
+        if raw:
+            value = c[metric]
+            columns += [func.min(value), func.max(value), func.sum(value), func.count(value)]
+        else:
+            columns += [
+                func.min(c[f"{metric}_min"]),
+                func.max(c[f"{metric}_max"]),
+                func.sum(c[f"{metric}_sum"]),
+                func.sum(c[f"{metric}_count"]),
+            ]
+    return select(*columns).group_by(location_key, bucket, main)
+
+
+def _least(a, b):
+    # NULL-ignoring min/max: SQLite's two-argument min() returns NULL
+    return case((a.is_(None), b), (b.is_(None), a), (b < a, b), else_=a)
+
+
+def _greatest(a, b):
+    return case((a.is_(None), b), (b.is_(None), a), (b > a, b), else_=a)
+
+
+def _upsert(target, rows, dialect: str):
+    """
+    INSERT the grouped `rows` into a rollup table, merging into existing
+    groups: counts and sums add up, minimums and maximums combine.
+    """
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(target).from_select(ROLLUP_COLUMNS, rows)
+    current, new = target.c, stmt.excluded
+    merged = {"count": current.count + new.count}
+    for metric in METRICS:
+        merged[f"{metric}_min"] = _least(current[f"{metric}_min"], new[f"{metric}_min"])
+        merged[f"{metric}_max"] = _greatest(current[f"{metric}_max"], new[f"{metric}_max"])
+        for part in ("sum", "count"):
+            name = f"{metric}_{part}"
+            merged[name] = func.coalesce(current[name], 0) + func.coalesce(new[name], 0)
+    return stmt.on_conflict_do_update(index_elements=GROUP_COLUMNS, set_=merged)
+
+
+def compact_batch(
+    conn: Connection, source, target, raw: bool, unit: str, cutoff: datetime, batch_size: int
+) -> int:
+    """
+    Move up to `batch_size` rows older than `cutoff` from `source` into the
+    `unit` rollup `target`. Returns the number of rows moved.
+    """
+    dialect = conn.dialect.name
+    time_column = source.c.saved_on if raw else source.c.bucket
+    ids = conn.execute(
+        select(source.c.id).where(time_column < cutoff).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+    rows = _rollup_select(source, raw, unit, dialect).where(source.c.id.in_(ids))
+    conn.execute(_upsert(target, rows, dialect))
+    deleted = conn.execute(
+        delete(source).where(source.c.id.in_(ids)).returning(source.c.id)
+    ).all()
+    if len(deleted) != len(ids):
+        # Rows vanished under us: merging them again would double count
+        raise ConcurrentRun()
+    return len(ids)
+
+
+def expire_batch(conn: Connection, source, cutoff: datetime, batch_size: int) -> int:
+    """
+    Delete up to `batch_size` rollup rows whose bucket is before `cutoff`.
+    """
+    ids = select(source.c.id).where(source.c.bucket < cutoff).limit(batch_size)
+    return conn.execute(delete(source).where(source.c.id.in_(ids.scalar_subquery()))).rowcount
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return (
+        conn.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = 'weather_records'"
+            )
+        ).first()
+        is not None
+    )
+
+
+def daily_partitions(conn: Connection) -> list[tuple[str, date]]:
+    """
+    (name, day) of every weather_records_pYYYYMMDD partition, oldest first.
+    """
+    names = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'weather_records'"
+        )
+    ).scalars()
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, datetime.strptime(match.group(1), "%Y%m%d").date()))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def _in_default_partition(conn: Connection, day: date) -> bool:
+    """
+    Whether the default partition holds rows saved on `day`; PostgreSQL
+    refuses to create a partition those rows would belong to.
+    """
+    return (
+        conn.execute(
+            text(
+                "SELECT 1 FROM weather_records_default "
+                "WHERE saved_on >= :start AND saved_on < :end LIMIT 1"
+            ),
+            {"start": day, "end": day + timedelta(days=1)},
+        ).first()
+        is not None
+    )
+
+
+def ensure_partitions(conn: Connection, first: date, last: date) -> int:
+    """
+    Create the daily partitions for first..last that don't exist yet.
+    A day whose rows already sit in the default partition is skipped;
+    any other failure is raised, after rolling back only that day.
+    """
+    created = 0
+    existing = {day for _, day in daily_partitions(conn)}
+    has_default = (
+        conn.execute(text("SELECT to_regclass('weather_records_default')")).scalar() is not None
+    )
+    day = first
+    while day <= last:
+        if day not in existing and not (has_default and _in_default_partition(conn, day)):
+            with conn.begin_nested():
+                conn.execute(
+                    text(
+                        f"CREATE TABLE weather_records_p{day:%Y%m%d} "
+                        "PARTITION OF weather_records "
+                        f"FOR VALUES FROM ('{day}') TO ('{day + timedelta(days=1)}')"
+                    )
+                )
+            created += 1
+        day += timedelta(days=1)
+    return created
+
+
+def _partition_table(name: str):
+    return table(name, *[column(c.name) for c in WeatherRecord.__table__.columns])
+
+
+def partition_weather_records(engine: Engine, raw_days: int = RETENTION_RAW_DAYS) -> bool:
+    """
+    One-off PostgreSQL migration: rebuild weather_records as a table range
+    partitioned by day on saved_on, so retention can compact and DROP whole
+    days instead of deleting rows. Days older than the raw retention window
+    land in the default partition and are compacted in batches. Returns
+    False when the table is already partitioned.
+    """
+    from config.migrations import create_missing_indexes, create_search_indexes
+
+    if engine.dialect.name != "postgresql":
+        raise ValueError("Partitioning is only supported on PostgreSQL")
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            return False
+        sequence = conn.execute(
+            text("SELECT pg_get_serial_sequence('weather_records', 'id')")
+        ).scalar()
+        conn.execute(text("UPDATE weather_records SET saved_on = now() WHERE saved_on IS NULL"))
+        oldest = conn.execute(text("SELECT min(saved_on) FROM weather_records")).scalar()
+        conn.execute(text("ALTER TABLE weather_records RENAME TO weather_records_unpartitioned"))
+        if sequence:
+            # Keep the id sequence when the old table is dropped
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+        conn.execute(
+            text(
+                "CREATE TABLE weather_records (LIKE weather_records_unpartitioned "
+                "INCLUDING DEFAULTS) PARTITION BY RANGE (saved_on)"
+            )
+        )
+        conn.execute(text("ALTER TABLE weather_records ADD PRIMARY KEY (id, saved_on)"))
+        conn.execute(text("CREATE TABLE weather_records_default PARTITION OF weather_records DEFAULT"))
+        today = datetime.utcnow().date()
+        first = today - timedelta(days=raw_days) if raw_days > 0 else today
+        if oldest is not None:
+            first = max(first, oldest.date())
+        ensure_partitions(conn, first, today + timedelta(days=RETENTION_PARTITION_DAYS_AHEAD))
+        conn.execute(text("INSERT INTO weather_records SELECT * FROM weather_records_unpartitioned"))
+        conn.execute(text("DROP TABLE weather_records_unpartitioned"))
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY weather_records.id"))
+    # The old table's indexes went with it; build them on the partitioned one
+    create_missing_indexes(engine)
+    create_search_indexes(engine)
+    return True
+
+
+class Retention:
+    """
+    Keeps weather_records bounded by age.
+
+    Raw records older than `raw_days` are compacted into hourly rollups,
+    hourly rollups older than `hourly_days` into daily ones, and daily
+    rollups older than `daily_days` are deleted (0 keeps a tier forever).
+    Work happens in transactions of `batch_size` rows so writers are never
+    blocked for long; on a partitioned PostgreSQL table whole expired days
+    are compacted and dropped instead.
+    """
+
+    def __init__(
+        self,
+        engine: Engine = default_engine,
+        raw_days: int = RETENTION_RAW_DAYS,
+        hourly_days: int = RETENTION_HOURLY_DAYS,
+        daily_days: int = RETENTION_DAILY_DAYS,
+        batch_size: int = RETENTION_BATCH_SIZE,
+        interval: float = RETENTION_INTERVAL,
+        enabled: bool = RETENTION_ENABLED,
+        clock=datetime.utcnow,
+    ):
+        self.engine = engine
+        self.raw_days = raw_days
+        self.hourly_days = hourly_days
+        self.daily_days = daily_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.enabled = enabled
+        self.clock = clock
+        self._task: asyncio.Task | None = None
+        self.passes = 0
+        self.failed = 0
+        self.partition_failures = 0
+        self.last_run: dict | None = None
+        self.last_error: str | None = None
+
+    def cutoffs(self) -> dict:
+        """
+        Raw cutoff on an hour boundary, rollup cutoffs on day boundaries;
+        None where the tier is kept forever.
+        """
+        now = self.clock()
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        day = hour.replace(hour=0)
+
+        return {
+            "raw": hour - timedelta(days=self.raw_days) if self.raw_days > 0 else None,
+            "hourly": day - timedelta(days=self.hourly_days) if self.hourly_days > 0 else None,
+            "daily": day - timedelta(days=self.daily_days) if self.daily_days > 0 else None,
+        }
+
+    def _batches(self, work) -> int:
+        total = 0
+        while True:
+            with self.engine.begin() as conn:
+                done = work(conn)
+            total += done
+            if done < self.batch_size:
+                return total
+
+    def _drop_expired_partitions(self, conn: Connection, cutoff: datetime | None) -> list[str]:
+        dropped = []
+        if cutoff is not None:
+            for name, day in daily_partitions(conn):
+                if datetime.combine(day + timedelta(days=1), datetime.min.time()) > cutoff:
+                    break
+                with conn.begin_nested():
+                    rows = _rollup_select(_partition_table(name), True, "hour", "postgresql")
+                    conn.execute(_upsert(WeatherRollupHourly.__table__, rows, "postgresql"))
+                    conn.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+        today = self.clock().date()
+        try:
+            ensure_partitions(conn, today, today + timedelta(days=RETENTION_PARTITION_DAYS_AHEAD))
+        except SQLAlchemyError as e:
+            # Keep the drops; rows land in the default partition until the
+            # next pass manages to create the missing days
+            self.partition_failures += 1
+            self.last_error = str(e)
+        return dropped
+
+    def pending(self) -> dict:
+        """
+        Rows each tier would move or delete now (a dry run).
+        """
+        cutoffs = self.cutoffs()
+        sources = {
+            "raw": (WeatherRecord.saved_on, cutoffs["raw"]),
+            "hourly": (WeatherRollupHourly.bucket, cutoffs["hourly"]),
+            "daily": (WeatherRollupDaily.bucket, cutoffs["daily"]),
+        }
+        with self.engine.connect() as conn:
+            return {
+                tier: conn.execute(select(func.count()).where(when < cutoff)).scalar_one()
+                if cutoff is not None
+                else 0
+                for tier, (when, cutoff) in sources.items()
+            }
+
+    def run_once(self) -> dict:
+        """
+        One retention pass. Returns what was compacted, expired or dropped.
+        """
+        self.passes += 1
+        cutoffs = self.cutoffs()
+        result = {
+            "cutoffs": {k: v.isoformat() if v else None for k, v in cutoffs.items()},
+            "dropped_partitions": [],
+            "compacted_raw": 0,
+            "compacted_hourly": 0,
+            "expired_daily": 0,
+        }
+        records = WeatherRecord.__table__
+        hourly = WeatherRollupHourly.__table__
+        daily = WeatherRollupDaily.__table__
+        with self.engine.connect() as lock:
+            if lock.dialect.name == "postgresql":
+                if not lock.execute(
+                    text("SELECT pg_try_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}
+                ).scalar():
+                    result["skipped"] = "another worker holds the retention lock"
+                    return result
+            try:
+                raw_cutoff = cutoffs["raw"]
+                with self.engine.begin() as conn:
+                    partitioned = is_partitioned(conn)
+                    if partitioned:
+                        result["dropped_partitions"] = self._drop_expired_partitions(conn, raw_cutoff)
+                if raw_cutoff is not None:
+                    if partitioned:
+                        # Leave partly expired days for the next DROP
+                        raw_cutoff = raw_cutoff.replace(hour=0)
+                    result["compacted_raw"] = self._batches(
+                        lambda conn: compact_batch(
+                            conn, records, hourly, True, "hour", raw_cutoff, self.batch_size
+                        )
+                    )
+                if cutoffs["hourly"] is not None:
+                    result["compacted_hourly"] = self._batches(
+                        lambda conn: compact_batch(
+                            conn, hourly, daily, False, "day", cutoffs["hourly"], self.batch_size
+                        )
+                    )
+                if cutoffs["daily"] is not None:
+                    result["expired_daily"] = self._batches(
+                        lambda conn: expire_batch(conn, daily, cutoffs["daily"], self.batch_size)
+                    )
+            except ConcurrentRun:
+                result["skipped"] = "rows were compacted by another worker"
+            finally:
+                if lock.dialect.name == "postgresql":
+                    lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        self.last_run = {**result, "finished_at": self.clock().isoformat()}
+        return result
+
+    async def run(self):
+        while True:
+            try:
+                await run_in_threadpool(self.run_once)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                self.last_error = str(e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None,
+            "raw_days": self.raw_days,
+            "hourly_days": self.hourly_days,
+            "daily_days": self.daily_days,
+            "passes": self.passes,
+            "failed": self.failed,
+            "partition_failures": self.partition_failures,
+            "last_run": self.last_run,
+            "last_error": self.last_error,
+        }
+
+
+retention = Retention()
@@ -0,0 +1,231 @@
+from config.settings import env_float, env_int
+from utils.cache import location_query
+import asyncio
+import orjson
+import random
+
+SUBSCRIBE_INTERVAL = env_float("SUBSCRIBE_INTERVAL", 30)
+SUBSCRIBE_JITTER = env_float("SUBSCRIBE_JITTER", 0.1)
+SUBSCRIBE_HEARTBEAT = env_float("SUBSCRIBE_HEARTBEAT", 15)
+SUBSCRIBE_SEND_TIMEOUT = env_float("SUBSCRIBE_SEND_TIMEOUT", 10)
+SUBSCRIBE_MAX_LOCATIONS = env_int("SUBSCRIBE_MAX_LOCATIONS", 20)
+SUBSCRIBE_MAX_CONNECTIONS = env_int("SUBSCRIBE_MAX_CONNECTIONS", 10000)
+
+
+class SubscriptionsFull(Exception):
+    pass
+
+
+class Topic:
+    """
+    One distinct location: its subscribers and the last payload, framed
+    once for every transport.
+    """
+
+    __slots__ = ("key", "location", "subscribers", "payload", "message", "event", "task")
+
+    def __init__(self, key: str, location: str):
+        self.key = key
+        self.location = location
+        self.subscribers: set[Subscriber] = set()
+        self.payload = b""
+        self.message = b""
+        self.event = b""
+        self.task: asyncio.Task | None = None
+
+    def update(self, payload: bytes) -> bool:
+        """
+        Store `payload`; False when it is what subscribers already have.
+        """
+        if payload == self.payload:
+            return False
+        self.payload = payload
+        self.message = (
+            b'{"type":"weather","key":' + orjson.dumps(self.key) + b',"data":' + payload + b"}"
+        )
+        self.event = b"event: weather\ndata: " + self.message + b"\n\n"
+        return True
+
+
+class Subscriber:
+    """
+    One connection. Pending updates are kept per location, latest wins, so
+    a slow consumer holds at most one entry per subscribed location and
+    skips straight to the current payload when it catches up.
+    """
+
+    __slots__ = ("topics", "_pending", "_ready", "closed")
+
+    def __init__(self):
+        self.topics: dict[str, Topic] = {}
+        self._pending: dict[str, Topic] = {}
+        self._ready = asyncio.Event()
+        self.closed = False
+
+    def offer(self, topic: Topic):
+        self._pending[topic.key] = topic
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def updates(self, timeout: float) -> list[Topic] | None:
+        """
+        Topics that changed since the last call, waiting up to `timeout`
+        seconds for one ([] on timeout). None once the subscriber is closed.
+        """
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        if self.closed:
+            return None
+        self._ready.clear()
+        topics = list(self._pending.values())
+        self._pending.clear()
+        return topics
+
+
+class SubscriptionHub:
+    """
+    Live updates for subscribed locations.
+
+    Each distinct location (by cache key) has one refresh loop, shared by
+    every subscriber, that calls `fetch(location)` every `interval` seconds
+    (plus jitter) and pushes the payload only when its bytes changed.
+    `fetch` is the cached controller path, so a poll is a cache hit until
+    the entry expires and an expired entry costs one upstream call. Loops
+    stop when their last subscriber leaves.
+    """
+
+    def __init__(
+        self,
+        fetch,
+        interval: float = SUBSCRIBE_INTERVAL,
+        jitter: float = SUBSCRIBE_JITTER,
+        max_locations: int = SUBSCRIBE_MAX_LOCATIONS,
+        max_connections: int = SUBSCRIBE_MAX_CONNECTIONS,
+        sleep=asyncio.sleep,
+        rng: random.Random | None = None,
+    ):
+        self.fetch = fetch
+        self.interval = interval
+        self.jitter = jitter
+        self.max_locations = max_locations
+        self.max_connections = max_connections
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self._topics: dict[str, Topic] = {}
+        self._subscribers: set[Subscriber] = set()
+        self.polls = 0
+        self.changes = 0
+        self.pushed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def connect(self) -> Subscriber:
+        if len(self._subscribers) >= self.max_connections:
+            self.rejected += 1
+            raise SubscriptionsFull("Too many live subscriptions on this worker.")
+        subscriber = Subscriber()
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def disconnect(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+        for key in list(subscriber.topics):
+            self._leave(subscriber, key)
+        subscriber.close()
+
+    async def subscribe(self, subscriber: Subscriber, locations: list[str]) -> list[dict]:
+        """
+        Subscribe to each location and queue its current payload. Errors
+        from the first fetch (unknown location, upstream down) propagate.
+        """
+        if not all(locations):
+            raise ValueError("Locations must not be empty.")
+        added = {location_query(location)[0]: location for location in locations}
+        added = {key: loc for key, loc in added.items() if key not in subscriber.topics}
+        if len(subscriber.topics) + len(added) > self.max_locations:
+            raise ValueError(f"At most {self.max_locations} locations per subscription.")
+        subscribed = []
+        for key, location in added.items():
+            payload = await self.fetch(location)
+            if subscriber.closed:
+                break
+            topic = self._topics.get(key)
+            if topic is None:
+                topic = self._topics[key] = Topic(key, location)
+                topic.update(payload)
+                topic.task = asyncio.create_task(self._refresh(topic))
+            elif topic.update(payload):
+                self._publish(topic)
+            topic.subscribers.add(subscriber)
+            subscriber.topics[key] = topic
+            subscriber.offer(topic)
+            subscribed.append({"location": location, "key": key})
+        return subscribed
+
+    def unsubscribe(self, subscriber: Subscriber, locations: list[str]) -> list[dict]:
+        removed = []
+        for location in locations:
+            key, _ = location_query(location)
+            if key in subscriber.topics:
+                self._leave(subscriber, key)
+                removed.append({"location": location, "key": key})
+        return removed
+
+    def _leave(self, subscriber: Subscriber, key: str):
+        topic = subscriber.topics.pop(key)
+        topic.subscribers.discard(subscriber)
+        if not topic.subscribers:
+            self._topics.pop(key, None)
+            topic.task.cancel()
+
+    async def _refresh(self, topic: Topic):
+        while True:
+            await self.sleep(self.interval * (1 + self.rng.uniform(0, self.jitter)))
+            self.polls += 1
+            try:
+                payload = await self.fetch(topic.location)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Subscribers keep the last payload; the next poll retries
+                self.failed += 1
+                continue
+            if topic.update(payload):
+                self._publish(topic)
+
+    def _publish(self, topic: Topic):
+        self.changes += 1
+        self.pushed += len(topic.subscribers)
+        for subscriber in topic.subscribers:
+            subscriber.offer(topic)
+
+    async def stop(self):
+        """
+        Close every subscriber (their streams end) and cancel the loops.
+        """
+        tasks = [topic.task for topic in self._topics.values()]
+        for subscriber in list(self._subscribers):
+            self.disconnect(subscriber)
+        self._topics.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self._subscribers),
+            "locations": len(self._topics),
+            "polls": self.polls,
+            "changes": self.changes,
+            "pushed": self.pushed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "interval": self.interval,
+            "max_connections": self.max_connections,
+        }
@@ -0,0 +1,391 @@
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from config.settings import env_float, env_int
+from config.http_client import get_http_client
+from utils.metrics import Counter, Gauge, Histogram
+from typing import TYPE_CHECKING
+import asyncio
+import random
+import time
+
+if TYPE_CHECKING:
+    import httpx
+
+UPSTREAM_RATE = env_float("UPSTREAM_RATE", 10)
+UPSTREAM_BURST = env_float("UPSTREAM_BURST", 20)
+UPSTREAM_MAX_WAIT = env_float("UPSTREAM_MAX_WAIT", 1)
+UPSTREAM_MAX_RETRIES = env_int("UPSTREAM_MAX_RETRIES", 2)
+UPSTREAM_BACKOFF_BASE = env_float("UPSTREAM_BACKOFF_BASE", 0.2)
+UPSTREAM_BACKOFF_MAX = env_float("UPSTREAM_BACKOFF_MAX", 2)
+UPSTREAM_RETRY_AFTER_MAX = env_float("UPSTREAM_RETRY_AFTER_MAX", 5)
+UPSTREAM_RETRY_RATIO = env_float("UPSTREAM_RETRY_RATIO", 0.2)
+UPSTREAM_RETRY_MIN_PER_SECOND = env_float("UPSTREAM_RETRY_MIN_PER_SECOND", 1)
+UPSTREAM_RETRY_MAX_TOKENS = env_float("UPSTREAM_RETRY_MAX_TOKENS", 20)
+UPSTREAM_BREAKER_THRESHOLD = env_int("UPSTREAM_BREAKER_THRESHOLD", 5)
+UPSTREAM_BREAKER_COOLDOWN = env_float("UPSTREAM_BREAKER_COOLDOWN", 30)
+
+# Responses worth retrying; anything else (e.g. 404 city not found) is final
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests_total",
+    "OpenWeather attempts by path and outcome (HTTP status or error name).",
+    ("path", "status"),
+)
+UPSTREAM_SECONDS = Histogram(
+    "upstream_request_duration_seconds", "OpenWeather attempt latency.", ("path",)
+)
+
+
+class UpstreamError(Exception):
+    """
+    OpenWeather could not be reached or kept failing after retries.
+    `status_code` is what our API should answer with.
+    """
+
+    def __init__(self, message: str, status_code: int = 502, retry_after: float | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    def as_http_exception(self, detail: str) -> HTTPException:
+        headers = None
+        if self.retry_after is not None:
+            headers = {"Retry-After": str(max(1, round(self.retry_after)))}
+        return HTTPException(
+            status_code=self.status_code, detail=f"{detail} ({self})", headers=headers
+        )
+
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+
+class RateLimitedError(UpstreamError):
+    pass
+
+
+def parse_retry_after(value: str | None, now: float | None = None) -> float | None:
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP date).
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc).timestamp() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+class TokenBucket:
+    """
+    Smooths upstream calls to `rate` per second with bursts up to `burst`.
+
+    Callers reserve a token and sleep until it is due; a caller that would
+    wait longer than `max_wait` is rejected instead of queueing.
+    """
+
+    def __init__(self, rate: float, burst: float, max_wait: float, clock=time.monotonic, sleep=asyncio.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = burst
+        self._updated = clock()
+        self.acquired = 0
+        self.delayed = 0
+        self.rejected = 0
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        self._refill()
+        wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+        if wait > self.max_wait:
+            self.rejected += 1
+            raise RateLimitedError("upstream rate limit reached", status_code=503, retry_after=wait)
+        self.tokens -= 1
+        self.acquired += 1
+        if wait:
+            self.delayed += 1
+            await self.sleep(wait)
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 3),
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+        }
+
+
+class RetryBudget:
+    """
+    Caps retries across all callers: every first attempt deposits `ratio`
+    of a token, `min_per_second` tokens accrue over time, and each retry
+    spends one. When the upstream is failing everywhere, retries stop
+    instead of multiplying the load.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_tokens: float, clock=time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.clock = clock
+        self.tokens = max_tokens
+        self._updated = clock()
+        self.spent = 0
+        self.exhausted = 0
+
+    def _accrue(self, amount: float = 0.0):
+        now = self.clock()
+        gained = (now - self._updated) * self.min_per_second + amount
+        self.tokens = min(self.max_tokens, self.tokens + gained)
+        self._updated = now
+
+    def deposit(self):
+        self._accrue(self.ratio)
+
+    def withdraw(self) -> bool:
+        self._accrue()
+        if self.tokens < 1:
+            self.exhausted += 1
+            return False
+        self.tokens -= 1
+        self.spent += 1
+        return True
+
+    def stats(self) -> dict:
+        self._accrue()
+        return {
+            "tokens": round(self.tokens, 3),
+            "max_tokens": self.max_tokens,
+            "spent": self.spent,
+            "exhausted": self.exhausted,
+        }
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed calls and fails fast for
+    `cooldown` seconds, then lets a single probe through (half-open): a
+    successful probe closes the circuit, a failed one reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int, cooldown: float, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.short_circuited = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.cooldown - self.clock())
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError unless a call may go through now. Returns
+        True when the caller is the half-open probe.
+        """
+        if self.state == self.OPEN and self.retry_after() == 0:
+            self.state = self.HALF_OPEN
+        if self.state == self.OPEN or (self.state == self.HALF_OPEN and self._probing):
+            self.short_circuited += 1
+            raise CircuitOpenError(
+                "upstream circuit open", status_code=503, retry_after=self.retry_after()
+            )
+        if self.state == self.HALF_OPEN:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            if self.state != self.OPEN:
+                self.opened += 1
+            self.state = self.OPEN
+            self._opened_at = self.clock()
+
+    def abandon(self):
+        """
+        Release a half-open probe that ended without a verdict (cancelled or
+        rejected by the rate limiter).
+        """
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "short_circuited": self.short_circuited,
+            "retry_after": round(self.retry_after(), 3) if self.state == self.OPEN else 0.0,
+        }
+
+
+class Upstream:
+    """
+    The single path to OpenWeather: rate limited, retried with jittered
+    exponential backoff under a shared retry budget, and guarded by a
+    circuit breaker. Non-retryable responses (e.g. 404) are returned as-is.
+    """
+
+    def __init__(
+        self,
+        limiter: TokenBucket,
+        budget: RetryBudget,
+        breaker: CircuitBreaker,
+        max_retries: int = UPSTREAM_MAX_RETRIES,
+        backoff_base: float = UPSTREAM_BACKOFF_BASE,
+        backoff_max: float = UPSTREAM_BACKOFF_MAX,
+        retry_after_max: float = UPSTREAM_RETRY_AFTER_MAX,
+        client=get_http_client,
+        sleep=asyncio.sleep,
+        rng: random.Random | None = None,
+    ):
+        self.limiter = limiter
+        self.budget = budget
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.client = client
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": spreads retries from many workers over the window
+        return self.rng.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    async def get(self, path: str, params: dict) -> "httpx.Response":
+        import httpx
+
+        probe = self.breaker.before_call()
+        self.calls += 1
+        self.budget.deposit()
+        try:
+            attempt = 0
+            while True:
+                await self.limiter.acquire()
+                status = retry_after = None
+                start = time.perf_counter()
+                try:
+                    res = await self.client().get(path, params=params)
+                except httpx.HTTPError as e:
+                    reason = type(e).__name__
+                    UPSTREAM_REQUESTS.inc(path, reason)
+                else:
+                    UPSTREAM_REQUESTS.inc(path, res.status_code)
+                    status = res.status_code
+                    if status not in RETRYABLE_STATUS:
+                        self.breaker.record_success()
+                        return res
+                    reason = f"HTTP {status}"
+                    retry_after = parse_retry_after(res.headers.get("Retry-After"))
+                finally:
+                    UPSTREAM_SECONDS.observe(time.perf_counter() - start, path)
+
+                delay = self._backoff(attempt) if retry_after is None else retry_after
+                if (
+                    attempt >= self.max_retries
+                    or delay > self.retry_after_max
+                    or not self.budget.withdraw()
+                ):
+                    self.failures += 1
+                    self.breaker.record_failure()
+                    # Rate limited or unavailable upstream: we are too, for now;
+                    # anything else is a bad gateway
+                    status_code = 503 if status in (429, 503) or retry_after is not None else 502
+                    raise UpstreamError(reason, status_code=status_code, retry_after=retry_after)
+                attempt += 1
+                self.retries += 1
+                await self.sleep(delay)
+        finally:
+            if probe:
+                self.breaker.abandon()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "breaker": self.breaker.stats(),
+            "limiter": self.limiter.stats(),
+            "retry_budget": self.budget.stats(),
+        }
+
+
+upstream = Upstream(
+    limiter=TokenBucket(UPSTREAM_RATE, UPSTREAM_BURST, UPSTREAM_MAX_WAIT),
+    budget=RetryBudget(
+        UPSTREAM_RETRY_RATIO, UPSTREAM_RETRY_MIN_PER_SECOND, UPSTREAM_RETRY_MAX_TOKENS
+    ),
+    breaker=CircuitBreaker(UPSTREAM_BREAKER_THRESHOLD, UPSTREAM_BREAKER_COOLDOWN),
+)
+
+_BREAKER_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+Gauge(
+    "upstream_circuit_state",
+    "Circuit breaker state (0 closed, 1 half-open, 2 open).",
+    function=lambda: {(): _BREAKER_STATES[upstream.breaker.state]},
+)
+Counter(
+    "upstream_short_circuited_total",
+    "Calls rejected while the circuit was open.",
+    function=lambda: {(): upstream.breaker.short_circuited},
+)
+Counter(
+    "upstream_retries_total", "Retried attempts.", function=lambda: {(): upstream.retries}
+)
+Counter(
+    "upstream_retry_budget_exhausted_total",
+    "Retries skipped because the retry budget was empty.",
+    function=lambda: {(): upstream.budget.exhausted},
+)
+Gauge(
+    "upstream_rate_limiter_tokens",
+    "Tokens left in the upstream rate limiter.",
+    function=lambda: {(): upstream.limiter.stats()["tokens"]},
+)
+Counter(
+    "upstream_rate_limited_total",
+    "Calls delayed or rejected by the upstream rate limiter.",
+    ("outcome",),
+    lambda: {("delayed",): upstream.limiter.delayed, ("rejected",): upstream.limiter.rejected},
+)
@@ -0,0 +1,162 @@
+from collections import deque
+from config.settings import env, env_bool, env_float, env_int
+import asyncio
+
+WRITE_BEHIND_ENABLED = env_bool("WRITE_BEHIND_ENABLED", False)
+# "commit": respond once the row's group is committed (with its id);
+# "enqueue": respond as soon as the row is queued (202, no id yet)
+WRITE_BEHIND_ACK = env("WRITE_BEHIND_ACK", "commit")
+WRITE_BEHIND_MAX_ROWS = env_int("WRITE_BEHIND_MAX_ROWS", 500)
+WRITE_BEHIND_MAX_DELAY_MS = env_float("WRITE_BEHIND_MAX_DELAY_MS", 10)
+WRITE_BEHIND_QUEUE_SIZE = env_int("WRITE_BEHIND_QUEUE_SIZE", 10000)
+
+ACK_MODES = ("commit", "enqueue")
+
+
+class WriteBehind:
+    """
+    Group commit for single-row saves.
+
+    submit() queues a row; a background flusher writes whatever is queued
+    in one transaction once `max_rows` rows are waiting or `max_delay_ms`
+    after the first of them arrived, through the registered
+    `await write(rows)`, which returns one result per row. With ack
+    "commit" submit() returns that row's result after the commit; with
+    "enqueue" it returns None straight away and failed groups are only
+    counted. At most `queue_size` rows are queued or being written; more
+    callers wait their turn in arrival order. stop() writes everything
+    still queued before returning.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = WRITE_BEHIND_ENABLED,
+        ack: str = WRITE_BEHIND_ACK,
+        max_rows: int = WRITE_BEHIND_MAX_ROWS,
+        max_delay_ms: float = WRITE_BEHIND_MAX_DELAY_MS,
+        queue_size: int = WRITE_BEHIND_QUEUE_SIZE,
+    ):
+        if ack not in ACK_MODES:
+            raise ValueError(f"WRITE_BEHIND_ACK must be one of: {', '.join(ACK_MODES)}")
+        self.enabled = enabled
+        self.ack = ack
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self.queue_size = queue_size
+        self._write = None
+        self._rows: deque = deque()
+        # A Semaphore hands out slots in arrival order; a bounded
+        # asyncio.Queue lets new callers overtake ones already waiting
+        self._slots: asyncio.Semaphore | None = None
+        self._ready: asyncio.Event | None = None
+        self._full: asyncio.Event | None = None
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+        self.queued = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.largest_flush = 0
+
+    def register(self, write):
+        self._write = write
+
+    async def submit(self, row):
+        """
+        Queue `row` for the next group. Outside the lifespan (flusher not
+        running) the row is written on its own instead.
+        """
+        if self._task is None:
+            return (await self._write([row]))[0]
+        await self._slots.acquire()
+        if self._task is None:
+            # Stopped while this caller waited for a slot
+            self._slots.release()
+            return (await self._write([row]))[0]
+        future = asyncio.get_running_loop().create_future() if self.ack == "commit" else None
+        self._rows.append((row, future))
+        self.queued += 1
+        self._ready.set()
+        if len(self._rows) >= self.max_rows:
+            self._full.set()
+        if future is not None:
+            return await future
+
+    async def run(self):
+        while True:
+            await self._ready.wait()
+            if not self._rows:
+                if self._stopping:
+                    return
+                self._ready.clear()
+                continue
+            if len(self._rows) < self.max_rows and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+            batch = [self._rows.popleft() for _ in range(min(len(self._rows), self.max_rows))]
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._slots.release()
+
+    async def _flush(self, batch: list):
+        rows = [row for row, _ in batch]
+        try:
+            results = await self._write(rows)
+        except Exception as e:
+            self.failed += len(batch)
+            for _, future in batch:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+        self.flushes += 1
+        self.written += len(batch)
+        self.largest_flush = max(self.largest_flush, len(batch))
+        for (_, future), result in zip(batch, results):
+            # A caller that went away cancelled its future; the row is saved
+            if future is not None and not future.done():
+                future.set_result(result)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._slots = asyncio.Semaphore(self.queue_size)
+            self._ready = asyncio.Event()
+            self._full = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """
+        Flush what is queued, then stop the flusher. Saves arriving from
+        here on are written directly.
+        """
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        self._stopping = True
+        self._ready.set()
+        self._full.set()
+        await task
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None,
+            "ack": self.ack,
+            "pending": len(self._rows),
+            "queued": self.queued,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "avg_flush": round(self.written / self.flushes, 1) if self.flushes else 0,
+            "largest_flush": self.largest_flush,
+            "max_rows": self.max_rows,
+            "max_delay_ms": self.max_delay * 1000,
+        }
+
+
+record_writer = WriteBehind()